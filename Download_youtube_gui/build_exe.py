@@ -39,6 +39,24 @@ def find_ffmpeg():
     sys.exit(1)
 
 
+def find_aria2c():
+    """Find aria2c (optional external downloader) from conda environment or system PATH"""
+    conda_prefix = os.environ.get('CONDA_PREFIX')
+    if conda_prefix:
+        aria2c_exe = Path(conda_prefix) / 'Library' / 'bin' / 'aria2c.exe'
+        if aria2c_exe.exists():
+            print(f"[OK] Found aria2c in conda: {aria2c_exe}")
+            return aria2c_exe
+    
+    aria2c_path = shutil.which('aria2c')
+    if aria2c_path:
+        print(f"[OK] Found aria2c in PATH: {aria2c_path}")
+        return Path(aria2c_path)
+    
+    print("[INFO] aria2c not found (optional: conda install -c conda-forge aria2)")
+    return None
+
+
 def find_customtkinter():
     """Find CustomTkinter package location for assets"""
     try:
@@ -60,6 +78,7 @@ def build_exe():
     
     # Find dependencies
     ffmpeg_dir, ffmpeg_files = find_ffmpeg()
+    aria2c_exe = find_aria2c()
     ctk_path = find_customtkinter()
     
     # Prepare PyInstaller command
@@ -77,6 +96,10 @@ def build_exe():
     for ff_file in ffmpeg_files:
         add_data.append(f'--add-binary={ff_file};ffmpeg')
     
+    # Add aria2c next to FFmpeg (the GUI looks for it there)
+    if aria2c_exe:
+        add_data.append(f'--add-binary={aria2c_exe};ffmpeg')
+    
     # Add CustomTkinter assets
     add_data.append(f'--add-data={ctk_path};customtkinter')
     
@@ -0,0 +1,115 @@
+"""
+Download Archive - Remembers which videos were already downloaded
+SQLite index keyed by video ID and variant (mode, format, quality), so a
+re-pasted URL is skipped, or its file is linked into the new output folder,
+instead of being downloaded and converted again
+"""
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+ARCHIVE_PATH = Path.home() / ".cache" / "youtube_downloader_gui" / "archive.sqlite"
+
+
+def archive_variant(settings):
+    """Archive key part for the output settings, e.g. 'audio:mp3:320' or 'video:mp4:1080p'"""
+    return f"{settings['mode']}:{settings['format']}:{settings['quality']}"
+
+
+def link_or_copy(source, target):
+    """Hard link source to target (same drive), copy it otherwise"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class DownloadArchive:
+    """
+    SQLite index: (video ID, variant) -> files downloaded for it.
+
+    A file only counts while it still exists with its recorded size; rows of
+    deleted or modified files are dropped on lookup. Safe to share between
+    worker threads; after close() lookups find nothing and records are
+    dropped (workers may still be finishing while the window closes).
+    """
+
+    def __init__(self, db_path=ARCHIVE_PATH):
+        """
+        Args:
+            db_path: SQLite file (created if missing)
+        """
+        self._lock = threading.Lock()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS downloads (
+                video_id TEXT NOT NULL,
+                variant TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                title TEXT,
+                downloaded_at REAL NOT NULL,
+                PRIMARY KEY (video_id, variant, path)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def find(self, video_id, variant):
+        """Existing files for a video and variant: list of (Path, title), newest first"""
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._conn.execute(
+                "SELECT path, size, title FROM downloads WHERE video_id = ? AND variant = ? "
+                "ORDER BY downloaded_at DESC",
+                (video_id, variant)
+            ).fetchall()
+
+        found, stale = [], []
+        for path, size, title in rows:
+            try:
+                current = os.path.getsize(path) == size
+            except OSError:
+                current = False
+            if current:
+                found.append((Path(path), title))
+            else:
+                stale.append((video_id, variant, path))
+
+        if stale:
+            with self._lock:
+                if self._conn is None:
+                    return found
+                self._conn.executemany(
+                    "DELETE FROM downloads WHERE video_id = ? AND variant = ? AND path = ?", stale)
+                self._conn.commit()
+        return found
+
+    def record(self, video_id, variant, path, title=None):
+        """Remember a finished file"""
+        path = Path(path).resolve()
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads (video_id, variant, path, size, title, downloaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, variant, str(path), path.stat().st_size, title, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
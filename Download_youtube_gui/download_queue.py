@@ -0,0 +1,446 @@
+"""
+Download Queue - Concurrent downloads for the YouTube Downloader GUI
+- Network transfers run in a bounded pool of YoutubeDL workers
+- FFmpeg work (audio extraction, video merging) runs in its own pool,
+  so a conversion never holds up the next transfer
+- Every item can be cancelled (the progress hook raises inside yt-dlp)
+- Network options (fragments, aria2c, chunk size, rate limit) come from
+  download_settings; measured throughput is kept per download mode
+- Each video's info is extracted once (and cached by video ID); format
+  selection and the download reuse it via process_ie_result (playlists are
+  extracted per step, their entries are lazy generators)
+- Videos already in the download archive are skipped, or their file is
+  linked into the output folder, without any network or FFmpeg work
+- A video that is already queued or running with the same settings is not
+  queued a second time
+"""
+
+import copy
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadCancelled, DownloadError
+from yt_dlp.postprocessor import FFmpegExtractAudioPP, FFmpegMergerPP
+
+from download_archive import archive_variant, link_or_copy
+from download_settings import network_options
+from metadata_cache import MetadataCache
+from youtube_url import extract_video_id
+
+
+# Default pool sizes
+MAX_PARALLEL_DOWNLOADS = 3
+POSTPROCESS_WORKERS = 2
+
+# GUI quality choice -> yt-dlp setting
+AUDIO_QUALITY = {'best': '0', '320': '320K', '256': '256K', '192': '192K', '128': '128K'}
+VIDEO_FORMATS = {
+    'best': 'bestvideo+bestaudio/best',
+    '1080p': 'bestvideo[height<=1080]+bestaudio/best[height<=1080]',
+    '720p': 'bestvideo[height<=720]+bestaudio/best[height<=720]',
+    '480p': 'bestvideo[height<=480]+bestaudio/best[height<=480]',
+    '360p': 'bestvideo[height<=360]+bestaudio/best[height<=360]',
+}
+
+
+class DownloadItem:
+    """One queued URL and its state (the GUI draws a row from it)"""
+
+    QUEUED = "Queued"
+    DOWNLOADING = "Downloading"
+    PROCESSING = "Processing"
+    DONE = "Done"
+    FAILED = "Failed"
+    CANCELLED = "Cancelled"
+
+    def __init__(self, url):
+        self.url = url
+        self.video_id = extract_video_id(url)  # None for playlists
+        self.title = None
+        self.state = self.QUEUED
+        self.detail = ""  # Speed / ETA / error text
+        self.progress = 0.0
+        self.speed = None  # Current transfer speed in bytes/s (None when not transferring)
+        self.mode = None  # Download mode label, e.g. "aria2c ×8"
+        self.output = None  # Final file path
+        self.key = None  # (video ID, archive variant, output folder) while queued, for de-duplication
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.state in (self.DONE, self.FAILED, self.CANCELLED)
+
+    def cancel(self):
+        """Request cancellation (takes effect at the next progress update)"""
+        self.cancel_event.set()
+
+
+class DownloadQueue:
+    """
+    Bounded download pool + separate post-processing pool.
+
+    settings passed to submit():
+        {"mode": "audio"|"video", "format": codec, "quality": str,
+         "output_dir": str, "ffmpeg_location": str or None,
+         plus the keys of download_settings.DEFAULT_SETTINGS and
+         "aria2c_path": str or None}
+    """
+
+    def __init__(self, max_downloads=MAX_PARALLEL_DOWNLOADS, postprocess_workers=POSTPROCESS_WORKERS,
+                 on_update=None, on_log=None, on_idle=None, metadata_cache=None, archive=None):
+        """
+        Args:
+            max_downloads: YoutubeDL workers transferring at the same time
+            postprocess_workers: Concurrent FFmpeg jobs
+            metadata_cache: MetadataCache shared between queues (a memory-only one by default)
+            archive: DownloadArchive of finished files (None = always download)
+            on_update: Called with a DownloadItem whenever its state changes (any thread)
+            on_log: Called with a log line (any thread)
+            on_idle: Called when the last unfinished item finishes (any thread)
+        """
+        self.max_downloads = max(1, max_downloads)
+        self._download_pool = ThreadPoolExecutor(max_workers=self.max_downloads, thread_name_prefix="download")
+        self._postprocess_pool = ThreadPoolExecutor(max_workers=max(1, postprocess_workers),
+                                                    thread_name_prefix="ffmpeg")
+        self._on_update = on_update or (lambda item: None)
+        self._on_log = on_log or (lambda message: None)
+        self._on_idle = on_idle or (lambda: None)
+        self.metadata_cache = metadata_cache or MetadataCache(cache_dir=None)
+        self.archive = archive
+        self._lock = threading.Lock()
+        self._unfinished = 0
+        self._throughput = {}  # Mode label -> [bytes, seconds, files]
+        self.items = []
+
+    @property
+    def active(self):
+        """True while any item is queued, downloading or processing"""
+        with self._lock:
+            return any(not item.finished for item in self.items)
+
+    def submit(self, url, settings):
+        """Queue a URL, returns its DownloadItem (None if the same video is already queued or running)"""
+        item = DownloadItem(url)
+        if item.video_id:
+            item.key = (item.video_id, archive_variant(settings), str(Path(settings['output_dir']).resolve()))
+        with self._lock:
+            if item.key and any(other.key == item.key and not other.finished for other in self.items):
+                return None
+            self.items.append(item)
+            self._unfinished += 1
+        self._download_pool.submit(self._download, item, dict(settings))
+        return item
+
+    def cancel_all(self):
+        """Cancel every unfinished item"""
+        with self._lock:
+            items = list(self.items)
+        for item in items:
+            if not item.finished:
+                item.cancel()
+
+    def clear_finished(self):
+        """Forget finished items, returns them"""
+        with self._lock:
+            finished = [item for item in self.items if item.finished]
+            self.items = [item for item in self.items if not item.finished]
+        return finished
+
+    def throughput(self):
+        """Measured transfers per download mode: {label: (bytes, seconds, files)}"""
+        with self._lock:
+            return {label: tuple(stats) for label, stats in self._throughput.items()}
+
+    def shutdown(self):
+        """Cancel everything and stop the pools (does not wait for running jobs)"""
+        self.cancel_all()
+        self._download_pool.shutdown(wait=False, cancel_futures=True)
+        self._postprocess_pool.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------ #
+
+    def _set(self, item, state=None, detail=None, progress=None):
+        idle = False
+        if state is not None:
+            with self._lock:
+                if state in (DownloadItem.DONE, DownloadItem.FAILED, DownloadItem.CANCELLED) and not item.finished:
+                    self._unfinished -= 1
+                    idle = self._unfinished == 0
+                item.state = state
+            if state != DownloadItem.DOWNLOADING:
+                item.speed = None
+        if detail is not None:
+            item.detail = detail
+        if progress is not None:
+            item.progress = progress
+        self._on_update(item)
+        if idle:
+            self._on_idle()
+
+    def _fail(self, item, error):
+        if item.cancel_event.is_set():
+            self._set(item, DownloadItem.CANCELLED, "")
+            self._on_log(f"⚠️ Cancelled: {item.title or item.url}")
+        else:
+            self._set(item, DownloadItem.FAILED, str(error))
+            self._on_log(f"❌ {item.title or item.url}: {error}")
+
+    def _progress_hook(self, item):
+        def hook(d):
+            if item.cancel_event.is_set():
+                raise DownloadCancelled()
+            if item.title is None:
+                item.title = d.get('info_dict', {}).get('title')
+
+            if d['status'] == 'downloading':
+                total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                progress = d['downloaded_bytes'] / total if total else 0.0
+                speed, eta = d.get('speed'), d.get('eta')
+                detail = f"{progress * 100:.1f}%"
+                if speed:
+                    detail += f" | {speed / 1024 / 1024:.1f} MB/s"
+                if eta is not None:
+                    detail += f" | ETA: {eta}s"
+                item.speed = speed
+                self._set(item, DownloadItem.DOWNLOADING, detail, progress)
+            elif d['status'] == 'finished':
+                # Files that were already on disk report no elapsed time
+                size, elapsed = d.get('total_bytes') or d.get('downloaded_bytes'), d.get('elapsed')
+                if size and elapsed:
+                    self._record_throughput(item.mode, size, elapsed)
+                item.speed = None
+                self._set(item, progress=1.0)
+        return hook
+
+    def _record_throughput(self, label, size, elapsed):
+        with self._lock:
+            stats = self._throughput.setdefault(label, [0, 0.0, 0])
+            stats[0] += size
+            stats[1] += elapsed
+            stats[2] += 1
+
+    def _base_options(self, item, settings):
+        options, item.mode = network_options(settings)
+        options.update({
+            'noplaylist': True,  # Download single video only, not playlist
+            'progress_hooks': [self._progress_hook(item)],
+        })
+        if settings.get('ffmpeg_location'):
+            options['ffmpeg_location'] = settings['ffmpeg_location']
+        return options
+
+    def _extract(self, item, options, fresh=False):
+        """
+        Unprocessed info for the item's URL: from the cache, or one extraction.
+
+        Returns (info, True if it came from the cache)
+        """
+        info = None if fresh else self.metadata_cache.get(item.url)
+        cached = info is not None
+        if not cached:
+            with YoutubeDL(options) as ydl:
+                info = ydl.extract_info(item.url, download=False, process=False)
+            self.metadata_cache.put(info)
+        item.title = info.get('title') or item.title
+        return info, cached
+
+    def _download(self, item, settings):
+        """Download worker: network only, FFmpeg work is handed to the post-processing pool"""
+        if item.cancel_event.is_set():
+            self._set(item, DownloadItem.CANCELLED)
+            return
+        if self.archive and item.video_id and settings.get('skip_downloaded', True):
+            try:
+                if self._reuse_archived(item, settings):
+                    return
+            except Exception as e:
+                self._fail(item, e)
+                return
+
+        self._set(item, DownloadItem.DOWNLOADING, "Fetching info...")
+        try:
+            Path(settings['output_dir']).mkdir(exist_ok=True, parents=True)
+            options = self._base_options(item, settings)
+            raw_info, cached = self._extract(item, options)
+            try:
+                info, job = self._transfer(item, settings, options, raw_info)
+            except DownloadError:
+                if not cached or item.cancel_event.is_set():
+                    raise
+                # Cached stream URLs may have expired: extract again once
+                self._on_log(f"ℹ️ Cached info failed, fetching it again: {item.title or item.url}")
+                raw_info, _ = self._extract(item, options, fresh=True)
+                info, job = self._transfer(item, settings, options, raw_info)
+        except Exception as e:
+            self._fail(item, e)
+            return
+
+        if job is None:
+            files = _downloaded_files(info)
+            self._finish(item, settings, files[0] if files else None)
+            return
+
+        self._set(item, DownloadItem.PROCESSING, "Waiting for FFmpeg...", 1.0)
+        self._postprocess_pool.submit(*job)
+
+    def _reuse_archived(self, item, settings):
+        """Finish the item from the archive if possible, returns True if it was"""
+        found = self.archive.find(item.video_id, archive_variant(settings))
+        if not found:
+            return False
+
+        output_dir = Path(settings['output_dir']).resolve()
+        for path, title in found:
+            if path.parent == output_dir:
+                item.title = title or item.title
+                item.output = str(path)
+                self._set(item, DownloadItem.DONE, "Already downloaded", 1.0)
+                self._on_log(f"⏭️ Already downloaded: {item.title or item.url}")
+                return True
+
+        # Downloaded to another folder before: link (or copy) it here
+        source, title = found[0]
+        target = output_dir / source.name
+        if target.exists():
+            return False  # A different file with that name; download again
+        output_dir.mkdir(exist_ok=True, parents=True)
+        link_or_copy(source, target)
+        self.archive.record(item.video_id, archive_variant(settings), target, title)
+        item.title = title or item.title
+        item.output = str(target)
+        self._set(item, DownloadItem.DONE, "Linked from archive", 1.0)
+        self._on_log(f"🔗 {item.title or item.url} → {target.name} (from {source.parent})")
+        return True
+
+    def _transfer(self, item, settings, options, raw_info):
+        """
+        Select formats and download them from the already extracted info.
+
+        Returns (info, post-processing job or None)
+        """
+        output_dir = settings['output_dir']
+        if settings['mode'] == "audio":
+            options = {**options, 'format': 'bestaudio/best', 'outtmpl': f'{output_dir}/%(title)s.%(ext)s'}
+            with YoutubeDL(options) as ydl:
+                info = _process_info(ydl, item, raw_info, download=True)
+            return info, (self._extract_audio, item, settings, info)
+
+        video_format = VIDEO_FORMATS.get(settings['quality'], 'best')
+        # Pick the formats first (no network); merged formats are downloaded
+        # as separate streams and merged by the post-processing pool
+        with YoutubeDL({**options, 'format': video_format}) as ydl:
+            selected = _process_info(ydl, item, raw_info, download=False)
+            streams = selected.get('requested_formats')
+            final_path = ydl.prepare_filename({**selected, 'ext': 'mp4'}, outtmpl=f'{output_dir}/%(title)s.%(ext)s')
+
+        if streams:
+            options = {
+                **options,
+                'format': ','.join(stream['format_id'] for stream in streams),
+                'outtmpl': f'{output_dir}/%(title)s.f%(format_id)s.%(ext)s',
+            }
+        else:
+            # Single file (or a playlist): let yt-dlp handle it in one go
+            options = {
+                **options,
+                'format': selected.get('format_id') or video_format,
+                'outtmpl': f'{output_dir}/%(title)s.%(ext)s',
+                'merge_output_format': 'mp4',
+            }
+        with YoutubeDL(options) as ydl:
+            info = _process_info(ydl, item, raw_info, download=True)
+        return info, ((self._merge_video, item, settings, info, final_path) if streams else None)
+
+    def _postprocessor_ydl(self, settings):
+        options = {'quiet': True}
+        if settings.get('ffmpeg_location'):
+            options['ffmpeg_location'] = settings['ffmpeg_location']
+        return YoutubeDL(options)
+
+    def _extract_audio(self, item, settings, info):
+        """Post-processing worker: convert downloaded audio to the chosen codec"""
+        if item.cancel_event.is_set():
+            self._set(item, DownloadItem.CANCELLED)
+            return
+        self._set(item, DownloadItem.PROCESSING, f"Converting to {settings['format'].upper()}...")
+        try:
+            output = None
+            with self._postprocessor_ydl(settings) as ydl:
+                extractor = FFmpegExtractAudioPP(
+                    ydl,
+                    preferredcodec=settings['format'],
+                    preferredquality=AUDIO_QUALITY.get(settings['quality'], '0'),
+                )
+                for download in _requested_downloads(info):
+                    to_delete, download = extractor.run(download)
+                    _remove_files(to_delete)
+                    output = download['filepath']
+        except Exception as e:
+            self._fail(item, e)
+            return
+        self._finish(item, settings, output)
+
+    def _merge_video(self, item, settings, info, final_path):
+        """Post-processing worker: merge video and audio streams into one MP4"""
+        if item.cancel_event.is_set():
+            self._set(item, DownloadItem.CANCELLED)
+            return
+        self._set(item, DownloadItem.PROCESSING, "Merging video and audio...")
+        try:
+            streams = _requested_downloads(info)
+            with self._postprocessor_ydl(settings) as ydl:
+                to_delete, _ = FFmpegMergerPP(ydl).run({
+                    'filepath': final_path,
+                    'requested_formats': streams,
+                    '__files_to_merge': [stream['filepath'] for stream in streams],
+                })
+            _remove_files(to_delete)
+        except Exception as e:
+            self._fail(item, e)
+            return
+        self._finish(item, settings, final_path)
+
+    def _finish(self, item, settings, output):
+        item.output = output
+        if self.archive and item.video_id and output and os.path.exists(output):
+            try:
+                self.archive.record(item.video_id, archive_variant(settings), output, item.title)
+            except (sqlite3.Error, OSError) as e:
+                self._on_log(f"⚠️ Could not add {item.title} to the download archive: {e}")
+        self._set(item, DownloadItem.DONE, "", 1.0)
+        self._on_log(f"✅ {item.title}" + (f" → {Path(output).name}" if output else ""))
+
+
+def _process_info(ydl, item, raw_info, download):
+    """
+    Resolve the extracted info with ydl's options: a copy of a single video's
+    info is processed directly, anything else (playlists hold a lazy entries
+    generator that cannot be copied or reused) is extracted from the URL again
+    """
+    if raw_info.get('_type', 'video') == 'video':
+        return ydl.process_ie_result(copy.deepcopy(raw_info), download=download)
+    return ydl.extract_info(item.url, download=download)
+
+
+def _requested_downloads(info):
+    """Per-file info dicts of everything yt-dlp downloaded for info"""
+    downloads = []
+    for entry in info.get('entries') or [info]:
+        if entry:
+            downloads.extend(entry.get('requested_downloads') or [])
+    return downloads
+
+
+def _downloaded_files(info):
+    return [download['filepath'] for download in _requested_downloads(info) if download.get('filepath')]
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,111 @@
+"""
+Download Settings - Network options for the YouTube Downloader GUI
+- Parallel fragment downloads for DASH/HLS streams
+- Optional aria2c external downloader (several connections per file)
+- HTTP chunk size and rate limit
+- Skipping videos that are already in the download archive
+- Saved to a JSON config file, so the GUI remembers them between runs
+"""
+
+import json
+import shutil
+from pathlib import Path
+from yt_dlp.utils import parse_bytes
+
+
+# Config file (edit by hand or from the GUI)
+CONFIG_PATH = Path.home() / ".youtube_downloader_gui.json"
+
+DEFAULT_SETTINGS = {
+    'parallel_downloads': 3,  # URLs downloading at the same time
+    'concurrent_fragments': 4,  # DASH/HLS fragments per download (yt-dlp default is 1)
+    'downloader': 'native',  # 'native' (yt-dlp) or 'aria2c'
+    'aria2c_connections': 8,  # Connections per file with aria2c
+    'http_chunk_size_mb': 10,  # Request size for plain HTTP streams (0 = one request)
+    'rate_limit': '',  # Per download, e.g. '5M' or '500K' ('' = unlimited)
+    'skip_downloaded': True,  # Skip (or link) videos found in the download archive
+}
+
+DOWNLOADERS = ('native', 'aria2c')
+
+
+def load_settings(path=CONFIG_PATH):
+    """Defaults updated with the config file (unknown keys and bad values are ignored)"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return settings
+
+    if isinstance(saved, dict):
+        for key, default in DEFAULT_SETTINGS.items():
+            if isinstance(saved.get(key), type(default)):
+                settings[key] = saved[key]
+    if settings['downloader'] not in DOWNLOADERS:
+        settings['downloader'] = DEFAULT_SETTINGS['downloader']
+    return settings
+
+
+def save_settings(settings, path=CONFIG_PATH):
+    """Write the known settings to the config file, returns False if it cannot be written"""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({key: settings.get(key, default) for key, default in DEFAULT_SETTINGS.items()}, f, indent=2)
+    except OSError:
+        return False
+    return True
+
+
+def parse_rate_limit(text):
+    """'5M' / '500K' / '100000' -> bytes per second, None for unlimited; raises ValueError"""
+    text = str(text).strip()
+    if not text or text == '0':
+        return None
+    rate = parse_bytes(text)
+    if not rate:
+        raise ValueError(f"Invalid rate limit '{text}' (use e.g. 5M or 500K)")
+    return rate
+
+
+def find_aria2c(ffmpeg_location=None):
+    """aria2c executable (next to the bundled FFmpeg, then on PATH) or None"""
+    if ffmpeg_location:
+        for name in ('aria2c.exe', 'aria2c'):
+            candidate = Path(ffmpeg_location) / name
+            if candidate.exists():
+                return str(candidate)
+    return shutil.which('aria2c')
+
+
+def network_options(settings):
+    """
+    yt-dlp options for the network settings.
+
+    Returns (options, label): label names the download mode for the
+    throughput readout, e.g. "native ×4 fragments" or "aria2c ×8".
+    """
+    fragments = max(1, settings.get('concurrent_fragments', 1))
+    options = {'concurrent_fragment_downloads': fragments}
+
+    chunk_mb = settings.get('http_chunk_size_mb', 0)
+    if chunk_mb > 0:
+        options['http_chunk_size'] = chunk_mb * 1024 * 1024
+
+    rate = parse_rate_limit(settings.get('rate_limit', ''))
+    if rate:
+        options['ratelimit'] = rate
+
+    label = f"native ×{fragments} fragments"
+    aria2c = settings.get('aria2c_path')
+    if settings.get('downloader') == 'aria2c' and aria2c:
+        connections = max(1, settings.get('aria2c_connections', 1))
+        # yt-dlp falls back to its own downloader for protocols aria2c cannot handle
+        options['external_downloader'] = {'default': aria2c}
+        options['external_downloader_args'] = {
+            'aria2c': ['-x', str(connections), '-s', str(connections), '-k', '1M'],
+        }
+        label = f"aria2c ×{connections}"
+    if rate:
+        label += f", ≤{settings['rate_limit'].strip()}/s"
+    return options, label
@@ -0,0 +1,123 @@
+"""
+Metadata Cache - Extract each video's info once and reuse it
+- Keyed by YouTube video ID, so watch / youtu.be / shorts URLs share an entry
+- Kept in memory and on disk (gzip JSON), entries expire after a TTL because
+  the stream URLs inside the info are signed and stop working after a while
+- Re-queuing or retrying a URL starts downloading without a page round trip
+"""
+
+import copy
+import gzip
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from youtube_url import extract_video_id
+
+
+CACHE_DIR = Path.home() / ".cache" / "youtube_downloader_gui" / "metadata"
+METADATA_TTL = 60 * 60  # Seconds; YouTube stream URLs stay valid for ~6 hours
+
+
+def _is_cacheable(info):
+    # Live streams have growing, short-lived manifests; playlists change
+    return (info.get('_type', 'video') == 'video' and info.get('id')
+            and info.get('live_status') not in ('is_live', 'is_upcoming', 'post_live'))
+
+
+class MetadataCache:
+    """Thread-safe cache of unprocessed info dicts (extract_info(..., process=False))"""
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=METADATA_TTL):
+        """
+        Args:
+            cache_dir: Folder for the on-disk entries (None = memory only)
+            ttl: Seconds an entry stays valid
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.ttl = ttl
+        self._memory = {}  # Video ID -> (saved timestamp, info)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.json.gz"
+
+    def get(self, url):
+        """Cached info for url (a copy, safe to process) or None"""
+        key = extract_video_id(url)
+        if not key:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is None and self.cache_dir:
+            entry = self._load(key)
+            if entry is not None:
+                with self._lock:
+                    self._memory[key] = entry
+
+        if entry is None or time.time() - entry[0] > self.ttl:
+            return None
+        return copy.deepcopy(entry[1])
+
+    def put(self, info):
+        """Store an unprocessed info dict (live streams and playlists are skipped)"""
+        if not _is_cacheable(info):
+            return
+        # Callables (e.g. '__post_extractor') cannot be reused from a cache
+        info = copy.deepcopy({key: value for key, value in info.items() if not callable(value)})
+        entry = (time.time(), info)
+        with self._lock:
+            self._memory[info['id']] = entry
+        if self.cache_dir:
+            self._save(info['id'], entry)
+
+    def invalidate(self, url):
+        """Drop the entry for url (e.g. its stream URLs were rejected)"""
+        key = extract_video_id(url)
+        if not key:
+            return
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.cache_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def prune(self):
+        """Delete expired on-disk entries"""
+        if not self.cache_dir or not self.cache_dir.is_dir():
+            return
+        now = time.time()
+        for path in self.cache_dir.glob("*.json.gz"):
+            try:
+                if now - path.stat().st_mtime > self.ttl:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def _load(self, key):
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            return data['saved'], data['info']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save(self, key, entry):
+        path = self._path(key)
+        temp_path = path.with_name(path.name + ".part")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+                json.dump({'saved': entry[0], 'info': entry[1]}, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError):
+            # Not JSON-serializable or disk not writable: memory only
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
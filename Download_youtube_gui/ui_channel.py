@@ -0,0 +1,87 @@
+"""
+UI Channel - Thread-safe, throttled updates for the YouTube Downloader GUI
+- Tk is not thread-safe: worker threads never touch widgets, they post here
+- The main loop drains the channel on a fixed after() tick, so the UI cost
+  depends on the refresh rate, not on download speed or parallelism
+- Item updates are coalesced: however many progress callbacks arrive between
+  two ticks, each item is redrawn once with its latest state
+"""
+
+import threading
+
+
+# Refresh interval of the main loop tick (~15 updates per second)
+REFRESH_MS = 66
+
+
+class UIChannel:
+    """
+    Event channel between worker threads and the Tk main loop.
+
+    Any thread may call item_changed(), log() and call(); the callbacks given
+    to __init__ and the functions passed to call() only run on the main loop.
+    """
+
+    def __init__(self, window, on_items, on_log, interval_ms=REFRESH_MS):
+        """
+        Args:
+            window: Tk window (its after() drives the tick)
+            on_items: Called with the list of items changed since the last tick
+            on_log: Called with the list of log lines posted since the last tick
+            interval_ms: Tick interval in milliseconds
+        """
+        self.window = window
+        self.interval_ms = interval_ms
+        self._on_items = on_items
+        self._on_log = on_log
+        self._lock = threading.Lock()
+        self._items = {}  # Changed items (dict as an ordered set, state is read at drain time)
+        self._lines = []
+        self._calls = []
+        self._after_id = None
+
+    def item_changed(self, item):
+        """Mark an item for redraw (coalesced until the next tick)"""
+        with self._lock:
+            self._items[item] = None
+
+    def log(self, message):
+        """Queue a log line"""
+        with self._lock:
+            self._lines.append(message)
+
+    def call(self, func, *args):
+        """Run func(*args) on the main loop at the next tick"""
+        with self._lock:
+            self._calls.append((func, args))
+
+    def start(self):
+        """Start the tick (main thread)"""
+        if self._after_id is None:
+            self._after_id = self.window.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Stop the tick (main thread); pending events are dropped"""
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        # Schedule the next tick first: a modal dialog opened by a call keeps
+        # the event loop running, and the rows should keep updating meanwhile
+        self._after_id = self.window.after(self.interval_ms, self._tick)
+        self.drain()
+
+    def drain(self):
+        """Apply everything posted since the last tick (main thread)"""
+        with self._lock:
+            items, self._items = list(self._items), {}
+            lines, self._lines = self._lines, []
+            calls, self._calls = self._calls, []
+
+        if items:
+            self._on_items(items)
+        if lines:
+            self._on_log(lines)
+        for func, args in calls:
+            func(*args)
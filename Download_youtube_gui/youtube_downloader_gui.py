@@ -1,15 +1,23 @@
 """
 YouTube Downloader GUI - Modern Interface
 Download audio and video from YouTube with a beautiful, easy-to-use interface
+Paste many URLs (or load a .txt file) and they download in parallel
 """
 
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-import threading
 from pathlib import Path
-from yt_dlp import YoutubeDL
 import sys
 import os
+import sqlite3
+
+from download_archive import DownloadArchive
+from download_queue import DownloadQueue, DownloadItem
+from download_settings import (DOWNLOADERS, load_settings, save_settings, parse_rate_limit,
+                               find_aria2c, network_options)
+from metadata_cache import MetadataCache
+from ui_channel import UIChannel
+from youtube_url import extract_video_id, canonical_url
 
 
 def get_ffmpeg_path():
@@ -48,51 +56,91 @@ def validate_youtube_url(url):
 def clean_youtube_url(url):
     """Clean YouTube URL by removing playlist and other unnecessary parameters.
     This ensures only the single video is downloaded, not the entire playlist.
+    Every video URL form (watch, youtu.be, shorts, embed, live, /v/, music)
+    becomes the same watch URL, so duplicates are recognized.
     """
-    import re
-    from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-    
-    # Extract video ID from various URL formats
-    video_id = None
-    
-    # Standard watch URL
-    if 'youtube.com/watch' in url or 'music.youtube.com/watch' in url:
-        parsed = urlparse(url)
-        params = parse_qs(parsed.query)
-        if 'v' in params:
-            video_id = params['v'][0]
-            # Rebuild clean URL with only video ID
-            clean_params = {'v': video_id}
-            new_query = urlencode(clean_params)
-            clean_url = urlunparse((parsed.scheme or 'https', parsed.netloc, parsed.path, '', new_query, ''))
-            return clean_url
+    video_id = extract_video_id(url)
+    if video_id:
+        return canonical_url(video_id)
     
-    # Short URL (youtu.be)
-    if 'youtu.be/' in url:
-        parsed = urlparse(url)
-        video_id = parsed.path.strip('/')
-        return f'https://youtu.be/{video_id}'
-    
-    # Shorts URL
-    if '/shorts/' in url:
-        match = re.search(r'/shorts/([a-zA-Z0-9_-]+)', url)
-        if match:
-            video_id = match.group(1)
-            return f'https://www.youtube.com/shorts/{video_id}'
-    
-    # If can't clean, return original
+    # If can't clean (e.g. a playlist), return original
     return url
 
+
+def parse_url_list(text):
+    """Split pasted text or a .txt file into URLs (one per line, lines starting with # are skipped)"""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.extend(line.split())
+    return urls
+
 # Set appearance
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# Row colors per state
+STATE_COLORS = {
+    DownloadItem.QUEUED: "gray60",
+    DownloadItem.DOWNLOADING: "#60a5fa",
+    DownloadItem.PROCESSING: "#fbbf24",
+    DownloadItem.DONE: "#4ade80",
+    DownloadItem.FAILED: "#f87171",
+    DownloadItem.CANCELLED: "gray60",
+}
+
+
+class QueueRow:
+    """One row of the download queue: title, progress bar, status and cancel button"""
+    
+    def __init__(self, parent, item):
+        self.item = item
+        self.frame = ctk.CTkFrame(parent)
+        self.frame.pack(fill="x", padx=5, pady=3)
+        self.frame.grid_columnconfigure(0, weight=1)
+        
+        self.title_label = ctk.CTkLabel(self.frame, text=item.url, font=("Roboto", 12), anchor="w")
+        self.title_label.grid(row=0, column=0, sticky="we", padx=8, pady=(4, 0))
+        
+        self.cancel_btn = ctk.CTkButton(
+            self.frame,
+            text="✖",
+            width=28,
+            height=24,
+            fg_color="transparent",
+            hover_color="#b91c1c",
+            command=item.cancel
+        )
+        self.cancel_btn.grid(row=0, column=1, rowspan=2, padx=6)
+        
+        self.progress_bar = ctk.CTkProgressBar(self.frame, height=8)
+        self.progress_bar.grid(row=1, column=0, sticky="we", padx=8, pady=2)
+        self.progress_bar.set(0)
+        
+        self.status_label = ctk.CTkLabel(self.frame, text=item.state, font=("Consolas", 10), anchor="w")
+        self.status_label.grid(row=2, column=0, sticky="we", padx=8, pady=(0, 4))
+    
+    def refresh(self):
+        """Redraw from the item's current state"""
+        item = self.item
+        title = item.title or item.url
+        self.title_label.configure(text=title if len(title) <= 70 else title[:67] + "...")
+        self.progress_bar.set(item.progress)
+        status = f"{item.state}  {item.detail}".strip()
+        self.status_label.configure(text=status, text_color=STATE_COLORS.get(item.state, "gray60"))
+        if item.finished:
+            self.cancel_btn.configure(state="disabled")
+    
+    def destroy(self):
+        self.frame.destroy()
+
 
 class YouTubeDownloaderGUI:
     def __init__(self):
         self.window = ctk.CTk()
         self.window.title("YouTube Downloader")
-        self.window.geometry("700x600")
+        self.window.geometry("720x900")
         self.window.resizable(False, False)
         
         # Set window icon
@@ -103,11 +151,24 @@ class YouTubeDownloaderGUI:
         # Default settings
         self.download_mode = "audio"  # audio or video
         self.output_path = str(Path.home() / "Downloads")
-        self.is_downloading = False
-        self.cancel_requested = False
-        self.current_ydl = None  # Store current YoutubeDL instance for cancellation
+        self.config = load_settings()  # Network settings (saved on every download)
+        self.queue = None  # DownloadQueue, created when the first URLs are added
+        self.rows = {}  # DownloadItem -> QueueRow
+        # Video info by ID, shared by all queues (re-queued URLs skip extraction)
+        self.metadata_cache = MetadataCache()
+        self.metadata_cache.prune()
+        # Workers post row updates, log lines and callbacks here; the main loop applies them
+        self.ui = UIChannel(self.window, on_items=self.refresh_items, on_log=self.write_log)
+        # Finished files by video ID (re-pasted URLs are skipped or linked)
+        try:
+            self.archive = DownloadArchive()
+        except (sqlite3.Error, OSError) as e:
+            self.archive = None
+            self.log(f"⚠️ Download archive unavailable: {e}")
         
         self.setup_ui()
+        self.ui.start()
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def _get_icon_path(self):
         """Find icon.ico - works for both source and bundled .exe"""
@@ -131,11 +192,11 @@ class YouTubeDownloaderGUI:
             text="🎬 YouTube Downloader",
             font=("Roboto", 28, "bold")
         )
-        title.pack(pady=20)
+        title.pack(pady=(15, 10))
         
         # Mode selection frame
         mode_frame = ctk.CTkFrame(self.window)
-        mode_frame.pack(pady=10, padx=40, fill="x")
+        mode_frame.pack(pady=5, padx=40, fill="x")
         
         mode_label = ctk.CTkLabel(mode_frame, text="Mode:", font=("Roboto", 14))
         mode_label.pack(side="left", padx=10)
@@ -162,24 +223,36 @@ class YouTubeDownloaderGUI:
         )
         video_radio.pack(side="left", padx=10)
         
-        # URL input
+        # URL input (one URL per line)
         url_frame = ctk.CTkFrame(self.window)
-        url_frame.pack(pady=10, padx=40, fill="x")
+        url_frame.pack(pady=5, padx=40, fill="x")
         
-        url_label = ctk.CTkLabel(url_frame, text="YouTube URL:", font=("Roboto", 13))
-        url_label.pack(anchor="w", padx=10, pady=5)
+        url_header = ctk.CTkFrame(url_frame, fg_color="transparent")
+        url_header.pack(fill="x", padx=10, pady=(5, 0))
         
-        self.url_entry = ctk.CTkEntry(
-            url_frame,
-            placeholder_text="https://www.youtube.com/watch?v=...",
-            height=40,
+        url_label = ctk.CTkLabel(url_header, text="YouTube URLs (one per line):", font=("Roboto", 13))
+        url_label.pack(side="left")
+        
+        load_btn = ctk.CTkButton(
+            url_header,
+            text="📄 Load .txt",
+            width=100,
+            command=self.load_url_file,
             font=("Roboto", 12)
         )
-        self.url_entry.pack(fill="x", padx=10, pady=5)
+        load_btn.pack(side="right")
+        
+        self.url_text = ctk.CTkTextbox(
+            url_frame,
+            height=80,
+            font=("Roboto", 12),
+            wrap="none"
+        )
+        self.url_text.pack(fill="x", padx=10, pady=5)
         
         # Format and Quality selection
         options_frame = ctk.CTkFrame(self.window)
-        options_frame.pack(pady=10, padx=40, fill="x")
+        options_frame.pack(pady=5, padx=40, fill="x")
         
         # Format dropdown
         format_label = ctk.CTkLabel(options_frame, text="Format:", font=("Roboto", 13))
@@ -190,10 +263,10 @@ class YouTubeDownloaderGUI:
             options_frame,
             values=["mp3", "flac", "wav", "m4a"],
             variable=self.format_var,
-            width=150,
+            width=110,
             font=("Roboto", 12)
         )
-        self.format_dropdown.grid(row=0, column=1, padx=10, pady=5)
+        self.format_dropdown.grid(row=0, column=1, padx=5, pady=5)
         
         # Quality dropdown
         quality_label = ctk.CTkLabel(options_frame, text="Quality:", font=("Roboto", 13))
@@ -204,14 +277,106 @@ class YouTubeDownloaderGUI:
             options_frame,
             values=["best", "320", "256", "192"],
             variable=self.quality_var,
-            width=150,
+            width=110,
             font=("Roboto", 12)
         )
-        self.quality_dropdown.grid(row=0, column=3, padx=10, pady=5)
+        self.quality_dropdown.grid(row=0, column=3, padx=5, pady=5)
+        
+        # Parallel downloads dropdown
+        parallel_label = ctk.CTkLabel(options_frame, text="Parallel:", font=("Roboto", 13))
+        parallel_label.grid(row=0, column=4, padx=10, pady=5, sticky="w")
+        
+        self.parallel_var = ctk.StringVar(value=str(self.config['parallel_downloads']))
+        self.parallel_dropdown = ctk.CTkOptionMenu(
+            options_frame,
+            values=[str(n) for n in range(1, 7)],
+            variable=self.parallel_var,
+            width=60,
+            font=("Roboto", 12)
+        )
+        self.parallel_dropdown.grid(row=0, column=5, padx=5, pady=5)
+        
+        # Network settings (saved to the config file)
+        network_frame = ctk.CTkFrame(self.window)
+        network_frame.pack(pady=5, padx=40, fill="x")
+        
+        fragments_label = ctk.CTkLabel(network_frame, text="Fragments:", font=("Roboto", 13))
+        fragments_label.grid(row=0, column=0, padx=10, pady=5, sticky="w")
+        
+        self.fragments_var = ctk.StringVar(value=str(self.config['concurrent_fragments']))
+        fragments_dropdown = ctk.CTkOptionMenu(
+            network_frame,
+            values=["1", "2", "4", "8", "16"],
+            variable=self.fragments_var,
+            width=60,
+            font=("Roboto", 12)
+        )
+        fragments_dropdown.grid(row=0, column=1, padx=5, pady=5)
+        
+        downloader_label = ctk.CTkLabel(network_frame, text="Downloader:", font=("Roboto", 13))
+        downloader_label.grid(row=0, column=2, padx=10, pady=5, sticky="w")
+        
+        self.downloader_var = ctk.StringVar(value=self.config['downloader'])
+        downloader_dropdown = ctk.CTkOptionMenu(
+            network_frame,
+            values=list(DOWNLOADERS),
+            variable=self.downloader_var,
+            width=90,
+            font=("Roboto", 12)
+        )
+        downloader_dropdown.grid(row=0, column=3, padx=5, pady=5)
+        
+        connections_label = ctk.CTkLabel(network_frame, text="Connections:", font=("Roboto", 13))
+        connections_label.grid(row=0, column=4, padx=10, pady=5, sticky="w")
+        
+        self.connections_var = ctk.StringVar(value=str(self.config['aria2c_connections']))
+        connections_dropdown = ctk.CTkOptionMenu(
+            network_frame,
+            values=["2", "4", "8", "16"],
+            variable=self.connections_var,
+            width=60,
+            font=("Roboto", 12)
+        )
+        connections_dropdown.grid(row=0, column=5, padx=5, pady=5)
+        
+        chunk_label = ctk.CTkLabel(network_frame, text="Chunk (MB):", font=("Roboto", 13))
+        chunk_label.grid(row=1, column=0, padx=10, pady=5, sticky="w")
+        
+        self.chunk_var = ctk.StringVar(value=str(self.config['http_chunk_size_mb']))
+        chunk_dropdown = ctk.CTkOptionMenu(
+            network_frame,
+            values=["0", "1", "5", "10", "20", "50"],
+            variable=self.chunk_var,
+            width=60,
+            font=("Roboto", 12)
+        )
+        chunk_dropdown.grid(row=1, column=1, padx=5, pady=5)
+        
+        rate_label = ctk.CTkLabel(network_frame, text="Rate limit:", font=("Roboto", 13))
+        rate_label.grid(row=1, column=2, padx=10, pady=5, sticky="w")
+        
+        self.rate_entry = ctk.CTkEntry(
+            network_frame,
+            width=90,
+            placeholder_text="e.g. 5M",
+            font=("Roboto", 12)
+        )
+        if self.config['rate_limit']:
+            self.rate_entry.insert(0, self.config['rate_limit'])
+        self.rate_entry.grid(row=1, column=3, padx=5, pady=5)
+        
+        self.skip_var = ctk.BooleanVar(value=self.config['skip_downloaded'])
+        skip_check = ctk.CTkCheckBox(
+            network_frame,
+            text="Skip downloaded",
+            variable=self.skip_var,
+            font=("Roboto", 12)
+        )
+        skip_check.grid(row=1, column=4, columnspan=2, padx=10, pady=5, sticky="w")
         
         # Output directory
         output_frame = ctk.CTkFrame(self.window)
-        output_frame.pack(pady=10, padx=40, fill="x")
+        output_frame.pack(pady=5, padx=40, fill="x")
         
         output_label = ctk.CTkLabel(output_frame, text="Save to:", font=("Roboto", 13))
         output_label.pack(anchor="w", padx=10, pady=5)
@@ -238,9 +403,9 @@ class YouTubeDownloaderGUI:
         
         # Buttons frame - Download and Cancel side by side
         btn_frame = ctk.CTkFrame(self.window, fg_color="transparent")
-        btn_frame.pack(pady=15, padx=40, fill="x")
+        btn_frame.pack(pady=10, padx=40, fill="x")
         
-        # Download button
+        # Download button (adds the URLs to the queue, works while downloading)
         self.download_btn = ctk.CTkButton(
             btn_frame,
             text="⬇ Download",
@@ -252,10 +417,21 @@ class YouTubeDownloaderGUI:
         )
         self.download_btn.pack(side="left", fill="x", expand=True, padx=(0, 5))
         
-        # Cancel button (always visible, disabled by default)
+        # Clear finished rows
+        self.clear_btn = ctk.CTkButton(
+            btn_frame,
+            text="🧹 Clear",
+            height=45,
+            font=("Roboto", 14, "bold"),
+            command=self.clear_finished,
+            width=100
+        )
+        self.clear_btn.pack(side="left", padx=5)
+        
+        # Cancel button (cancels the whole queue, disabled while idle)
         self.cancel_btn = ctk.CTkButton(
             btn_frame,
-            text="❌ Cancel",
+            text="❌ Cancel All",
             height=45,
             font=("Roboto", 14, "bold"),
             command=self.cancel_download,
@@ -266,19 +442,33 @@ class YouTubeDownloaderGUI:
         )
         self.cancel_btn.pack(side="left", padx=(5, 0))
         
-        # Progress bar
-        self.progress_bar = ctk.CTkProgressBar(self.window, height=20)
-        self.progress_bar.pack(pady=10, padx=40, fill="x")
+        # Overall progress bar (finished items / all items)
+        self.progress_bar = ctk.CTkProgressBar(self.window, height=14)
+        self.progress_bar.pack(pady=5, padx=40, fill="x")
         self.progress_bar.set(0)
         
+        # Throughput readout (current total speed + average per download mode)
+        self.speed_label = ctk.CTkLabel(
+            self.window,
+            text="",
+            font=("Consolas", 11),
+            anchor="w",
+            justify="left"
+        )
+        self.speed_label.pack(padx=40, fill="x")
+        
+        # Download queue rows
+        self.queue_frame = ctk.CTkScrollableFrame(self.window, height=220, label_text="Queue")
+        self.queue_frame.pack(pady=5, padx=40, fill="x")
+        
         # Status text
         self.status_text = ctk.CTkTextbox(
             self.window,
-            height=150,
+            height=100,
             font=("Consolas", 11),
             wrap="word"
         )
-        self.status_text.pack(pady=10, padx=40, fill="both", expand=True)
+        self.status_text.pack(pady=(5, 15), padx=40, fill="both", expand=True)
         self.log("Ready to download 🚀")
         
     def on_mode_change(self):
@@ -310,210 +500,214 @@ class YouTubeDownloaderGUI:
             self.output_entry.insert(0, folder)
             self.log(f"Output directory: {folder}")
     
+    def load_url_file(self):
+        """Append URLs from a text file to the URL box"""
+        path = filedialog.askopenfilename(
+            title="Load URL list",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                urls = parse_url_list(f.read())
+        except OSError as e:
+            messagebox.showerror("Error", f"Cannot read file:\n{e}")
+            return
+        
+        existing = self.url_text.get("1.0", "end").strip()
+        self.url_text.insert("end", ("\n" if existing else "") + "\n".join(urls))
+        self.log(f"Loaded {len(urls)} URL(s) from {Path(path).name}")
+    
     def log(self, message):
-        """Add message to status text"""
-        self.status_text.insert("end", f"{message}\n")
+        """Add message to status text (safe from any thread, shown at the next UI tick)"""
+        self.ui.log(message)
+    
+    def write_log(self, lines):
+        """Append log lines to the status text in one insert (main loop only)"""
+        self.status_text.insert("end", "".join(f"{line}\n" for line in lines))
         self.status_text.see("end")
     
-    def progress_hook(self, d):
-        """Progress callback for yt-dlp"""
-        if d['status'] == 'downloading':
-            try:
-                # Calculate progress percentage
-                if 'total_bytes' in d:
-                    progress = d['downloaded_bytes'] / d['total_bytes']
-                elif 'total_bytes_estimate' in d:
-                    progress = d['downloaded_bytes'] / d['total_bytes_estimate']
-                else:
-                    progress = 0
-                
-                # Update progress bar
-                self.progress_bar.set(progress)
-                
-                # Speed and ETA
-                speed = d.get('speed', 0)
-                eta = d.get('eta', 0)
-                
-                if speed and eta:
-                    speed_mb = speed / 1024 / 1024
-                    self.window.title(f"Downloading... {progress*100:.1f}% | {speed_mb:.1f} MB/s | ETA: {eta}s")
-                    
-            except Exception as e:
-                pass
-                
-        elif d['status'] == 'finished':
-            self.progress_bar.set(1.0)
-            self.window.title("YouTube Downloader")
+    def refresh_items(self, items):
+        """Redraw rows of items that changed since the last UI tick (main loop only)"""
+        for item in items:
+            row = self.rows.get(item)
+            if row:
+                row.refresh()
+        self.update_overall_progress()
     
-    def download_worker(self):
-        """Worker thread for downloading"""
-        url = self.url_entry.get().strip()
-        
-        if not url:
-            messagebox.showerror("Error", "Please enter a YouTube URL")
-            self.reset_download_state()
-            return
-        
-        if not validate_youtube_url(url):
-            messagebox.showerror("Error", "Invalid YouTube URL\n\nSupported formats:\n• youtube.com/watch?v=...\n• youtu.be/...\n• youtube.com/shorts/...\n• music.youtube.com/...")
-            self.reset_download_state()
+    def update_overall_progress(self):
+        """Overall progress bar, window title and buttons"""
+        self.update_throughput()
+        items = list(self.rows)
+        if not items:
+            self.progress_bar.set(0)
             return
         
-        # Clean URL to remove playlist parameters
-        clean_url = clean_youtube_url(url)
-        if clean_url != url:
-            self.log(f"Cleaned URL: {clean_url}")
-        
-        output_dir = self.output_entry.get()
-        Path(output_dir).mkdir(exist_ok=True, parents=True)
-        
-        try:
-            self.log(f"\n{'='*50}")
-            self.log(f"Starting download...")
-            self.log(f"URL: {clean_url}")
-            self.log(f"Mode: {self.download_mode.upper()}")
-            
-            if self.download_mode == "audio":
-                self.download_audio(clean_url, output_dir)
-            else:
-                self.download_video(clean_url, output_dir)
-            
-            # Check if cancelled
-            if self.cancel_requested:
-                self.log(f"\n⚠️ Download cancelled by user")
-            
-        except Exception as e:
-            if self.cancel_requested:
-                self.log(f"\n⚠️ Download cancelled")
-            else:
-                self.log(f"\n❌ Error: {str(e)}")
-                messagebox.showerror("Download Error", str(e))
-        finally:
-            self.reset_download_state()
+        finished = sum(item.finished for item in items)
+        self.progress_bar.set(sum(1.0 if item.finished else item.progress * 0.99 for item in items) / len(items))
+        active = finished < len(items)
+        if active:
+            running = sum(item.state == DownloadItem.DOWNLOADING for item in items)
+            self.window.title(f"YouTube Downloader - {finished}/{len(items)} done, {running} downloading")
+            self.cancel_btn.configure(state="normal")
+        else:
+            self.window.title("YouTube Downloader")
+            self.cancel_btn.configure(state="disabled")
+    
+    def update_throughput(self):
+        """Current total speed and the measured average of each download mode"""
+        lines = []
+        speed = sum(item.speed or 0 for item in self.rows if item.state == DownloadItem.DOWNLOADING)
+        if speed:
+            lines.append(f"↓ {speed / 1024 / 1024:.1f} MB/s total")
+        if self.queue:
+            for label, (size, seconds, files) in self.queue.throughput().items():
+                lines.append(f"{label}: {size / seconds / 1024 / 1024:.1f} MB/s per file ({files} file(s))")
+        self.speed_label.configure(text="\n".join(lines))
+    
+    def on_queue_finished(self):
+        """All queued items are finished (posted by the queue, runs on the main loop)"""
+        if self.queue and self.queue.active:
+            return  # More URLs were added before this reached the main loop
+        items = list(self.rows)
+        done = sum(item.state == DownloadItem.DONE for item in items)
+        failed = sum(item.state == DownloadItem.FAILED for item in items)
+        cancelled = sum(item.state == DownloadItem.CANCELLED for item in items)
+        
+        self.reset_download_state()
+        self.log(f"\n{'='*50}")
+        self.log(f"Queue finished: {done} done, {failed} failed, {cancelled} cancelled")
+        if done:
+            messagebox.showinfo(
+                "Success",
+                f"Downloads complete!\n\n{done} done, {failed} failed\n\nSaved to:\n{self.output_entry.get()}"
+            )
     
     def reset_download_state(self):
-        """Reset UI state after download completes or is cancelled"""
-        self.is_downloading = False
-        self.cancel_requested = False
-        self.current_ydl = None
-        self.download_btn.configure(state="normal", text="⬇ Download")
-        self.cancel_btn.configure(state="disabled", text="❌ Cancel")
-        self.progress_bar.set(0)
+        """Reset UI state after the queue completes or is cancelled"""
+        self.cancel_btn.configure(state="disabled", text="❌ Cancel All")
         self.window.title("YouTube Downloader")
     
     def cancel_download(self):
-        """Cancel the current download"""
-        if self.is_downloading:
-            self.cancel_requested = True
-            self.log("\n⏹️ Cancelling download...")
+        """Cancel every queued and running download"""
+        if self.queue and self.queue.active:
+            self.queue.cancel_all()
+            self.log("\n⏹️ Cancelling all downloads...")
             self.cancel_btn.configure(state="disabled", text="Cancelling...")
     
-    def download_audio(self, url, output_dir):
-        """Download audio"""
-        format_codec = self.format_var.get()
-        quality = self.quality_var.get()
-        
-        quality_map = {'best': '0', '320': '320K', '256': '256K', '192': '192K', '128': '128K'}
-        audio_quality = quality_map.get(quality, '0')
-        
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': f'{output_dir}/%(title)s.%(ext)s',
-            'noplaylist': True,  # Download single video only, not playlist
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': format_codec,
-                'preferredquality': audio_quality,
-            }],
-            'progress_hooks': [self.progress_hook],
-        }
-        
-        # Add FFmpeg path if bundled
-        ffmpeg_path = get_ffmpeg_path()
-        if ffmpeg_path:
-            ydl_opts['ffmpeg_location'] = ffmpeg_path
-        
-        with YoutubeDL(ydl_opts) as ydl:
-            self.current_ydl = ydl  # Store for potential cancellation
-            info = ydl.extract_info(url, download=False)
-            
-            if self.cancel_requested:
-                return
-            
-            title = info.get('title', 'Unknown')
-            self.log(f"Title: {title}")
-            self.log(f"Format: {format_codec.upper()}")
-            self.log(f"Quality: {quality}")
-            self.log(f"\nDownloading...")
-            
-            ydl.download([url])
-        
-        if not self.cancel_requested:
-            self.log(f"\n✅ Download complete!")
-            self.log(f"Saved to: {output_dir}")
-            messagebox.showinfo("Success", f"Download complete!\n\nSaved to:\n{output_dir}")
+    def clear_finished(self):
+        """Remove finished rows from the queue list"""
+        for item in [item for item in self.rows if item.finished]:
+            self.rows.pop(item).destroy()
+        if self.queue:
+            self.queue.clear_finished()
+        self.update_overall_progress()
     
-    def download_video(self, url, output_dir):
-        """Download video"""
-        quality = self.quality_var.get()
-        
-        quality_map = {
-            'best': 'bestvideo+bestaudio/best',
-            '1080p': 'bestvideo[height<=1080]+bestaudio/best[height<=1080]',
-            '720p': 'bestvideo[height<=720]+bestaudio/best[height<=720]',
-            '480p': 'bestvideo[height<=480]+bestaudio/best[height<=480]',
-            '360p': 'bestvideo[height<=360]+bestaudio/best[height<=360]',
-        }
-        
-        video_format = quality_map.get(quality, 'best')
-        
-        ydl_opts = {
-            'format': video_format,
-            'outtmpl': f'{output_dir}/%(title)s.%(ext)s',
-            'noplaylist': True,  # Download single video only, not playlist
-            'merge_output_format': 'mp4',
-            'progress_hooks': [self.progress_hook],
+    def _network_settings(self):
+        """Download settings from the UI (raises ValueError for a bad rate limit)"""
+        settings = {
+            'parallel_downloads': int(self.parallel_var.get()),
+            'concurrent_fragments': int(self.fragments_var.get()),
+            'downloader': self.downloader_var.get(),
+            'aria2c_connections': int(self.connections_var.get()),
+            'http_chunk_size_mb': int(self.chunk_var.get()),
+            'rate_limit': self.rate_entry.get().strip(),
+            'skip_downloaded': bool(self.skip_var.get()),
         }
-        
-        # Add FFmpeg path if bundled
-        ffmpeg_path = get_ffmpeg_path()
-        if ffmpeg_path:
-            ydl_opts['ffmpeg_location'] = ffmpeg_path
-        
-        with YoutubeDL(ydl_opts) as ydl:
-            self.current_ydl = ydl  # Store for potential cancellation
-            info = ydl.extract_info(url, download=False)
-            
-            if self.cancel_requested:
-                return
-            
-            title = info.get('title', 'Unknown')
-            self.log(f"Title: {title}")
-            self.log(f"Quality: {quality}")
-            self.log(f"\nDownloading...")
-            
-            ydl.download([url])
-        
-        if not self.cancel_requested:
-            self.log(f"\n✅ Download complete!")
-            self.log(f"Saved to: {output_dir}")
-            messagebox.showinfo("Success", f"Download complete!\n\nSaved to:\n{output_dir}")
+        parse_rate_limit(settings['rate_limit'])
+        return settings
+    
+    def _get_queue(self):
+        """Queue with the selected parallelism (recreated only while idle)"""
+        parallel = int(self.parallel_var.get())
+        if self.queue and (self.queue.active or self.queue.max_downloads == parallel):
+            if self.queue.max_downloads != parallel:
+                self.log("ℹ️ Parallel downloads change applies once the current queue is finished")
+            return self.queue
+        
+        if self.queue:
+            self.queue.shutdown()
+        self.queue = DownloadQueue(
+            max_downloads=parallel,
+            on_update=self.ui.item_changed,
+            on_log=self.ui.log,
+            on_idle=lambda: self.ui.call(self.on_queue_finished),
+            metadata_cache=self.metadata_cache,
+            archive=self.archive
+        )
+        return self.queue
     
     def start_download(self):
-        """Start download in separate thread"""
-        if self.is_downloading:
+        """Add every URL in the URL box to the download queue"""
+        urls = parse_url_list(self.url_text.get("1.0", "end"))
+        if not urls:
+            messagebox.showerror("Error", "Please enter at least one YouTube URL")
             return
         
-        self.is_downloading = True
-        self.cancel_requested = False
-        self.download_btn.configure(state="disabled", text="⏳ Downloading...")
-        
-        # Enable cancel button
-        self.cancel_btn.configure(state="normal", text="❌ Cancel")
+        valid = []
+        for url in urls:
+            if not validate_youtube_url(url):
+                self.log(f"❌ Invalid YouTube URL skipped: {url}")
+                continue
+            # Clean URL to remove playlist parameters
+            clean_url = clean_youtube_url(url)
+            if clean_url not in valid:
+                valid.append(clean_url)
+        
+        if not valid:
+            messagebox.showerror("Error", "Invalid YouTube URL\n\nSupported formats:\n• youtube.com/watch?v=...\n• youtu.be/...\n• youtube.com/shorts/...\n• music.youtube.com/...")
+            return
         
-        # Run download in thread to prevent UI freeze
-        thread = threading.Thread(target=self.download_worker, daemon=True)
-        thread.start()
+        try:
+            network = self._network_settings()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if network != {key: self.config[key] for key in network}:
+            self.config.update(network)
+            if not save_settings(self.config):
+                self.log("⚠️ Could not save settings to the config file")
+        
+        settings = {
+            "mode": self.download_mode,
+            "format": self.format_var.get(),
+            "quality": self.quality_var.get(),
+            "output_dir": self.output_entry.get(),
+            "ffmpeg_location": get_ffmpeg_path(),
+            **network,
+        }
+        settings["aria2c_path"] = find_aria2c(settings["ffmpeg_location"]) if network['downloader'] == "aria2c" else None
+        if network['downloader'] == "aria2c" and not settings["aria2c_path"]:
+            self.log("⚠️ aria2c not found - using the native downloader")
+        
+        queue = self._get_queue()
+        self.log(f"\n{'='*50}")
+        self.log(f"Queued {len(valid)} {self.download_mode} download(s) - {queue.max_downloads} at a time, "
+                 f"{network_options(settings)[1]}")
+        
+        for url in valid:
+            item = queue.submit(url, settings)
+            if item is None:
+                self.log(f"ℹ️ Already in the queue: {url}")
+                continue
+            self.rows[item] = QueueRow(self.queue_frame, item)
+        
+        self.url_text.delete("1.0", "end")
+        self.cancel_btn.configure(state="normal", text="❌ Cancel All")
+        self.update_overall_progress()
+    
+    def on_close(self):
+        """Cancel downloads and close the window"""
+        if self.queue and self.queue.active:
+            if not messagebox.askyesno("Quit", "Downloads are still running. Cancel them and quit?"):
+                return
+        if self.queue:
+            self.queue.shutdown()
+        if self.archive:
+            self.archive.close()
+        self.ui.stop()
+        self.window.destroy()
     
     def run(self):
         """Run the application"""
@@ -0,0 +1,35 @@
+"""
+YouTube URL helpers - Video ID extraction and canonical URLs
+Covers every video URL form the GUI accepts (watch, youtu.be, shorts, embed,
+live, /v/, music), with or without scheme, so the same video is recognized
+however it was pasted
+"""
+
+import re
+
+
+_VIDEO_ID = r'(?P<id>[0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])'
+
+VIDEO_URL_PATTERNS = [
+    re.compile(
+        r'^(?:https?://)?(?:(?:www|m|music)\.)?youtube(?:-nocookie)?\.com/'
+        r'(?:watch/?\?(?:[^#]*&)?v=|shorts/|embed/|live/|v/|e/)' + _VIDEO_ID,
+        re.IGNORECASE
+    ),
+    re.compile(r'^(?:https?://)?(?:www\.)?youtu\.be/' + _VIDEO_ID, re.IGNORECASE),
+]
+
+
+def extract_video_id(url):
+    """11-character video ID of a YouTube video URL, None for playlists and other URLs"""
+    url = url.strip()
+    for pattern in VIDEO_URL_PATTERNS:
+        match = pattern.match(url)
+        if match:
+            return match.group('id')
+    return None
+
+
+def canonical_url(video_id):
+    """Standard watch URL of a video ID"""
+    return f'https://www.youtube.com/watch?v={video_id}'
@@ -0,0 +1,135 @@
+"""
+Batched mask prediction for rembg sessions
+Stack several images into one NCHW tensor and run the ONNX model once
+"""
+from typing import List, Optional
+import numpy as np
+from PIL import Image
+
+
+# Preprocessing per rembg model: (mean, std, input size), as in rembg's sessions
+MODEL_INPUTS = {
+    'u2net': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'u2netp': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'u2net_human_seg': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'silueta': ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    'isnet-general-use': ((0.485, 0.456, 0.406), (1.0, 1.0, 1.0), (1024, 1024)),
+    'isnet-anime': ((0.485, 0.456, 0.406), (1.0, 1.0, 1.0), (1024, 1024)),
+}
+
+
+def supports_batching(session) -> bool:
+    """
+    Check if a rembg session can take several images per run
+
+    Args:
+        session: Session from rembg.new_session()
+
+    Returns:
+        True if the model is a known single-mask model with a dynamic batch dimension
+    """
+    if getattr(session, 'model_name', None) not in MODEL_INPUTS:
+        return False
+
+    batch_dim = session.inner_session.get_inputs()[0].shape[0]
+    # Symbolic ("batch_size") or unknown (None) = dynamic; a fixed 1 cannot batch
+    return not isinstance(batch_dim, int) or batch_dim > 1
+
+
+def preprocess(image: Image.Image, mean, std, size) -> np.ndarray:
+    """
+    Resize and normalize one image to a CHW float32 array (rembg's normalize)
+
+    Args:
+        image: Input image (any mode)
+        mean: Per-channel mean
+        std: Per-channel standard deviation
+        size: Model input size (width, height)
+
+    Returns:
+        Array of shape (3, height, width)
+    """
+    im = np.asarray(image.convert('RGB').resize(size, Image.LANCZOS), dtype=np.float32)
+    im /= max(float(im.max()), 1e-6)
+    im -= np.asarray(mean, dtype=np.float32)
+    im /= np.asarray(std, dtype=np.float32)
+    return im.transpose((2, 0, 1))
+
+
+def naive_cutout(image: Image.Image, mask: Image.Image) -> Image.Image:
+    """Keep the pixels under the mask, transparent elsewhere (rembg's default cutout)"""
+    empty = Image.new('RGBA', image.size, 0)
+    return Image.composite(image, empty, mask)
+
+
+class BatchPredictor:
+    """
+    Predict masks for many images with one ONNX run per batch.
+
+    The batch size adapts to available memory: a failed run (e.g. out of
+    GPU memory) halves it and retries, and it grows back slowly after a
+    streak of successful runs.
+    """
+
+    def __init__(self, session, max_batch_size: int = 8, grow_after: int = 50):
+        """
+        Args:
+            session: Session from rembg.new_session() (see supports_batching)
+            max_batch_size: Upper bound on images per run
+            grow_after: Successful runs before trying a larger batch again
+        """
+        self.session = session
+        self.mean, self.std, self.size = MODEL_INPUTS[session.model_name]
+        self.input_name = session.inner_session.get_inputs()[0].name
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_size = self.max_batch_size
+        self.grow_after = grow_after
+        self._streak = 0
+
+    def _run(self, images: List[Image.Image]) -> List[Image.Image]:
+        batch = np.stack([preprocess(img, self.mean, self.std, self.size) for img in images])
+        pred = self.session.inner_session.run(None, {self.input_name: batch})[0][:, 0, :, :]
+
+        masks = []
+        for item, image in zip(pred, images):
+            # Min-max per image, like rembg's single-image predict
+            lo, hi = float(item.min()), float(item.max())
+            item = (item - lo) / max(hi - lo, 1e-6)
+            mask = Image.fromarray((item * 255).astype('uint8'), mode='L')
+            masks.append(mask.resize(image.size, Image.LANCZOS))
+        return masks
+
+    def predict(self, images: List[Image.Image]) -> List[Optional[Image.Image]]:
+        """
+        Predict one mask per image
+
+        Args:
+            images: Decoded images (orientation already fixed)
+
+        Returns:
+            Masks in input order (None where even a batch of one failed)
+        """
+        masks = []
+        start = 0
+
+        while start < len(images):
+            chunk = images[start:start + self.batch_size]
+            try:
+                masks.extend(self._run(chunk))
+            except Exception as e:
+                if len(chunk) > 1:
+                    self.batch_size = max(1, len(chunk) // 2)
+                    self._streak = 0
+                    print(f"\n⚠️  Batch of {len(chunk)} failed ({str(e)[:80]}), "
+                          f"retrying with batch size {self.batch_size}")
+                    continue
+                print(f"\n❌ Inference failed: {str(e)}")
+                masks.append(None)
+
+            start += len(chunk)
+            self._streak += 1
+            if self._streak >= self.grow_after and self.batch_size < self.max_batch_size:
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+                self._streak = 0
+
+        return masks
@@ -0,0 +1,110 @@
+"""
+Output encoders for background removal results
+PNG (configurable compression), lossy/lossless WebP with alpha, or the mask only
+"""
+import os
+from pathlib import Path
+from PIL import Image
+
+from utils import get_file_size_mb
+
+
+# Format name -> file extension
+OUTPUT_FORMATS = {
+    'png': '.png',  # RGBA, lossless
+    'webp': '.webp',  # RGBA, lossy color + lossless alpha (much smaller)
+    'webp-lossless': '.webp',  # RGBA, lossless (smaller than PNG, slower)
+    'mask': '.png',  # Single-channel mask only (no compositing)
+}
+
+
+class OutputEncoder:
+    """
+    Saves results in the selected format. Writes are atomic (temporary file
+    + rename), so an interrupted run never leaves a truncated output.
+    """
+
+    def __init__(
+        self,
+        fmt: str = 'png',
+        compress_level: int = 6,
+        optimize: bool = False,
+        quality: int = 90,
+        method: int = 4
+    ):
+        """
+        Args:
+            fmt: One of OUTPUT_FORMATS
+            compress_level: PNG zlib level 0-9 (1 = fast, 6 = PIL default)
+            optimize: PNG extra compression pass (slow, implies level 9)
+            quality: WebP quality 0-100 (lossless: compression effort)
+            method: WebP speed/size trade-off 0 (fast) - 6 (small)
+        """
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{fmt}' (choose from {', '.join(OUTPUT_FORMATS)})")
+        self.fmt = fmt
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self.quality = quality
+        self.method = method
+
+    @property
+    def suffix(self) -> str:
+        """File extension of the outputs"""
+        return OUTPUT_FORMATS[self.fmt]
+
+    @property
+    def mask_only(self) -> bool:
+        """True if only the mask is saved (cutout compositing can be skipped)"""
+        return self.fmt == 'mask'
+
+    @property
+    def streams(self) -> bool:
+        """True if large images can be written strip by strip (PNG-based formats)"""
+        return self.fmt in ('png', 'mask')
+
+    def describe(self) -> str:
+        """
+        Settings that change the output pixels, e.g. for the skip index
+        ('' for PNG: the compression level only changes the file size)
+        """
+        if self.fmt == 'png':
+            return ''
+        if self.fmt == 'webp':
+            return f"webp:q{self.quality}"
+        return self.fmt
+
+    def _save_options(self) -> dict:
+        if self.fmt in ('png', 'mask'):
+            return {'format': 'PNG', 'compress_level': self.compress_level, 'optimize': self.optimize}
+        return {
+            'format': 'WEBP',
+            'lossless': self.fmt == 'webp-lossless',
+            'quality': self.quality,
+            'method': self.method,
+            'alpha_quality': 100,
+            'exact': self.fmt == 'webp-lossless',  # Keep color under transparent pixels
+        }
+
+    def save(self, image: Image.Image, output_path: Path) -> float:
+        """
+        Save a cutout (RGBA) or a mask (L)
+
+        Args:
+            image: Cutout or mask
+            output_path: Output file (suffix from self.suffix)
+
+        Returns:
+            Output size in MB
+        """
+        if self.mask_only and image.mode != 'L':
+            image = image.getchannel('A') if 'A' in image.getbands() else image.convert('L')
+
+        temp_path = output_path.with_name(output_path.name + '.part')
+        try:
+            image.save(temp_path, **self._save_options())
+            os.replace(temp_path, output_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        return get_file_size_mb(output_path)
@@ -0,0 +1,318 @@
+"""
+Large-image mode for background removal
+Predict the mask on a downscaled copy, upsample it strip by strip, refine
+the edges only along the boundary and stream the cutout into a PNG. The
+decoded source image is held in memory once (see load_large_image); apart
+from that, memory per image is a few strips regardless of image size
+"""
+import os
+import time
+import zlib
+import struct
+from pathlib import Path
+import numpy as np
+from PIL import Image, ImageOps
+from rembg import remove
+
+from utils import get_file_size_mb
+from encoders import OutputEncoder
+
+
+# The model sees 320x320 (u2net) or 1024x1024 (isnet) anyway, so predicting
+# on a larger copy only costs time: mask detail is recovered by the refinement
+PREDICT_MAX_SIDE = 1024
+STRIP_ROWS = 128  # Rows composited and encoded at a time
+REFINE_RADIUS = 16  # Guided filter radius in full-resolution pixels (0 = off)
+REFINE_EPS = 1e-4  # Guided filter regularization (larger = smoother edges)
+REFINE_CONTRAST = 3.0  # Stretch of refined edge values around 0.5 (1 = none)
+EDGE_LOW, EDGE_HIGH = 2, 253  # Mask values considered part of the edge band
+
+
+def is_large_image(input_path: Path, max_pixels: int) -> bool:
+    """
+    Check the image size from its header (nothing is decoded)
+
+    Args:
+        input_path: Path to input image
+        max_pixels: Pixel count above which large-image mode is used (0 = never)
+
+    Returns:
+        True if the image should use large-image mode
+    """
+    if max_pixels <= 0:
+        return False
+    try:
+        with Image.open(input_path) as image:
+            width, height = image.size
+    except Exception:
+        return False  # Let the normal path report the error
+    return width * height > max_pixels
+
+
+def load_large_image(input_path: Path) -> Image.Image:
+    """
+    Decode a large image once, orientation fixed, as RGB or RGBA (8 bit)
+
+    PIL decodes the whole image: it takes width x height x 3 (RGB) or 4 (RGBA)
+    bytes, e.g. ~300 MB for 100 MP RGB, and briefly twice that while an EXIF
+    rotation or mode conversion makes its copy.
+    """
+    image = ImageOps.exif_transpose(Image.open(input_path))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    image.load()
+    return image
+
+
+def predict_mask_downscaled(image: Image.Image, session, max_side: int = PREDICT_MAX_SIDE) -> Image.Image:
+    """
+    Predict the mask on a downscaled copy
+
+    Args:
+        image: Full-resolution image
+        session: rembg session
+        max_side: Longest side of the copy sent to the model
+
+    Returns:
+        Mask ('L') at the downscaled size
+    """
+    scale = min(1.0, max_side / max(image.size))
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    small = image.convert('RGB') if image.size == size else image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    if small.mode != 'RGB':
+        small = small.convert('RGB')
+    return remove(small, session=session, only_mask=True)
+
+
+def _box_sum(x: np.ndarray, r: int, axis: int) -> np.ndarray:
+    """Sum over a window of 2r+1 along one axis (window clipped at the borders)"""
+    n = x.shape[axis]
+    c = np.cumsum(x, axis=axis, dtype=np.float32)
+    c = np.concatenate([np.zeros_like(np.take(c, [0], axis=axis)), c], axis=axis)
+    idx = np.arange(n)
+    hi = np.minimum(idx + r + 1, n)
+    lo = np.maximum(idx - r, 0)
+    return np.take(c, hi, axis=axis) - np.take(c, lo, axis=axis)
+
+
+def _box_mean(x: np.ndarray, r: int) -> np.ndarray:
+    height, width = x.shape
+    rows = _box_sum(np.ones(height, dtype=np.float32), r, 0)
+    cols = _box_sum(np.ones(width, dtype=np.float32), r, 0)
+    return _box_sum(_box_sum(x, r, 0), r, 1) / np.outer(rows, cols)
+
+
+def guided_filter(guide: np.ndarray, alpha: np.ndarray, r: int, eps: float) -> np.ndarray:
+    """
+    Edge-aware smoothing of alpha using the image as guide (He et al.):
+    alpha edges snap to edges in the full-resolution image
+
+    Args:
+        guide: Grayscale image, float32 in [0, 1]
+        alpha: Upsampled mask, float32 in [0, 1]
+        r: Window radius
+        eps: Regularization
+
+    Returns:
+        Refined alpha, float32 in [0, 1]
+    """
+    mean_i = _box_mean(guide, r)
+    mean_p = _box_mean(alpha, r)
+    cov_ip = _box_mean(guide * alpha, r) - mean_i * mean_p
+    var_i = _box_mean(guide * guide, r) - mean_i * mean_i
+    a = cov_ip / (var_i + eps)
+    b = mean_p - a * mean_i
+    return np.clip(_box_mean(a, r) * guide + _box_mean(b, r), 0.0, 1.0)
+
+
+class PngStripWriter:
+    """
+    Write an 8-bit RGBA or grayscale PNG row strip by row strip
+    (zlib-compressed IDAT chunks are emitted as they fill), so the full
+    image is never in memory.
+    """
+
+    # Channels -> PNG color type
+    COLOR_TYPES = {1: 0, 4: 6}
+
+    def __init__(self, path: Path, width: int, height: int, channels: int = 4, compress_level: int = 6):
+        """
+        Args:
+            path: Output file (written in place; callers handle atomic renames)
+            width: Image width
+            height: Image height
+            channels: 4 (RGBA) or 1 (grayscale mask)
+            compress_level: zlib level 0-9
+        """
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.rows_written = 0
+        self._file = open(path, 'wb')
+        self._compressor = zlib.compressobj(compress_level)
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        # 8 bits per channel, no interlace
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, self.COLOR_TYPES[channels], 0, 0, 0))
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def write_rows(self, rgba: np.ndarray):
+        """
+        Append rows
+
+        Args:
+            rgba: uint8 array of shape (rows, width, channels) or (rows, width)
+        """
+        rows = rgba.reshape(rgba.shape[0], -1)
+        bpp = self.channels
+        # Sub filter (each byte minus the byte one pixel to the left): cheap,
+        # row-independent and far smaller than unfiltered photos
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1:bpp + 1] = rows[:, :bpp]
+        np.subtract(rows[:, bpp:], rows[:, :-bpp], out=filtered[:, bpp + 1:])
+        data = self._compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+        self.rows_written += rows.shape[0]
+
+    def close(self):
+        """Finish the stream and close the file"""
+        if self._file is None:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"PNG expects {self.height} rows, got {self.rows_written}")
+            self._chunk(b'IDAT', self._compressor.flush())
+            self._chunk(b'IEND', b'')
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            self._file = None
+
+
+def write_large_cutout(
+    image: Image.Image,
+    small_mask: Image.Image,
+    output_path: Path,
+    encoder: OutputEncoder = None,
+    strip_rows: int = STRIP_ROWS,
+    radius: int = REFINE_RADIUS,
+    eps: float = REFINE_EPS,
+    contrast: float = REFINE_CONTRAST
+) -> float:
+    """
+    Upsample the mask, refine its edge band and composite in strips
+    (same cutout as rembg's naive_cutout). PNG and mask outputs are streamed
+    to disk; WebP needs the whole cutout in memory once (still no float copy).
+
+    Args:
+        image: Full-resolution image (RGB or RGBA)
+        small_mask: Mask predicted on the downscaled copy
+        output_path: Output path
+        encoder: Output format (PNG by default)
+        strip_rows: Rows processed at a time
+        radius: Guided filter radius (0 = plain upsampling)
+        eps: Guided filter regularization
+        contrast: Stretch of refined values around 0.5 (tightens the edge)
+
+    Returns:
+        Output size in MB
+    """
+    encoder = encoder or OutputEncoder()
+    width, height = image.size
+    scale_y = small_mask.height / height
+    # Rows of context above/below a strip for the two box filters
+    pad = 2 * radius if radius > 0 else 0
+
+    def upsampled_mask(top: int, bottom: int) -> np.ndarray:
+        box = (0, top * scale_y, small_mask.width, bottom * scale_y)
+        strip = small_mask.resize((width, bottom - top), Image.BILINEAR, box=box)
+        return np.asarray(strip, dtype=np.float32) / 255.0
+
+    def strips():
+        for top in range(0, height, strip_rows):
+            bottom = min(height, top + strip_rows)
+            ext_top, ext_bottom = max(0, top - pad), min(height, bottom + pad)
+
+            alpha = upsampled_mask(ext_top, ext_bottom)
+            inner = slice(top - ext_top, bottom - ext_top)
+            edge = (alpha[inner] > EDGE_LOW / 255.0) & (alpha[inner] < EDGE_HIGH / 255.0)
+
+            if radius > 0 and edge.any():
+                # Refine only the boundary band; solid areas keep the mask as is
+                guide = image.crop((0, ext_top, width, ext_bottom)).convert('L')
+                guide = np.asarray(guide, dtype=np.float32) / 255.0
+                refined = guided_filter(guide, alpha, radius, eps)[inner]
+                # The filter snaps the 50% crossing to the image edge but
+                # leaves flat areas soft: stretch around it
+                refined = np.clip((refined - 0.5) * contrast + 0.5, 0.0, 1.0)
+                mask = np.where(edge, refined, alpha[inner])
+            else:
+                mask = alpha[inner]
+            mask = np.rint(mask * 255.0).astype(np.uint16)
+
+            if encoder.mask_only:
+                yield top, bottom, mask.astype(np.uint8)
+                continue
+            rgba = np.asarray(image.crop((0, top, width, bottom)).convert('RGBA'), dtype=np.uint16)
+            rgba = (rgba * mask[:, :, None] + 127) // 255
+            yield top, bottom, rgba.astype(np.uint8)
+
+    if not encoder.streams:
+        cutout = np.empty((height, width, 4), dtype=np.uint8)
+        for top, bottom, rows in strips():
+            cutout[top:bottom] = rows
+        return encoder.save(Image.fromarray(cutout, 'RGBA'), output_path)
+
+    temp_path = output_path.with_name(output_path.name + '.part')
+    try:
+        channels = 1 if encoder.mask_only else 4
+        level = 9 if encoder.optimize else encoder.compress_level
+        with PngStripWriter(temp_path, width, height, channels, level) as writer:
+            for _, _, rows in strips():
+                writer.write_rows(rows)
+        os.replace(temp_path, output_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+    return get_file_size_mb(output_path)
+
+
+def remove_background_large(input_path: Path, output_path: Path, session, encoder: OutputEncoder = None,
+                            timer=None) -> float:
+    """
+    Large-image mode end to end for one file
+
+    Args:
+        input_path: Path to input image
+        output_path: Output path
+        session: rembg session
+        encoder: Output format (PNG by default)
+        timer: Optional StageTimer for decode/infer/encode times
+
+    Returns:
+        Output size in MB
+    """
+    start = time.perf_counter()
+    image = load_large_image(input_path)
+    decoded = time.perf_counter()
+    small_mask = predict_mask_downscaled(image, session)
+    predicted = time.perf_counter()
+    size_mb = write_large_cutout(image, small_mask, output_path, encoder)
+    if timer is not None:
+        timer.merge({'decode': decoded - start, 'infer': predicted - decoded, 'encode': time.perf_counter() - predicted})
+    return size_mb
@@ -2,23 +2,79 @@
 Background Removal Tool
 Remove backgrounds from images using rembg with GPU acceleration
 """
+import os
 import sys
+import argparse
 from pathlib import Path
-from typing import Tuple
-from PIL import Image
-from rembg import remove
+from typing import Iterable, List, Optional, Tuple
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+    wait,
+    as_completed,
+    FIRST_COMPLETED
+)
+from PIL import Image, ImageOps
+from rembg import remove, new_session
 from tqdm import tqdm
 import time
 
 from utils import (
     print_banner,
-    get_all_images,
+    iter_images,
+    count_images,
     ensure_output_path,
+    get_output_path,
     format_duration,
-    get_file_size_mb
+    get_file_size_mb,
+    StageTimer
+)
+from batch_inference import BatchPredictor, supports_batching, naive_cutout
+from skip_index import SkipIndex, INDEX_NAME
+from encoders import OutputEncoder, OUTPUT_FORMATS
+from large_image import (
+    is_large_image,
+    load_large_image,
+    predict_mask_downscaled,
+    write_large_cutout,
+    remove_background_large
 )
 
 
+# Model settings
+MODEL_NAME = "u2net"  # Or "u2netp" (fast), "isnet-general-use", "u2net_human_seg", ...
+
+# Output settings
+OUTPUT_FORMAT = "png"  # "png", "webp" (lossy, small), "webp-lossless" or "mask"
+PNG_COMPRESS_LEVEL = 6  # 0-9: 1 is several times faster to encode, ~10-20% larger
+PNG_OPTIMIZE = False  # Extra compression pass (slowest, smallest PNG)
+WEBP_QUALITY = 90  # Lossy: image quality; lossless: compression effort
+WEBP_METHOD = 4  # 0 (fast) - 6 (smallest)
+
+# Pipeline settings (decode → inference → encode run concurrently)
+DECODE_WORKERS = 4  # Threads loading images ahead of the model
+ENCODE_WORKERS = 2  # Threads compressing and saving outputs
+DECODE_QUEUE_DEPTH = 8  # Decoded images waiting for inference (bounds RAM)
+ENCODE_QUEUE_DEPTH = 8  # Cutouts waiting to be saved (bounds RAM)
+
+# Batched inference: N images stacked into one ONNX run (adapts to memory)
+BATCH_SIZE = 8  # Upper bound per run; 1 = per-image rembg.remove()
+
+# Large-image mode: mask predicted on a downscaled copy, edges refined at full
+# resolution, cutout streamed to disk in strips (only the decoded source is held whole)
+LARGE_IMAGE_PIXELS = 30_000_000  # 30 MP and up (0 = off)
+
+# Directory scan: images are processed while the input tree is still being listed
+COUNT_FIRST = True  # Count images in the background for the progress bar total
+
+# Incremental runs: skip images already processed (see skip_index.py)
+WATCH_INTERVAL = 10  # Seconds between scans in --watch mode
+
+# CPU-only hosts: split the images across processes, each with its own session
+PROCESSES = 1
+INTRA_OP_THREADS = 0  # ONNX threads per process (0 = CPU cores / processes)
+
+
 def check_gpu_availability():
     """
     Check if GPU (CUDA) is available for acceleration
@@ -37,86 +93,484 @@ def check_gpu_availability():
         return False, f"CPU (Error: {str(e)})"
 
 
-def process_image(input_path: Path, output_path: Path) -> Tuple[bool, float]:
+def get_providers() -> List[str]:
+    """ONNX Runtime execution providers to request (best first)"""
+    gpu_available, _ = check_gpu_availability()
+    if gpu_available:
+        return ['CUDAExecutionProvider', 'CPUExecutionProvider']
+    return ['CPUExecutionProvider']
+
+
+def create_session(model_name: str = MODEL_NAME, providers: Optional[List[str]] = None, threads: int = 0):
+    """
+    Create one explicit rembg session (model loaded once, reused for every image)
+    
+    Args:
+        model_name: rembg model name
+        providers: ONNX Runtime providers (None = auto)
+        threads: ONNX thread count (0 = library default)
+    """
+    if threads > 0:
+        # rembg sizes its ONNX thread pools from OMP_NUM_THREADS
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+    return new_session(model_name, providers=providers or get_providers())
+
+
+def load_image(input_path: Path, fix_orientation: bool = False) -> Image.Image:
+    """Open and fully decode an image (runs in decode threads)"""
+    image = Image.open(input_path)
+    image.load()
+    if fix_orientation:
+        # rembg.remove() does this itself; batched inference needs it up front
+        image = ImageOps.exif_transpose(image)
+    return image
+
+
+def load_or_defer(input_path: Path, fix_orientation: bool = False, large_pixels: int = 0) -> Optional[Image.Image]:
+    """Decode a normal image; large images return None and are decoded one at a time later"""
+    if is_large_image(input_path, large_pixels):
+        return None
+    return load_image(input_path, fix_orientation)
+
+
+def save_image(output_image: Image.Image, output_path: Path, encoder: Optional[OutputEncoder] = None) -> float:
+    """
+    Save a cutout or mask (runs in encode threads), returns output size in MB
+    
+    Written to a temporary file and renamed, so an interrupted run never
+    leaves a truncated file that looks finished.
+    """
+    return (encoder or OutputEncoder()).save(output_image, output_path)
+
+
+def save_cutout(
+    input_image: Image.Image,
+    mask: Image.Image,
+    output_path: Path,
+    encoder: Optional[OutputEncoder] = None
+) -> float:
+    """Apply a predicted mask and save the cutout (runs in encode threads)"""
+    if encoder is not None and encoder.mask_only:
+        return encoder.save(mask, output_path)
+    return save_image(naive_cutout(input_image, mask), output_path, encoder)
+
+
+# Session of a sharded worker process (created once by init_worker)
+_worker_session = None
+
+
+def init_worker(model_name: str, providers: List[str], threads: int):
+    """Process pool initializer: one session per process, bounded threads"""
+    global _worker_session
+    _worker_session = create_session(model_name, providers, threads)
+
+
+def _get_worker_session():
+    global _worker_session
+    if _worker_session is None:
+        _worker_session = create_session()
+    return _worker_session
+
+
+# Sessions reused across process_batch() calls (--watch mode)
+_session_cache = {}
+
+
+def get_session(model_name: str, threads: int):
+    """Create a session once per model and reuse it"""
+    key = (model_name, threads)
+    if key not in _session_cache:
+        _session_cache[key] = create_session(model_name, get_providers(), threads)
+    return _session_cache[key]
+
+
+def process_image(
+    input_path: Path,
+    output_path: Path,
+    session=None,
+    large_pixels: int = 0,
+    encoder: Optional[OutputEncoder] = None
+) -> Tuple[bool, dict]:
     """
     Remove background from a single image
     
     Args:
         input_path: Path to input image
         output_path: Path to save output image
+        session: rembg session (created on first use if None)
+        large_pixels: Use large-image mode above this many pixels (0 = off)
+        encoder: Output format (PNG by default)
         
     Returns:
-        Tuple of (success, processing_time)
+        Tuple of (success, {stage: seconds} for decode/infer/encode)
     """
+    timer = StageTimer()
+    session = session or _get_worker_session()
+    encoder = encoder or OutputEncoder()
     try:
-        start_time = time.time()
+        if is_large_image(input_path, large_pixels):
+            remove_background_large(input_path, output_path, session, encoder, timer)
+            return True, timer.totals
         
         # Load image
-        input_image = Image.open(input_path)
+        input_image = timer.call('decode', load_image, input_path)
         
         # Remove background
-        output_image = remove(input_image)
+        output_image = timer.call('infer', remove, input_image, session=session, only_mask=encoder.mask_only)
         
-        # Save output as PNG
-        output_image.save(output_path, 'PNG')
+        # Save output
+        timer.call('encode', save_image, output_image, output_path, encoder)
         
-        processing_time = time.time() - start_time
-        return True, processing_time
+        return True, timer.totals
         
     except Exception as e:
         print(f"\n❌ Error processing {input_path.name}: {str(e)}")
-        return False, 0.0
+        return False, timer.totals
+
+
+def _encode_outcome(future, input_path: Path):
+    try:
+        return input_path, True, future.result()
+    except Exception as e:
+        print(f"\n❌ Error saving {input_path.name}: {str(e)}")
+        return input_path, False, 0.0
+
+
+def run_pipeline(
+    images: Iterable[Tuple[Path, Path]],
+    output_folder: Path,
+    session,
+    decode_workers: int = DECODE_WORKERS,
+    encode_workers: int = ENCODE_WORKERS,
+    decode_depth: int = DECODE_QUEUE_DEPTH,
+    encode_depth: int = ENCODE_QUEUE_DEPTH,
+    predictor: Optional[BatchPredictor] = None,
+    large_pixels: int = 0,
+    encoder: Optional[OutputEncoder] = None,
+    timer: Optional[StageTimer] = None
+):
+    """
+    Producer/consumer pipeline in one process: a thread pool decodes images
+    ahead, the session runs inference, another pool encodes and saves the outputs.
+    Queue depths bound how many images are held in memory at once.
+    
+    With a predictor, decoded images are collected into batches and each
+    batch goes through the model in a single ONNX run.
+    
+    Images above large_pixels are not decoded ahead: each one is loaded
+    only after the previous large image has been written (large_image.py).
+    
+    Time spent per stage is added to timer (summed over threads).
+    
+    Yields:
+        (input_path, success, output_size_mb) as images finish
+    """
+    encoder = encoder or OutputEncoder()
+    timer = timer or StageTimer()
+    pending = iter(images)
+    decoding = []
+    encoding = {}
+    large_encoding = []
+    batch = []
+    # Keep at least one full batch decoding ahead of the model
+    depth = max(1, decode_depth, predictor.max_batch_size if predictor else 1)
+    
+    with ThreadPoolExecutor(max_workers=max(1, decode_workers)) as decode_pool, \
+            ThreadPoolExecutor(max_workers=max(1, encode_workers)) as encode_pool:
+        
+        def submit_next_decode():
+            item = next(pending, None)
+            if item is not None:
+                future = decode_pool.submit(
+                    timer.call, 'decode', load_or_defer, item[0], predictor is not None, large_pixels
+                )
+                decoding.append((item, future))
+        
+        def enqueue(relative_path, input_path, task, *task_args):
+            # Wait for the encoders if too many cutouts are queued
+            while len(encoding) >= max(1, encode_depth):
+                finished, _ = wait(encoding, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield _encode_outcome(future, encoding.pop(future))
+            
+            output_path = ensure_output_path(relative_path, output_folder, encoder.suffix)
+            future = encode_pool.submit(timer.call, 'encode', task, *task_args, output_path, encoder)
+            encoding[future] = input_path
+            return future
+        
+        def flush_batch():
+            masks = timer.call('infer', predictor.predict, [image for _, image in batch])
+            for ((input_path, relative_path), input_image), mask in zip(batch, masks):
+                if mask is None:
+                    yield input_path, False, 0.0
+                    continue
+                yield from enqueue(relative_path, input_path, save_cutout, input_image, mask)
+            batch.clear()
+        
+        for _ in range(depth):
+            submit_next_decode()
+        
+        try:
+            while decoding:
+                (input_path, relative_path), decode_future = decoding.pop(0)
+                submit_next_decode()
+                
+                small_mask = None
+                try:
+                    input_image = decode_future.result()
+                    if input_image is None:
+                        # Large image: one in memory at a time
+                        wait(large_encoding)
+                        large_encoding.clear()
+                        input_image = timer.call('decode', load_large_image, input_path)
+                        small_mask = timer.call('infer', predict_mask_downscaled, input_image, session)
+                    elif predictor is None:
+                        output_image = timer.call(
+                            'infer', remove, input_image, session=session, only_mask=encoder.mask_only
+                        )
+                        del input_image
+                except Exception as e:
+                    print(f"\n❌ Error processing {input_path.name}: {str(e)}")
+                    yield input_path, False, 0.0
+                    continue
+                
+                if small_mask is not None:
+                    large_encoding.append((yield from enqueue(
+                        relative_path, input_path, write_large_cutout, input_image, small_mask
+                    )))
+                    del input_image
+                    continue
+                
+                if predictor is None:
+                    yield from enqueue(relative_path, input_path, save_image, output_image)
+                    continue
+                
+                batch.append(((input_path, relative_path), input_image))
+                if len(batch) >= predictor.batch_size:
+                    yield from flush_batch()
+            
+            if batch:
+                yield from flush_batch()
+            
+            for future in as_completed(list(encoding)):
+                yield _encode_outcome(future, encoding.pop(future))
+        finally:
+            # Interrupted: drop decodes that have not started yet; saves
+            # already running finish (atomically) when the pools shut down
+            for _, future in decoding:
+                future.cancel()
+
+
+def run_sharded(
+    images: Iterable[Tuple[Path, Path]],
+    output_folder: Path,
+    model_name: str,
+    processes: int,
+    threads: int,
+    large_pixels: int = 0,
+    encoder: Optional[OutputEncoder] = None,
+    timer: Optional[StageTimer] = None
+):
+    """
+    CPU-only mode: split images across processes, each with its own session
+    and a bounded number of ONNX threads. Only a few tasks per process are
+    queued at a time, so images stream in from the directory scan.
+    
+    Yields:
+        (input_path, success, output_size_mb) as images finish
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=init_worker,
+        initargs=(model_name, ['CPUExecutionProvider'], threads)
+    )
+    encoder = encoder or OutputEncoder()
+    timer = timer or StageTimer()
+    pending = iter(images)
+    futures = {}
+    
+    def submit_next():
+        item = next(pending, None)
+        if item is not None:
+            input_path, relative_path = item
+            output_path = ensure_output_path(relative_path, output_folder, encoder.suffix)
+            future = pool.submit(process_image, input_path, output_path, None, large_pixels, encoder)
+            futures[future] = (input_path, output_path)
+    
+    try:
+        for _ in range(processes * 4):
+            submit_next()
+        
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                input_path, output_path = futures.pop(future)
+                submit_next()
+                success, times = future.result()
+                timer.merge(times)
+                yield input_path, success, get_file_size_mb(output_path) if success else 0.0
+    finally:
+        # Interrupted: images not yet picked up by a worker are dropped
+        pool.shutdown(wait=True, cancel_futures=True)
 
 
-def process_batch(input_folder: Path, output_folder: Path):
+def process_batch(
+    input_folder: Path,
+    output_folder: Path,
+    model_name: str = MODEL_NAME,
+    processes: int = PROCESSES,
+    intra_threads: int = INTRA_OP_THREADS,
+    decode_workers: int = DECODE_WORKERS,
+    encode_workers: int = ENCODE_WORKERS,
+    decode_depth: int = DECODE_QUEUE_DEPTH,
+    encode_depth: int = ENCODE_QUEUE_DEPTH,
+    batch_size: int = BATCH_SIZE,
+    incremental: bool = True,
+    known_failures: Optional[dict] = None,
+    count_first: bool = COUNT_FIRST,
+    large_pixels: int = LARGE_IMAGE_PIXELS,
+    encoder: Optional[OutputEncoder] = None
+) -> int:
     """
     Process all images in input folder
     
     Args:
         input_folder: Path to input folder
         output_folder: Path to output folder
+        model_name: rembg model name
+        processes: Worker processes (CPU only; GPU always uses one session)
+        intra_threads: ONNX threads per session (0 = auto)
+        decode_workers / encode_workers: Thread pool sizes around inference
+        decode_depth / encode_depth: Images allowed to wait in each queue
+        batch_size: Max images per ONNX run (1 = per-image rembg.remove)
+        incremental: Skip images whose output is up to date (see skip_index.py);
+                     False reprocesses everything but still updates the index
+        known_failures: input_path -> mtime of images that failed earlier;
+                        skipped until they change (used by --watch)
+        count_first: Count images in a background thread for the progress bar
+                     (processing starts immediately either way)
+        large_pixels: Use large-image mode above this many pixels (0 = off)
+        encoder: Output format (PNG at PNG_COMPRESS_LEVEL by default)
+        
+    Returns:
+        Number of images processed in this run
     """
-    # Get all images
-    images = get_all_images(input_folder)
+    encoder = encoder or OutputEncoder(OUTPUT_FORMAT, PNG_COMPRESS_LEVEL, PNG_OPTIMIZE, WEBP_QUALITY, WEBP_METHOD)
+    timer = StageTimer()
+    settings = model_name + (f"|{encoder.describe()}" if encoder.describe() else "")
+    index = SkipIndex(output_folder / INDEX_NAME, settings=settings, output_mode='L' if encoder.mask_only else 'RGBA')
+    output_paths = {}
+    skipped = 0
     
-    if not images:
-        print(f"\n❌ No images found in '{input_folder}'")
-        print(f"   Supported formats: PNG, JPG, JPEG, BMP, WEBP")
-        return
+    def pending_images():
+        # Streams straight from the directory scan; skip checks happen lazily
+        nonlocal skipped
+        for input_path, relative_path in iter_images(input_folder):
+            output_path = get_output_path(relative_path, output_folder, encoder.suffix)
+            if incremental and (
+                index.is_current(input_path, output_path)
+                or (known_failures and known_failures.get(input_path) == input_path.stat().st_mtime_ns)
+            ):
+                skipped += 1
+                continue
+            output_paths[input_path] = output_path
+            yield input_path, relative_path
     
-    print(f"\n📁 Found {len(images)} image(s) to process")
+    print(f"\n📁 Scanning '{input_folder}' (processing starts right away)")
     
     # Check GPU availability
     gpu_available, device_name = check_gpu_availability()
     print(f"🖥️  Device: {device_name}")
+    print(f"🧠 Model: {model_name}")
+    print(f"🖼️  Output: {encoder.fmt}")
     if gpu_available:
         print("⚡ GPU acceleration enabled - Processing will be faster!")
+        if processes > 1:
+            print("ℹ️  GPU detected - using a single shared session instead of process sharding")
+            processes = 1
+    if large_pixels > 0:
+        print(f"🔍 Large-image mode above {large_pixels / 1e6:g} MP")
     print()
     
+    if processes > 1:
+        threads = intra_threads or max(1, (os.cpu_count() or 1) // processes)
+        print(f"🧩 Sharding across {processes} processes ({threads} thread(s) each)")
+        results = run_sharded(
+            pending_images(), output_folder, model_name, processes, threads,
+            large_pixels, encoder, timer
+        )
+    else:
+        session = get_session(model_name, intra_threads)
+        predictor = None
+        if batch_size > 1:
+            if supports_batching(session):
+                predictor = BatchPredictor(session, batch_size)
+                print(f"📦 Batched inference: up to {batch_size} image(s) per run")
+            else:
+                print(f"ℹ️  Model '{model_name}' does not support batching - processing one image at a time")
+        results = run_pipeline(
+            pending_images(), output_folder, session,
+            decode_workers, encode_workers, decode_depth, encode_depth,
+            predictor, large_pixels, encoder, timer
+        )
+    
+    # Total for the progress bar arrives from a background count pass;
+    # skipped images count as done so the bar reaches 100%
+    counter = ThreadPoolExecutor(max_workers=1) if count_first else None
+    count_future = counter.submit(count_images, input_folder) if counter else None
+    progress = tqdm(total=None, desc="Processing images", unit="img")
+    
     # Process images
     successful = 0
     failed = 0
-    total_time = 0.0
     total_size_before = 0.0
     total_size_after = 0.0
+    start_time = time.time()
+    interrupted = False
     
-    for input_path, relative_path in tqdm(images, desc="Processing images", unit="img"):
-        output_path = ensure_output_path(relative_path, output_folder)
-        
-        # Track file size
-        size_before = get_file_size_mb(input_path)
-        total_size_before += size_before
-        
-        # Process image
-        success, proc_time = process_image(input_path, output_path)
-        
-        if success:
-            successful += 1
-            total_time += proc_time
-            size_after = get_file_size_mb(output_path)
-            total_size_after += size_after
+    try:
+        for input_path, success, size_after in results:
+            # Track file size
+            total_size_before += get_file_size_mb(input_path)
+            
+            if success:
+                successful += 1
+                total_size_after += size_after
+                index.record(input_path, output_paths.pop(input_path))
+            else:
+                failed += 1
+                output_paths.pop(input_path, None)
+                if known_failures is not None:
+                    known_failures[input_path] = input_path.stat().st_mtime_ns
+            
+            if progress.total is None and count_future is not None and count_future.done():
+                progress.total = count_future.result()
+                progress.refresh()
+            progress.update(successful + failed + skipped - progress.n)
+            progress.set_postfix(skipped=skipped, refresh=False)
+    except KeyboardInterrupt:
+        interrupted = True
+        results.close()
+        print("\n\n⚠️  Processing interrupted - run again to resume where it stopped")
+    finally:
+        if count_future is not None and count_future.done() and not interrupted:
+            progress.total = count_future.result()
+        progress.update(successful + failed + skipped - progress.n)
+        progress.close()
+        index.close()
+        if counter:
+            counter.shutdown(wait=False, cancel_futures=True)
+    
+    total_time = time.time() - start_time
+    processed = successful + failed
+    
+    if processed == 0 and not interrupted:
+        if skipped:
+            print(f"✅ All {skipped} image(s) are up to date")
         else:
-            failed += 1
+            print(f"\n❌ No images found in '{input_folder}'")
+            print(f"   Supported formats: PNG, JPG, JPEG, BMP, WEBP")
+        return 0
     
     # Print summary
     print("\n" + "="*60)
@@ -124,25 +578,115 @@ def process_batch(input_folder: Path, output_folder: Path):
     print("="*60)
     print(f"✅ Successful: {successful}")
     print(f"❌ Failed:     {failed}")
-    print(f"📁 Total:      {len(images)}")
+    print(f"📁 Total:      {processed}")
+    if skipped:
+        print(f"⏭️  Skipped:    {skipped} (already processed)")
+    if interrupted and count_future is not None and count_future.done():
+        print(f"⏸️  Remaining:  {max(0, count_future.result() - processed - skipped)}")
     
     if successful > 0:
         avg_time = total_time / successful
         print(f"\n⏱️  Average time per image: {format_duration(avg_time)}")
         print(f"⏱️  Total processing time:  {format_duration(total_time)}")
+        print(f"🚀 Throughput:             {successful / total_time:.2f} img/s")
         print(f"\n💾 Total input size:  {total_size_before:.2f} MB")
         print(f"💾 Total output size: {total_size_after:.2f} MB")
         
         if total_size_before > 0:
             size_ratio = (total_size_after / total_size_before) * 100
             print(f"📉 Size change: {size_ratio:.1f}%")
+        
+        # Stage times are summed over threads/processes, so they can exceed the wall time
+        print(f"\n⏱️  Time per stage (all workers):")
+        for stage, seconds in timer.totals.items():
+            print(f"   {stage:<7} {format_duration(seconds):>10}  ({seconds / processed * 1000:.0f} ms/img)")
     
     print("="*60)
     print(f"\n✨ Output saved to: {output_folder.absolute()}")
+    
+    if interrupted:
+        raise KeyboardInterrupt
+    return processed
+
+
+def parse_args():
+    """Parse command line options (defaults come from the settings above)"""
+    parser = argparse.ArgumentParser(description="Background Removal Tool")
+    parser.add_argument("--model", default=MODEL_NAME, help=f"rembg model (default: {MODEL_NAME})")
+    parser.add_argument(
+        "--processes", type=int, default=PROCESSES,
+        help=f"CPU-only: shard images across processes (default: {PROCESSES})"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=INTRA_OP_THREADS,
+        help="ONNX threads per session (default: auto)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE,
+        help=f"max images per ONNX run, shrinks automatically on errors (default: {BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--format", choices=list(OUTPUT_FORMATS), default=OUTPUT_FORMAT,
+        help=f"output format (default: {OUTPUT_FORMAT})"
+    )
+    parser.add_argument(
+        "--png-level", type=int, choices=range(10), default=PNG_COMPRESS_LEVEL, metavar="0-9",
+        help=f"PNG compression level, 1 = fastest (default: {PNG_COMPRESS_LEVEL})"
+    )
+    parser.add_argument(
+        "--png-optimize", action="store_true", default=PNG_OPTIMIZE,
+        help="extra PNG compression pass (slow)"
+    )
+    parser.add_argument(
+        "--webp-quality", type=int, default=WEBP_QUALITY,
+        help=f"WebP quality 0-100 (default: {WEBP_QUALITY})"
+    )
+    parser.add_argument(
+        "--webp-method", type=int, choices=range(7), default=WEBP_METHOD, metavar="0-6",
+        help=f"WebP speed/size trade-off, 0 = fastest (default: {WEBP_METHOD})"
+    )
+    parser.add_argument(
+        "--decode-workers", type=int, default=DECODE_WORKERS,
+        help=f"image decode threads (default: {DECODE_WORKERS})"
+    )
+    parser.add_argument(
+        "--encode-workers", type=int, default=ENCODE_WORKERS,
+        help=f"output encode threads (default: {ENCODE_WORKERS})"
+    )
+    parser.add_argument(
+        "--decode-queue", type=int, default=DECODE_QUEUE_DEPTH,
+        help=f"decoded images waiting for inference (default: {DECODE_QUEUE_DEPTH})"
+    )
+    parser.add_argument(
+        "--encode-queue", type=int, default=ENCODE_QUEUE_DEPTH,
+        help=f"cutouts waiting to be saved (default: {ENCODE_QUEUE_DEPTH})"
+    )
+    parser.add_argument(
+        "--large-mp", type=float, default=LARGE_IMAGE_PIXELS / 1e6,
+        help=f"large-image mode above this many megapixels, 0 = off (default: {LARGE_IMAGE_PIXELS / 1e6:g})"
+    )
+    parser.add_argument(
+        "--no-count", action="store_true",
+        help="skip the background count pass (progress bar shows no total)"
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="reprocess every image, ignoring the skip index"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running and process new or changed images as they appear"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=WATCH_INTERVAL,
+        help=f"seconds between scans in --watch mode (default: {WATCH_INTERVAL})"
+    )
+    return parser.parse_args()
 
 
 def main():
     """Main execution function"""
+    args = parse_args()
     print_banner()
     
     # Setup paths
@@ -155,7 +699,7 @@ def main():
     output_folder.mkdir(exist_ok=True)
     
     # Check if input folder has any images
-    if not any(input_folder.iterdir()):
+    if not args.watch and not any(input_folder.iterdir()):
         print("❌ Error: 'input' folder is empty!")
         print("\n📝 Usage:")
         print("   1. Place images or folders in 'input' folder")
@@ -165,8 +709,36 @@ def main():
         sys.exit(1)
     
     # Process images
+    encoder = OutputEncoder(
+        args.format, args.png_level, args.png_optimize, args.webp_quality, args.webp_method
+    )
+    
     try:
-        process_batch(input_folder, output_folder)
+        incremental = not args.full
+        known_failures = {} if args.watch else None
+        while True:
+            process_batch(
+                input_folder,
+                output_folder,
+                model_name=args.model,
+                processes=max(1, args.processes),
+                intra_threads=args.threads,
+                decode_workers=args.decode_workers,
+                encode_workers=args.encode_workers,
+                decode_depth=args.decode_queue,
+                encode_depth=args.encode_queue,
+                batch_size=args.batch_size,
+                incremental=incremental,
+                known_failures=known_failures,
+                count_first=not args.no_count,
+                large_pixels=int(args.large_mp * 1e6),
+                encoder=encoder
+            )
+            if not args.watch:
+                break
+            incremental = True  # --full only applies to the first scan
+            print(f"\n👀 Watching '{input_folder}' - next scan in {args.interval:g}s (Ctrl+C to stop)")
+            time.sleep(max(0.5, args.interval))
     except KeyboardInterrupt:
         print("\n\n⚠️  Processing interrupted by user")
         sys.exit(0)
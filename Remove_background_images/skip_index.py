@@ -0,0 +1,172 @@
+"""
+Skip index for incremental background removal runs
+Remembers which inputs were already processed (path, size, mtime, content hash)
+so re-runs only touch new or modified images
+"""
+import os
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+from PIL import Image
+
+
+INDEX_NAME = ".skip_index.sqlite"
+
+
+def file_sha1(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Content hash of a file (streamed, constant memory)
+
+    Args:
+        path: Path to file
+
+    Returns:
+        Hex SHA-1 digest
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SkipIndex:
+    """
+    SQLite index: input image -> (size, mtime, hash, output, settings).
+
+    An input is skipped when its output exists and either its size/mtime are
+    unchanged (no read needed) or its content hash is unchanged (touched but
+    identical file). Entries are committed as images finish, so an
+    interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, db_path: Path, settings: str = "", output_mode: Optional[str] = None,
+                 commit_every: int = 50):
+        """
+        Args:
+            db_path: SQLite file (created if missing)
+            settings: Processing settings (e.g. model name); a change reprocesses everything
+            output_mode: PIL mode of the outputs ('RGBA' cutout, 'L' mask); outputs
+                         without an index entry are only adopted if they match it
+            commit_every: Records buffered before a commit
+        """
+        self.settings = settings
+        self.output_mode = output_mode
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                input TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                sha1 TEXT NOT NULL,
+                output TEXT NOT NULL,
+                settings TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def is_current(self, input_path: Path, output_path: Path, stat: Optional[os.stat_result] = None) -> bool:
+        """
+        Check if an input was already processed with the current settings
+
+        Args:
+            input_path: Source image
+            output_path: Where its result would be written
+            stat: os.stat() of input_path if already known
+
+        Returns:
+            True if the image can be skipped
+        """
+        if not output_path.exists():
+            return False
+
+        stat = stat or input_path.stat()
+        key = str(input_path.resolve())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, sha1, output, settings FROM images WHERE input = ?",
+                (key,)
+            ).fetchone()
+
+        if row is None:
+            # Output from a run before the index existed: adopt it if newer than
+            # the source and of the same kind (mask vs cutout share .png)
+            if output_path.stat().st_mtime_ns >= stat.st_mtime_ns and self._matches_input(input_path, output_path):
+                self.record(input_path, output_path, stat)
+                return True
+            return False
+
+        size, mtime, sha1, output, settings = row
+        if settings != self.settings or output != str(output_path.resolve()):
+            return False
+        if size == stat.st_size and mtime == stat.st_mtime_ns:
+            return True
+        if size != stat.st_size or file_sha1(input_path) != sha1:
+            return False
+
+        # Same content, new mtime (copied/touched): remember the new stat
+        self.record(input_path, output_path, stat, sha1)
+        return True
+
+    def _matches_input(self, input_path: Path, output_path: Path) -> bool:
+        """
+        Check an unindexed output against the input from the headers only
+
+        Returns:
+            True if the output has the expected mode and the input's size
+            (either orientation, EXIF rotation may have swapped it)
+        """
+        if self.output_mode is None:
+            return False
+        try:
+            with Image.open(input_path) as source, Image.open(output_path) as output:
+                if output.mode != self.output_mode:
+                    return False
+                width, height = source.size
+                return output.size in ((width, height), (height, width))
+        except Exception:
+            return False
+
+    def record(self, input_path: Path, output_path: Path, stat: Optional[os.stat_result] = None,
+               sha1: Optional[str] = None) -> None:
+        """
+        Mark an input as processed
+
+        Args:
+            input_path: Source image
+            output_path: Result written for it
+            stat: os.stat() of input_path if already known
+            sha1: Content hash if already known
+        """
+        stat = stat or input_path.stat()
+        sha1 = sha1 or file_sha1(input_path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (input, size, mtime, sha1, output, settings) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(input_path.resolve()), stat.st_size, stat.st_mtime_ns, sha1,
+                 str(output_path.resolve()), self.settings)
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def close(self) -> None:
+        """Commit pending records and close the database"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
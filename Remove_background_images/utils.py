@@ -1,8 +1,10 @@
 """
 Utility functions for background removal tool
 """
+import os
+import threading
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 import time
 
 
@@ -34,6 +36,68 @@ def is_image_file(path: Path) -> bool:
     return path.suffix.lower() in SUPPORTED_FORMATS
 
 
+def _scan_image_entries(folder: Path) -> Iterator[Tuple[os.DirEntry, str]]:
+    """
+    Walk a folder with os.scandir, yielding image entries as they are found
+    
+    Uses the file type cached in each DirEntry, so no extra stat per file.
+    Symlinked folders are not followed (same as Path.rglob).
+    
+    Yields:
+        Tuples (dir_entry, relative_folder) - relative_folder is '' at the top
+    """
+    stack = [(str(folder), '')]
+    while stack:
+        directory, relative_folder = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, os.path.join(relative_folder, entry.name)))
+                        elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_FORMATS and entry.is_file():
+                            yield entry, relative_folder
+                    except OSError:
+                        continue  # Entry vanished or is unreadable
+        except OSError as e:
+            print(f"\n⚠️  Cannot read folder {directory}: {e.strerror}")
+
+
+def iter_images(input_path: Path) -> Iterator[Tuple[Path, Path]]:
+    """
+    Recursively find images in input path, yielding each one as soon as it is found
+    
+    Args:
+        input_path: Path to input file or folder
+        
+    Yields:
+        Tuples (input_file_path, relative_path)
+    """
+    if input_path.is_file():
+        if is_image_file(input_path):
+            yield input_path, Path(input_path.name)
+    elif input_path.is_dir():
+        for entry, relative_folder in _scan_image_entries(input_path):
+            yield Path(entry.path), Path(relative_folder, entry.name)
+
+
+def count_images(input_path: Path) -> int:
+    """
+    Fast count pass over input path (directory listing only, no Path objects)
+    
+    Args:
+        input_path: Path to input file or folder
+        
+    Returns:
+        Number of images iter_images() will yield
+    """
+    if input_path.is_file():
+        return int(is_image_file(input_path))
+    if input_path.is_dir():
+        return sum(1 for _ in _scan_image_entries(input_path))
+    return 0
+
+
 def get_all_images(input_path: Path) -> List[Tuple[Path, Path]]:
     """
     Recursively find all images in input path
@@ -44,33 +108,38 @@ def get_all_images(input_path: Path) -> List[Tuple[Path, Path]]:
     Returns:
         List of tuples (input_file_path, relative_path)
     """
-    images = []
-    
-    if input_path.is_file():
-        if is_image_file(input_path):
-            images.append((input_path, input_path.name))
-    elif input_path.is_dir():
-        for file_path in input_path.rglob('*'):
-            if file_path.is_file() and is_image_file(file_path):
-                relative_path = file_path.relative_to(input_path)
-                images.append((file_path, relative_path))
+    return list(iter_images(input_path))
+
+
+def get_output_path(relative_path: Path, output_base: Path, suffix: str = '.png') -> Path:
+    """
+    Return output file path (without creating directories)
     
-    return images
+    Args:
+        relative_path: Relative path from input folder
+        output_base: Base output directory
+        suffix: Extension of the output format (PNG by default for transparency)
+        
+    Returns:
+        Full output file path with the output extension
+    """
+    output_path = output_base / relative_path
+    return output_path.with_suffix(suffix)
 
 
-def ensure_output_path(relative_path: Path, output_base: Path) -> Path:
+def ensure_output_path(relative_path: Path, output_base: Path, suffix: str = '.png') -> Path:
     """
     Create output directory structure and return output file path
     
     Args:
         relative_path: Relative path from input folder
         output_base: Base output directory
+        suffix: Extension of the output format
         
     Returns:
-        Full output file path with .png extension
+        Full output file path with the output extension
     """
-    output_path = output_base / relative_path
-    output_path = output_path.with_suffix('.png')  # Always save as PNG for transparency
+    output_path = get_output_path(relative_path, output_base, suffix)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     return output_path
 
@@ -104,3 +173,34 @@ def get_file_size_mb(path: Path) -> float:
         File size in MB
     """
     return path.stat().st_size / (1024 * 1024)
+
+
+class StageTimer:
+    """
+    Thread-safe totals of the time spent in each pipeline stage
+    (summed over all threads/processes working on that stage)
+    """
+    
+    STAGES = ('decode', 'infer', 'encode')
+    
+    def __init__(self):
+        self.totals = dict.fromkeys(self.STAGES, 0.0)
+        self._lock = threading.Lock()
+    
+    def add(self, stage: str, seconds: float):
+        """Add time spent in a stage"""
+        with self._lock:
+            self.totals[stage] += seconds
+    
+    def merge(self, times: dict):
+        """Add times reported by a worker process ({stage: seconds})"""
+        for stage, seconds in times.items():
+            self.add(stage, seconds)
+    
+    def call(self, stage: str, func, *args, **kwargs):
+        """Run func(*args, **kwargs), timing it as part of stage"""
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.add(stage, time.perf_counter() - start)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Audio Decoding Utilities
+- Decode video/audio to 16 kHz mono float32 (Whisper input format)
+- Decode once to a .npy buffer, memory-mapped for long inputs
+- Optional on-disk decode cache keyed by file content hash
+- Kept free of torch/whisper imports so decode workers start fast
+"""
+
+import os
+import uuid
+import hashlib
+import subprocess
+from pathlib import Path
+from typing import Optional, Tuple
+import numpy as np
+
+# Whisper expects 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+# Samples copied per step when converting int16 → float32 on disk
+_CHUNK_SAMPLES = SAMPLE_RATE * 60
+
+
+def _ffmpeg_command(file_path: str, sample_rate: int) -> list:
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-threads", "0",
+        "-i", str(file_path),
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-"
+    ]
+
+
+def decode_audio(file_path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode any ffmpeg-readable file to a mono float32 waveform.
+
+    Args:
+        file_path: Path to video/audio file
+        sample_rate: Target sample rate
+
+    Returns:
+        1-D float32 array in [-1, 1]
+    """
+    try:
+        out = subprocess.run(
+            _ffmpeg_command(file_path, sample_rate),
+            capture_output=True,
+            check=True
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-1 of the file content (streamed, constant memory)"""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def decode_to_npy(file_path: str, npy_path: Path, sample_rate: int = SAMPLE_RATE) -> Path:
+    """
+    Decode straight to a float32 .npy file without holding the whole
+    waveform in RAM (ffmpeg output is streamed to disk, then converted in
+    chunks). The file appears atomically, so a crash never leaves a
+    truncated buffer behind.
+    """
+    npy_path = Path(npy_path)
+    raw_path = npy_path.with_name(npy_path.name + ".s16.part")
+    part_path = npy_path.with_name(npy_path.name + ".part")
+
+    try:
+        with open(raw_path, "wb") as raw:
+            result = subprocess.run(
+                _ffmpeg_command(file_path, sample_rate),
+                stdout=raw,
+                stderr=subprocess.PIPE
+            )
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to decode audio: {result.stderr.decode(errors='ignore')}")
+
+        samples = raw_path.stat().st_size // 2
+        if samples == 0:
+            raise RuntimeError(f"No audio stream found in {file_path}")
+
+        pcm = np.memmap(raw_path, dtype=np.int16, mode="r", shape=(samples,))
+        out = np.lib.format.open_memmap(part_path, mode="w+", dtype=np.float32, shape=(samples,))
+        for start in range(0, samples, _CHUNK_SAMPLES):
+            end = start + _CHUNK_SAMPLES
+            out[start:end] = pcm[start:end].astype(np.float32) / 32768.0
+        out.flush()
+        del out, pcm
+
+        os.replace(part_path, npy_path)
+        return npy_path
+    finally:
+        for leftover in (raw_path, part_path):
+            try:
+                leftover.unlink()
+            except OSError:
+                pass
+
+
+def prepare_audio(
+    file_path: str,
+    work_dir: str,
+    cache_dir: Optional[str] = None,
+    sample_rate: int = SAMPLE_RATE
+) -> Tuple[str, bool]:
+    """
+    Decode a file once to a .npy buffer (runs in decode worker processes).
+
+    Args:
+        file_path: Source video/audio file
+        work_dir: Directory for temporary buffers
+        cache_dir: Persistent decode cache directory (None = disabled)
+        sample_rate: Target sample rate
+
+    Returns:
+        (npy_path, is_temporary) - temporary buffers should be deleted after use
+    """
+    if cache_dir:
+        cache_path = Path(cache_dir) / f"{file_hash(file_path)}_{sample_rate}.npy"
+        if not cache_path.exists():
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            decode_to_npy(file_path, cache_path, sample_rate)
+        return str(cache_path), False
+
+    temp_path = Path(work_dir) / f"{Path(file_path).stem}_{uuid.uuid4().hex[:8]}.npy"
+    decode_to_npy(file_path, temp_path, sample_rate)
+    return str(temp_path), True
+
+
+def open_audio(npy_path: str, mmap_min_seconds: float = 600, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Open a decoded buffer: long inputs are memory-mapped (copy-on-write, so
+    in-place processing never touches the file), short ones read into RAM.
+    """
+    audio = np.load(npy_path, mmap_mode="r")
+    if len(audio) >= mmap_min_seconds * sample_rate:
+        return np.load(npy_path, mmap_mode="c")
+    return np.array(audio)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental Build Manifest
+- Records, per output file: content hashes of its inputs, the model and
+  decode settings used, and the hash of the output itself
+- A stage rebuilds an output only when any of those changed (make-style:
+  a new *_en.srt makes its *_vi.srt stale automatically)
+- Input hashes are cached by size/mtime, so unchanged videos are hashed once
+- Outputs edited by hand are kept unless a rebuild is forced; status() only
+  reports that decision, the caller records it with keep()
+- Saves re-read the file and merge under a lock file, so scripts running at
+  the same time (e.g. transcribe_en.py and translate_vi.py) keep each
+  other's entries
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+
+from subtitle_track import SubtitleTrack
+
+MANIFEST_NAME = "build_manifest.json"
+
+LOCK_STALE_SECONDS = 60  # A lock file older than this was left by a crashed run
+
+UNKNOWN_PARAMS = None  # Recorded params of adopted outputs (settings that built them are unknown)
+KEEP_STATUSES = ("adopt", "edited")  # status() results that keep the existing output
+
+_TIMING_LINE = re.compile(rb"^[ \t]*\d+:\d+:\d+[,.]\d+[ \t]*-->", re.M)
+
+
+def _sha1(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Inter-process lock: exclusive creation of <path>.lock"""
+    lock_path = path.with_name(path.name + ".lock")
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock_path.stat().st_mtime > LOCK_STALE_SECONDS:
+                    lock_path.unlink()
+                    continue
+            except OSError:
+                continue  # Released meanwhile
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        try:
+            lock_path.unlink()
+        except OSError:
+            pass
+
+
+def _read_manifest(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {"outputs": data.get("outputs", {}), "hashes": data.get("hashes", {})}
+
+
+def srt_is_complete(path) -> bool:
+    """
+    True if an .srt parses to the end: every timing line yields a cue, the
+    last cue has text and the file ends with a blank line (as every writer
+    here produces). A file cut off by a crash mid-write fails this check.
+    """
+    try:
+        data = Path(path).read_bytes().replace(b"\r\n", b"\n")
+    except OSError:
+        return False
+    if not data.endswith(b"\n\n"):
+        return False
+    track = SubtitleTrack.parse(data)
+    return (len(track) > 0 and len(track) == len(_TIMING_LINE.findall(data))
+            and bool(track.text(len(track) - 1).strip()))
+
+
+class BuildManifest:
+    """
+    JSON manifest shared by every pipeline stage (thread-safe).
+
+    Entries are keyed by output file name:
+        {"inputs": {path: sha1}, "params": {...}, "hash": sha1 of output}
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Manifest file (usually output/build_manifest.json)
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = {"outputs": {}, "hashes": {}}
+        # Keys changed by this process (merged into the file on save)
+        self._dirty = {"outputs": set(), "hashes": set()}
+
+        if self.path.exists():
+            try:
+                self._data = _read_manifest(self.path)
+            except (OSError, json.JSONDecodeError, AttributeError) as e:
+                print(f"[WARNING] Ignoring unreadable build manifest ({e}): existing subtitles that parse "
+                      f"completely are kept, incomplete ones are rebuilt")
+
+    def file_hash(self, path) -> str:
+        """Content hash of a file, reused while its size and mtime are unchanged"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        key = str(path)
+
+        with self._lock:
+            cached = self._data["hashes"].get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+            return cached["sha1"]
+
+        digest = _sha1(path)
+        with self._lock:
+            self._data["hashes"][key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha1": digest}
+            self._dirty["hashes"].add(key)
+        return digest
+
+    def _input_hashes(self, inputs: Iterable) -> dict:
+        return {str(Path(p).resolve()): self.file_hash(p) for p in inputs}
+
+    def status(self, output, inputs: Iterable, params: dict, adopt_existing: bool = True,
+               force: bool = False) -> str:
+        """
+        Decide whether an output must be rebuilt.
+
+        Nothing is written: "adopt" and "edited" mean the existing output
+        is kept, and the caller records that with keep(). An output whose
+        content changed since it was recorded was edited by the user and is
+        kept unless force is set.
+
+        Args:
+            output: Output file the stage would write
+            inputs: Files the output is built from
+            params: Model/decode settings that affect the output
+            adopt_existing: Keep outputs made before the manifest existed
+                            instead of rebuilding them; .srt files must
+                            parse completely to be adopted
+            force: Rebuild outputs edited by hand too
+
+        Returns:
+            "fresh", or one of KEEP_STATUSES ("adopt", "edited"): keep the
+            output; "missing", "new", "incomplete", "input changed",
+            "settings changed", "settings unknown" (adopted earlier) or
+            "output changed": rebuild it
+        """
+        output = Path(output)
+        if not output.exists():
+            return "missing"
+
+        with self._lock:
+            entry = self._data["outputs"].get(output.name)
+
+        if entry is None:
+            # Possibly cut off by a crash before writes were atomic
+            if adopt_existing and (output.suffix.lower() != ".srt" or srt_is_complete(output)):
+                return "adopt"
+            return "new"
+
+        if entry["hash"] != self.file_hash(output):
+            if force:
+                return "output changed"
+            print(f"[WARNING] {output.name} was edited outside the pipeline - keeping it "
+                  f"(use --force to rebuild it)")
+            return "edited"
+        if not entry.get("complete", True):
+            return "incomplete"
+        if entry["inputs"] != self._input_hashes(inputs):
+            return "input changed"
+        if entry["params"] is UNKNOWN_PARAMS:
+            return "settings unknown"
+        if entry["params"] != json.loads(json.dumps(params)):
+            return "settings changed"
+        return "fresh"
+
+    def is_fresh(self, output, inputs: Iterable, params: dict) -> bool:
+        """True if output is up to date with its inputs and settings (or kept as it is)"""
+        return self.status(output, inputs, params) in ("fresh",) + KEEP_STATUSES
+
+    def keep(self, output, inputs: Iterable, params: dict, status: str) -> None:
+        """
+        Record an output that status() decided to keep (saves immediately).
+        A hand-edited output is recorded with the current settings; an
+        adopted one with UNKNOWN_PARAMS, so it is not mistaken for a build
+        with the current settings.
+        """
+        self.record(output, inputs, UNKNOWN_PARAMS if status == "adopt" else params)
+
+    def record(self, output, inputs: Iterable, params: Optional[dict], complete: bool = True) -> None:
+        """
+        Mark output as built from inputs with params (saves immediately).
+        complete=False keeps a usable but partial output stale, so the next
+        run retries it.
+        """
+        output = Path(output)
+        entry = {
+            "inputs": self._input_hashes(inputs),
+            "params": json.loads(json.dumps(params)),
+            "hash": self.file_hash(output),
+            "complete": complete,
+        }
+        with self._lock:
+            self._data["outputs"][output.name] = entry
+            self._dirty["outputs"].add(output.name)
+            self._save()
+
+    def refresh(self, path) -> None:
+        """
+        Re-record a file rewritten in place by a tool that keeps it valid
+        (e.g. retime_subtitles.py): its own hash and its hash as an input of
+        other outputs, so neither counts as edited or stale.
+        """
+        path = Path(path)
+        key = str(path.resolve())
+        digest = self.file_hash(path)
+        with self._lock:
+            changed = False
+            entry = self._data["outputs"].get(path.name)
+            if entry is not None and entry["hash"] != digest:
+                entry["hash"] = digest
+                self._dirty["outputs"].add(path.name)
+                changed = True
+            for name, entry in self._data["outputs"].items():
+                if key in entry["inputs"] and entry["inputs"][key] != digest:
+                    entry["inputs"][key] = digest
+                    self._dirty["outputs"].add(name)
+                    changed = True
+            if changed:
+                self._save()
+
+    def _save(self) -> None:
+        # Caller holds the lock. Under the file lock, merge this process's
+        # changes into the current file (other scripts may have saved since
+        # it was loaded), then write atomically so a crash never corrupts it
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.path):
+            try:
+                merged = _read_manifest(self.path)
+            except (OSError, json.JSONDecodeError, AttributeError):
+                merged = {"outputs": {}, "hashes": {}}
+            for section, keys in self._dirty.items():
+                for key in keys:
+                    merged[section][key] = self._data[section][key]
+            self._data = merged
+            self._dirty = {"outputs": set(), "hashes": set()}
+
+            temp_path = self.path.with_name(self.path.name + ".part")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+
+
+def open_manifest(output_dir) -> BuildManifest:
+    """The manifest of an output folder"""
+    return BuildManifest(Path(output_dir) / MANIFEST_NAME)
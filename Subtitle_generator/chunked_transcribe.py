@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chunked Long-form Transcription Helpers
+- Split audio at pauses in speech (Silero VAD) near a target chunk length
+- Stitch chunk results back together (word-level overlap de-duplication)
+- Checkpoint finished chunks so an interrupted run resumes
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+
+VAD_SAMPLE_RATE = 16000  # Silero VAD only runs on 16 kHz audio
+
+
+def _vad():
+    """faster-whisper's get_speech_timestamps (Silero VAD, ONNX), None if not installed"""
+    # Imported on first use: faster-whisper pulls in CTranslate2 and tokenizers
+    try:
+        from faster_whisper.vad import get_speech_timestamps
+    except ImportError:
+        return None
+    return get_speech_timestamps
+
+
+def _speech_pause(window: np.ndarray, sample_rate: int) -> Optional[int]:
+    """
+    Middle of the longest pause between speech in window (sample offset),
+    or None if VAD is unavailable or finds no speech.
+    """
+    get_speech_timestamps = _vad() if sample_rate == VAD_SAMPLE_RATE else None
+    if get_speech_timestamps is None:
+        return None
+    speech = get_speech_timestamps(window)
+    if not speech:
+        return None
+
+    # Pauses: window start -> first speech, between speech, last speech -> window end
+    edges = [0] + [bound for ts in speech for bound in (ts["start"], ts["end"])] + [len(window)]
+    gaps = list(zip(edges[0::2], edges[1::2]))
+    start, end = max(gaps, key=lambda gap: gap[1] - gap[0])
+    if end <= start:
+        return None
+    return (start + end) // 2
+
+
+def find_split_points(
+    audio: np.ndarray,
+    sample_rate: int,
+    chunk_seconds: float,
+    search_seconds: float = 20.0,
+    frame_seconds: float = 0.1
+) -> List[int]:
+    """
+    Pick chunk boundaries (in samples) in the longest pause between speech
+    (faster-whisper's Silero VAD) near each multiple of chunk_seconds. Without
+    faster-whisper, or where VAD hears no speech, the quietest frame is used
+    instead. Only the search window around each target is read, so this works
+    on memory-mapped audio of any length.
+
+    Returns:
+        Sorted boundaries, starting with 0 and ending with len(audio)
+    """
+    total = len(audio)
+    chunk = int(chunk_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    frame = max(1, int(frame_seconds * sample_rate))
+
+    points = [0]
+    # Leave the tail alone if splitting would create a tiny last chunk
+    while total - points[-1] > chunk + search:
+        target = points[-1] + chunk
+        lo = max(points[-1] + frame, target - search)
+        hi = min(total, target + search)
+
+        n_frames = (hi - lo) // frame
+        if n_frames < 1:
+            points.append(target)
+            continue
+
+        window = np.asarray(audio[lo:lo + n_frames * frame], dtype=np.float32)
+        pause = _speech_pause(window, sample_rate)
+        if pause is not None:
+            points.append(lo + pause)
+            continue
+
+        energy = np.square(window).reshape(n_frames, frame).mean(axis=1)
+        quietest = int(np.argmin(energy))
+        points.append(lo + quietest * frame + frame // 2)
+
+    points.append(total)
+    return points
+
+
+def plan_chunks(points: List[int], sample_rate: int, overlap_seconds: float) -> List[dict]:
+    """
+    Turn boundaries into chunk jobs.
+
+    Each chunk decodes [start, end) samples (boundaries widened by the
+    overlap) but only keeps words whose midpoint falls inside
+    [keep_start, keep_end) seconds, so words in the overlap are counted once.
+    """
+    total = points[-1]
+    overlap = int(overlap_seconds * sample_rate)
+    chunks = []
+
+    for i in range(len(points) - 1):
+        start = max(0, points[i] - overlap)
+        end = min(total, points[i + 1] + overlap)
+        chunks.append({
+            "index": i,
+            "start": start,
+            "end": end,
+            "offset": start / sample_rate,
+            "keep_start": points[i] / sample_rate,
+            "keep_end": points[i + 1] / sample_rate if i < len(points) - 2 else float("inf"),
+        })
+
+    return chunks
+
+
+def stitch_segments(segments: List[dict], chunk: dict) -> List[dict]:
+    """
+    Shift a chunk's segments to file time and drop words outside its keep
+    range.
+
+    Args:
+        segments: Segment dicts (start, end, text, words) in chunk time
+        chunk: Chunk job from plan_chunks()
+
+    Returns:
+        Minimal segment dicts in file time (empty segments removed)
+    """
+    offset = chunk["offset"]
+    keep_start, keep_end = chunk["keep_start"], chunk["keep_end"]
+    stitched = []
+
+    for segment in segments:
+        words = segment.get("words") or []
+
+        if not words:
+            # No word timing: decide on the segment midpoint
+            mid = offset + (segment["start"] + segment["end"]) / 2
+            if keep_start <= mid < keep_end:
+                stitched.append({
+                    "start": segment["start"] + offset,
+                    "end": segment["end"] + offset,
+                    "text": segment["text"],
+                    "words": [],
+                })
+            continue
+
+        kept = []
+        for word in words:
+            start, end = word["start"] + offset, word["end"] + offset
+            if keep_start <= (start + end) / 2 < keep_end:
+                kept.append({
+                    "word": word["word"],
+                    "start": start,
+                    "end": end,
+                    "probability": word.get("probability"),
+                })
+
+        if kept:
+            stitched.append({
+                "start": kept[0]["start"],
+                "end": kept[-1]["end"],
+                "text": "".join(w["word"] for w in kept),
+                "words": kept,
+            })
+
+    return stitched
+
+
+def checkpoint_dir_for(base_dir: Path, input_file: Path, settings: dict) -> Path:
+    """
+    Checkpoint folder for one input: tied to its size/mtime and the chunking
+    and model settings, so a replaced file or changed setting starts fresh.
+    """
+    stat = input_file.stat()
+    raw = json.dumps(
+        {"size": stat.st_size, "mtime": stat.st_mtime_ns, **settings},
+        sort_keys=True
+    )
+    key = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+    return Path(base_dir) / f"{input_file.stem}_{key}"
+
+
+def _checkpoint_path(checkpoint_dir: Path, chunk: dict) -> Path:
+    return Path(checkpoint_dir) / f"chunk_{chunk['index']:04d}_{chunk['start']}_{chunk['end']}.json"
+
+
+def load_checkpoint(checkpoint_dir: Path, chunk: dict) -> Optional[List[dict]]:
+    """Stitched segments of a finished chunk, or None if not done yet"""
+    path = _checkpoint_path(checkpoint_dir, chunk)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_checkpoint(checkpoint_dir: Path, chunk: dict, segments: List[dict]) -> None:
+    """Write a chunk's stitched segments atomically"""
+    path = _checkpoint_path(checkpoint_dir, chunk)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".part")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(segments, f, ensure_ascii=False)
+    os.replace(temp_path, path)
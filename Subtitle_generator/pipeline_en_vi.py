@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fused Subtitle Pipeline
+Transcribe (EN) and translate (VI, NLLB) at the same time in one process:
+finished Whisper chunks stream through a bounded queue into the translator,
+and both *_en.srt and *_vi.srt are written together.
+"""
+
+import sys
+import time
+import argparse
+import queue
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+
+import transcribe_en as stt
+import translate_vi as mt
+from audio_utils import SAMPLE_RATE, prepare_audio, open_audio
+from chunked_transcribe import (
+    find_split_points,
+    plan_chunks,
+    stitch_segments,
+    checkpoint_dir_for,
+    load_checkpoint,
+    save_checkpoint
+)
+from subtitle_track import SubtitleTrack
+from subtitle_utils import get_nllb_translator, translate_texts_nllb
+from translation_memory import TranslationMemory
+from build_manifest import open_manifest, KEEP_STATUSES
+
+# Configuration
+INPUT_DIR = stt.INPUT_DIR
+OUTPUT_DIR = stt.OUTPUT_DIR
+
+# Pipeline settings
+PIPELINE_CHUNK_SECONDS = 300  # Smaller chunks = translation starts sooner
+TRANSLATION_QUEUE_SIZE = 4  # Finished chunks waiting for the translator
+
+
+def print_banner():
+    """Print script banner"""
+    print("=" * 70)
+    print("  Fused Subtitle Pipeline")
+    print("  Transcribe (EN) ⇄ Translate (VI) running side by side")
+    print(f"  Whisper: {stt.MODEL_NAME} | NLLB: {mt.NLLB_MODEL.split('/')[-1]} ({mt.ENGINE})")
+    print("=" * 70)
+    print()
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Fused Subtitle Pipeline")
+    parser.add_argument(
+        "--force", action="store_true",
+        help="also rebuild *_en.srt / *_vi.srt files that were edited by hand"
+    )
+    return parser.parse_args()
+
+
+def segment_times(segments: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Start/end columns (ms) of stitched segments"""
+    start = np.round([segment["start"] * 1000 for segment in segments]).astype(np.int64)
+    end = np.round([segment["end"] * 1000 for segment in segments]).astype(np.int64)
+    return start, end
+
+
+def translator_worker(chunk_queue: queue.Queue, translations: dict, translator, memory, errors: list):
+    """
+    Translation stage: translate each finished chunk while Whisper is busy
+    with the next one. A None item ends the stream.
+    """
+    while True:
+        item = chunk_queue.get()
+        if item is None:
+            return
+
+        index, segments = item
+        try:
+            translations[index] = translate_texts_nllb(
+                [segment["text"].strip() for segment in segments],
+                translator,
+                max_batch_tokens=mt.MAX_BATCH_TOKENS,
+                max_batch_size=mt.MAX_BATCH_SIZE,
+                memory=memory,
+                num_beams=mt.NUM_BEAMS
+            )
+            print(f"  [VI] Chunk {index + 1} translated ({len(segments)} subtitle(s))")
+        except Exception as e:
+            errors.append(e)
+
+
+def process_file(model, translator, memory, manifest, input_file: Path, work_dir: str) -> Tuple[bool, float]:
+    """
+    Transcribe and translate one file with the two stages overlapped.
+
+    Returns:
+        (success, duration)
+    """
+    print(f"\n[PROCESSING] {input_file.name}")
+    start_time = time.time()
+    en_output = OUTPUT_DIR / f"{input_file.stem}_en.srt"
+    vi_output = OUTPUT_DIR / f"{input_file.stem}_vi.srt"
+    npy_path = None
+    is_temporary = False
+
+    chunk_queue = queue.Queue(maxsize=TRANSLATION_QUEUE_SIZE)
+    translations = {}
+    errors = []
+    worker = threading.Thread(
+        target=translator_worker,
+        args=(chunk_queue, translations, translator, memory, errors),
+        daemon=True
+    )
+    worker.start()
+
+    try:
+        print("[INFO] Decoding audio...")
+        npy_path, is_temporary = prepare_audio(
+            str(input_file),
+            work_dir,
+            str(stt.AUDIO_CACHE_DIR) if stt.USE_AUDIO_CACHE else None
+        )
+        audio = open_audio(npy_path, stt.MMAP_MIN_SECONDS)
+
+        points = find_split_points(audio, SAMPLE_RATE, PIPELINE_CHUNK_SECONDS)
+        chunks = plan_chunks(points, SAMPLE_RATE, stt.CHUNK_OVERLAP_SECONDS)
+        checkpoint_dir = checkpoint_dir_for(stt.CHECKPOINT_DIR, input_file, {
+            **stt.transcribe_params(stt.BACKEND),
+            "chunk_seconds": PIPELINE_CHUNK_SECONDS,
+            "overlap_seconds": stt.CHUNK_OVERLAP_SECONDS,
+        })
+        print(f"[INFO] {len(chunks)} chunk(s), transcription and translation overlap")
+
+        stitched = {}
+        for chunk in chunks:
+            segments = load_checkpoint(checkpoint_dir, chunk)
+            if segments is None:
+                chunk_audio = np.array(audio[chunk["start"]:chunk["end"]])
+                result = stt.run_whisper(model, chunk_audio)
+                segments = stitch_segments(result.to_dict()["segments"], chunk)
+                save_checkpoint(checkpoint_dir, chunk, segments)
+                print(f"  [EN] Chunk {chunk['index'] + 1}/{len(chunks)} transcribed")
+            else:
+                print(f"  [EN] Chunk {chunk['index'] + 1}/{len(chunks)} restored from checkpoint")
+
+            stitched[chunk["index"]] = segments
+            chunk_queue.put((chunk["index"], segments))  # Blocks if the translator falls behind
+
+            if errors:
+                raise errors[0]
+
+        del audio
+        chunk_queue.put(None)
+        worker.join()
+        if errors:
+            raise errors[0]
+
+        # Both files share the same cues and timing: blank English cues are
+        # dropped from both, a blank translation keeps the English line, so
+        # compose() numbers them identically
+        segments = [seg for index in sorted(stitched) for seg in stitched[index]]
+        vi_texts = [text for index in sorted(stitched) for text in translations[index]]
+        pairs = [(seg, seg["text"].strip(), vi.strip()) for seg, vi in zip(segments, vi_texts)]
+        kept = [(seg, en, vi or en) for seg, en, vi in pairs if en]
+
+        start, end = segment_times([seg for seg, _, _ in kept])
+        en_track = SubtitleTrack.from_texts(start, end, [en for _, en, _ in kept])
+        en_track.close_gaps(stt.TIMING_GAP_MS)
+        vi_track = en_track.with_texts([vi for _, _, vi in kept])
+
+        en_track.write(en_output)
+        vi_track.write(vi_output)
+        manifest.record(en_output, [input_file], stt.transcribe_params(stt.BACKEND))
+        manifest.record(vi_output, [en_output], mt.translation_params())
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+        duration = time.time() - start_time
+        print(f"[OUTPUT] {en_output.name}")
+        print(f"[OUTPUT] {vi_output.name}")
+        print(f"[SUCCESS] Completed in {duration:.2f} seconds")
+        return True, duration
+
+    except Exception as e:
+        duration = time.time() - start_time
+        print(f"[ERROR] Failed after {duration:.2f} seconds")
+        print(f"[ERROR] {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False, duration
+
+    finally:
+        # Unblock and stop the translator if we bailed out early
+        if worker.is_alive():
+            while True:
+                try:
+                    chunk_queue.get_nowait()
+                except queue.Empty:
+                    break
+            chunk_queue.put(None)
+            worker.join()
+        if npy_path and is_temporary:
+            try:
+                Path(npy_path).unlink()
+            except OSError:
+                pass
+
+
+def translate_existing(translator, memory, manifest, input_file: Path) -> Tuple[bool, float]:
+    """
+    Translate an up-to-date *_en.srt only (e.g. after a translation setting
+    changed), so a hand-corrected English file is kept as it is.
+
+    Returns:
+        (success, duration)
+    """
+    print(f"\n[TRANSLATING] {input_file.name} (EN subtitle up to date)")
+    start_time = time.time()
+    en_output = OUTPUT_DIR / f"{input_file.stem}_en.srt"
+    vi_output = OUTPUT_DIR / f"{input_file.stem}_vi.srt"
+    try:
+        en_track = SubtitleTrack.read(en_output)
+        vi_texts = translate_texts_nllb(
+            [text.strip() for text in en_track.texts()],
+            translator,
+            max_batch_tokens=mt.MAX_BATCH_TOKENS,
+            max_batch_size=mt.MAX_BATCH_SIZE,
+            memory=memory,
+            num_beams=mt.NUM_BEAMS
+        )
+        # A blank translation keeps the English line, so both files keep the same cues
+        vi_texts = [vi.strip() or en.strip() for en, vi in zip(en_track.texts(), vi_texts)]
+        en_track.with_texts(vi_texts).write(vi_output)
+        manifest.record(vi_output, [en_output], mt.translation_params())
+
+        duration = time.time() - start_time
+        print(f"[OUTPUT] {vi_output.name}")
+        print(f"[SUCCESS] Completed in {duration:.2f} seconds")
+        return True, duration
+
+    except Exception as e:
+        duration = time.time() - start_time
+        print(f"[ERROR] Failed after {duration:.2f} seconds")
+        print(f"[ERROR] {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False, duration
+
+
+def main():
+    """Main execution function"""
+    args = parse_args()
+    print_banner()
+    stt.ensure_output_dir()
+
+    print("\n[SCANNING] Looking for video/audio files in input directory...")
+    input_files = stt.get_input_files()
+
+    if not input_files:
+        print("[ERROR] No supported video/audio files found in 'input/' directory!")
+        print(f"[INFO] Supported formats: {', '.join(sorted(stt.SUPPORTED_FORMATS))}")
+        input("\nPress Enter to exit...")
+        sys.exit(1)
+
+    print(f"[INFO] Found {len(input_files)} file(s):")
+
+    # Check which files already have both subtitles up to date
+    manifest = open_manifest(OUTPUT_DIR)
+    en_params = stt.transcribe_params(stt.BACKEND)
+    vi_params = mt.translation_params()
+    files_to_process = []
+    translate_only = set()  # EN up to date (or edited by hand): translate it, don't re-transcribe
+    for i, f in enumerate(input_files, 1):
+        en_output = OUTPUT_DIR / f"{f.stem}_en.srt"
+        vi_output = OUTPUT_DIR / f"{f.stem}_vi.srt"
+        status = manifest.status(en_output, [f], en_params, force=args.force)
+        if status in KEEP_STATUSES:
+            manifest.keep(en_output, [f], en_params, status)
+            status = "fresh"
+        if status == "fresh":
+            status = manifest.status(vi_output, [en_output], vi_params, force=args.force)
+            if status in KEEP_STATUSES:
+                manifest.keep(vi_output, [en_output], vi_params, status)
+                status = "fresh"
+            if status != "fresh":
+                translate_only.add(f)
+        if status == "fresh":
+            print(f"  {i}. {f.name} - SKIP (EN + VI subtitles up to date)")
+        else:
+            reason = "" if status == "missing" else f" ({status})"
+            stage = " - VI only" if f in translate_only else ""
+            print(f"  {i}. {f.name} - PENDING{reason}{stage}")
+            files_to_process.append(f)
+
+    if not files_to_process:
+        print("\n[INFO] All files have already been processed!")
+        input("\nPress Enter to exit...")
+        sys.exit(0)
+
+    # Both models live in this process and share one CUDA context
+    model = stt.load_model() if len(translate_only) < len(files_to_process) else None
+    translator = get_nllb_translator(
+        mt.NLLB_MODEL,
+        mt.DEVICE,
+        engine=mt.ENGINE,
+        compute_type=mt.COMPUTE_TYPE,
+        ct2_model_dir=mt.CT2_MODEL_DIR,
+        intra_threads=mt.INTRA_THREADS,
+        inter_threads=mt.INTER_THREADS
+    )
+    # Same memory key as translate_vi.py, so both scripts share entries
+    memory = TranslationMemory(
+        mt.TRANSLATION_MEMORY_PATH,
+        mt.NLLB_MODEL,
+        mt.generation_params(),
+        max_entries=mt.TRANSLATION_MEMORY_MAX_ENTRIES,
+        enabled=mt.USE_TRANSLATION_MEMORY
+    )
+
+    results = []
+    total_start = time.time()
+    work_dir = tempfile.mkdtemp(prefix="pipeline_audio_")
+
+    for i, input_file in enumerate(files_to_process, 1):
+        print(f"\n{'=' * 70}")
+        print(f"[FILE {i}/{len(files_to_process)}] {input_file.name}")
+        print(f"{'=' * 70}")
+        if input_file in translate_only:
+            success, duration = translate_existing(translator, memory, manifest, input_file)
+        else:
+            success, duration = process_file(model, translator, memory, manifest, input_file, work_dir)
+        results.append((input_file.name, success, duration))
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Print summary
+    total_duration = time.time() - total_start
+    successful = sum(1 for _, success, _ in results if success)
+
+    print("\n" + "=" * 70)
+    print("  PIPELINE COMPLETE!")
+    print("=" * 70)
+    print(f"\n[SUMMARY]")
+    print(f"  Total files: {len(results)}")
+    print(f"  Successful: {successful}")
+    print(f"  Failed: {len(results) - successful}")
+    print(f"  Total time: {total_duration:.2f} seconds ({total_duration/60:.2f} minutes)")
+    print(f"  Translation memory: {memory.stats()}")
+    memory.close()
+
+    print("\n[DETAILED RESULTS]")
+    for filename, success, duration in results:
+        status = "✓ SUCCESS" if success else "✗ FAILED"
+        print(f"  {status} - {filename} ({duration:.2f}s)")
+
+    print(f"\n[OUTPUT] Subtitles saved to: {OUTPUT_DIR}")
+    print("=" * 70)
+    input("\nPress Enter to exit...")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n[INFO] Process interrupted by user.")
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n[FATAL ERROR] {str(e)}")
+        import traceback
+        traceback.print_exc()
+        input("\nPress Enter to exit...")
+        sys.exit(1)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Subtitle Re-timing
+Apply timing rules to whole directory trees of .srt files in one run:
+- Global offset / scale (e.g. frame-rate fixes)
+- Gap closing, minimum / maximum duration, reading-speed (CPS) limit
+- Runs across a process pool, writes atomically, dry-run report per rule
+- Re-records rewritten files in their folder's build manifest, so the
+  pipeline keeps them instead of treating them as edited or stale
+"""
+
+import sys
+import glob
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+
+from subtitle_track import SubtitleTrack
+from build_manifest import MANIFEST_NAME, BuildManifest
+
+# Configuration
+OUTPUT_DIR = Path(__file__).parent / "output"
+
+# Rule order: global shift first, ends are extended next, max duration last
+RULES = ("shift", "gaps", "min_duration", "max_cps", "max_duration")
+
+# Defaults
+DEFAULT_WORKERS = 4
+CHUNK_FILES = 32  # Files per task sent to a worker (less IPC for small files)
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Batch Subtitle Re-timing")
+    parser.add_argument(
+        "paths", nargs="*", default=[str(OUTPUT_DIR)],
+        help="directories (searched recursively), .srt files or glob patterns (default: output/)"
+    )
+    parser.add_argument("--pattern", default="*.srt", help="file pattern inside directories (default: *.srt)")
+    parser.add_argument("--offset-ms", type=int, default=0, help="shift every cue by this many milliseconds")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every timestamp (e.g. 1.0427 for 23.976 → 25 fps)")
+    parser.add_argument("--gap-ms", type=int, help="close gaps, leaving this many milliseconds between cues")
+    parser.add_argument("--min-duration-ms", type=int, help="lengthen cues shorter than this")
+    parser.add_argument("--max-duration-ms", type=int, help="cut cues longer than this")
+    parser.add_argument("--max-cps", type=float, help="lengthen cues faster than this many characters per second")
+    parser.add_argument(
+        "--spacing-ms", type=int, default=10,
+        help="minimum distance kept to the next cue when lengthening (default: 10)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS,
+        help=f"worker processes (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="only report how many cues each rule would change")
+    return parser.parse_args()
+
+
+def collect_files(paths: List[str], pattern: str) -> List[Path]:
+    """Expand directories, files and glob patterns to a sorted list of .srt files"""
+    files = set()
+    for item in paths:
+        path = Path(item)
+        if path.is_dir():
+            files.update(p for p in path.rglob(pattern) if p.is_file())
+        elif path.is_file():
+            files.add(path)
+        else:
+            files.update(Path(p) for p in glob.glob(item, recursive=True) if Path(p).is_file())
+    return sorted(files)
+
+
+def build_rules(args) -> dict:
+    """Rule name -> parameters, only for the rules that were requested"""
+    rules = {}
+    if args.offset_ms or args.scale != 1.0:
+        rules["shift"] = {"offset_ms": args.offset_ms, "scale": args.scale}
+    if args.gap_ms is not None:
+        rules["gaps"] = {"gap_ms": args.gap_ms}
+    if args.min_duration_ms is not None:
+        rules["min_duration"] = {"min_ms": args.min_duration_ms, "gap_ms": args.spacing_ms}
+    if args.max_cps is not None:
+        rules["max_cps"] = {"cps": args.max_cps, "gap_ms": args.spacing_ms}
+    if args.max_duration_ms is not None:
+        rules["max_duration"] = {"max_ms": args.max_duration_ms}
+    return rules
+
+
+def retime_track(track: SubtitleTrack, rules: dict) -> dict:
+    """
+    Apply rules in RULES order.
+
+    Returns:
+        {rule: cues changed}
+    """
+    appliers = {
+        "shift": track.shift,
+        "gaps": track.close_gaps,
+        "min_duration": track.min_duration,
+        "max_cps": track.max_cps,
+        "max_duration": track.max_duration,
+    }
+    return {rule: appliers[rule](**rules[rule]) for rule in RULES if rule in rules}
+
+
+def retime_files(paths: List[str], rules: dict, dry_run: bool) -> List[tuple]:
+    """
+    Worker task: re-time a group of files.
+
+    Returns:
+        [(path, cue_count, {rule: cues changed}, error)] per file
+    """
+    results = []
+    for path in paths:
+        try:
+            track = SubtitleTrack.read(path)
+            counts = retime_track(track, rules)
+            if not dry_run and any(counts.values()):
+                track.write(path)
+            results.append((path, len(track), counts, None))
+        except Exception as e:
+            results.append((path, 0, {}, str(e)))
+    return results
+
+
+def update_manifests(paths: List[str]) -> int:
+    """
+    Re-record rewritten files in the build manifest next to them (if any).
+
+    Returns:
+        Number of files found in a manifest folder
+    """
+    by_folder = {}
+    for path in paths:
+        by_folder.setdefault(Path(path).resolve().parent, []).append(path)
+
+    updated = 0
+    for folder, folder_paths in by_folder.items():
+        manifest_path = folder / MANIFEST_NAME
+        if not manifest_path.exists():
+            continue
+        manifest = BuildManifest(manifest_path)
+        for path in folder_paths:
+            manifest.refresh(path)
+        updated += len(folder_paths)
+    return updated
+
+
+def main():
+    """Main execution function"""
+    args = parse_args()
+
+    print("=" * 70)
+    print("  Batch Subtitle Re-timing" + ("  [DRY RUN]" if args.dry_run else ""))
+    print("=" * 70)
+    print()
+
+    rules = build_rules(args)
+    if not rules:
+        print("[ERROR] No rule selected (see --help for --gap-ms, --max-cps, ...)")
+        sys.exit(1)
+
+    files = collect_files(args.paths, args.pattern)
+    if not files:
+        print("[ERROR] No subtitle files found!")
+        sys.exit(1)
+
+    print(f"[INFO] {len(files)} file(s), rules: {', '.join(rule for rule in RULES if rule in rules)}")
+    print(f"[INFO] Worker processes: {max(1, args.workers)}")
+    print()
+
+    start_time = time.time()
+    totals = {rule: 0 for rule in rules}
+    total_cues = 0
+    changed_files = 0
+    changed_paths = []
+    failed = []
+
+    groups = [
+        [str(p) for p in files[i:i + CHUNK_FILES]]
+        for i in range(0, len(files), CHUNK_FILES)
+    ]
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [executor.submit(retime_files, group, rules, args.dry_run) for group in groups]
+        done_files = 0
+        for future in as_completed(futures):
+            for path, cues, counts, error in future.result():
+                done_files += 1
+                if error:
+                    failed.append((path, error))
+                    print(f"  [ERROR] {path}: {error}")
+                    continue
+                total_cues += cues
+                if any(counts.values()):
+                    changed_files += 1
+                    changed_paths.append(path)
+                for rule, count in counts.items():
+                    totals[rule] += count
+            print(f"  Progress: {done_files}/{len(files)}")
+
+    if changed_paths and not args.dry_run:
+        recorded = update_manifests(changed_paths)
+        if recorded:
+            print(f"[INFO] Updated the build manifest for {recorded} file(s)")
+
+    duration = time.time() - start_time
+
+    # Print summary
+    print("\n" + "=" * 70)
+    print("  DRY RUN REPORT" if args.dry_run else "  RE-TIMING COMPLETE!")
+    print("=" * 70)
+    print(f"\n[SUMMARY]")
+    print(f"  Files: {len(files)} ({changed_files} {'would change' if args.dry_run else 'changed'}, {len(failed)} failed)")
+    print(f"  Cues: {total_cues}")
+    print(f"  Time: {duration:.2f} seconds")
+    print("\n[CUES CHANGED PER RULE]")
+    for rule in RULES:
+        if rule in totals:
+            print(f"  {rule:<14}{totals[rule]:>10}")
+    print("=" * 70)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n[INFO] Process interrupted by user.")
+        sys.exit(0)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact SRT Container
+- Times stored as int64 millisecond columns (NumPy), text in one UTF-8 buffer
+- Single regex pass over a memory-mapped file, one writelines() call to save
+- Timing changes are vectorized operations on the start/end arrays
+- Kept free of torch/transformers imports so batch jobs start fast
+"""
+
+import os
+import re
+import mmap
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+
+# index line (optional), timing line (with any trailing position settings,
+# e.g. "X1:100 X2:200"), then text up to the next cue or EOF
+_CUE_REGEX = re.compile(
+    rb"\s*(?:-?\d+[ \t]*\r?\n)?"
+    rb"(\d+):(\d+):(\d+)[,.](\d+)[ \t]*-->[ \t]*(\d+):(\d+):(\d+)[,.](\d+)([^\r\n]*)(?:\r?\n|\Z)"
+    rb"(.*?)(?:\r?\n|\Z)"
+    rb"(?=\s*(?:-?\d+[ \t]*\r?\n)?\d+:\d+:\d+[,.]\d+[ \t]*-->|\s*\Z)",
+    re.S
+)
+
+_BLANK_LINES = re.compile(rb"\n\n+")
+
+
+def _legal_text(text: bytes) -> bytes:
+    """Same rule as srt.make_legal_content: no blank lines inside a cue"""
+    if text[:1] != b"\n" and b"\n\n" not in text:
+        return text
+    return _BLANK_LINES.sub(b"\n", text.strip(b"\n"))
+
+
+def _format_times(ms: np.ndarray) -> np.ndarray:
+    """HH:MM:SS,mmm strings for a whole column at once"""
+    ms = np.maximum(ms, 0)
+    hours, rest = np.divmod(ms, 3_600_000)
+    minutes, rest = np.divmod(rest, 60_000)
+    seconds, millis = np.divmod(rest, 1000)
+
+    def pad(values, width):
+        return np.char.zfill(values.astype(str), width)
+
+    return np.char.add(
+        np.char.add(np.char.add(pad(hours, 2), ":"), np.char.add(pad(minutes, 2), ":")),
+        np.char.add(np.char.add(pad(seconds, 2), ","), pad(millis, 3))
+    )
+
+
+class SubtitleTrack:
+    """
+    A whole subtitle file in three columns: start/end (ms) and text.
+
+    Text is one UTF-8 bytes buffer sliced by `offsets` (len + 1 entries), so a
+    parsed file costs a handful of arrays instead of one Subtitle and two
+    timedelta objects per cue. `proprietary` holds whatever followed the end
+    time on each timing line (like srt.Subtitle.proprietary), or is None when
+    no cue has any.
+    """
+
+    __slots__ = ("start", "end", "buffer", "offsets", "proprietary")
+
+    def __init__(self, start: np.ndarray, end: np.ndarray, buffer: bytes, offsets: np.ndarray,
+                 proprietary: Optional[List[bytes]] = None):
+        self.start = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.buffer = buffer
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.proprietary = proprietary if proprietary and any(proprietary) else None
+
+    @classmethod
+    def from_texts(cls, start_ms, end_ms, texts: List[str],
+                   proprietary: Optional[List[bytes]] = None) -> "SubtitleTrack":
+        """Build a track from timing columns and a list of texts"""
+        encoded = [text.replace("\r\n", "\n").encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        return cls(start_ms, end_ms, b"".join(encoded), offsets, proprietary)
+
+    @classmethod
+    def parse(cls, data: bytes) -> "SubtitleTrack":
+        """Parse SRT bytes (any buffer: bytes, mmap, memoryview)"""
+        cues = _CUE_REGEX.findall(data)
+        if not cues:
+            return cls.from_texts([], [], [])
+
+        fields = np.array([cue[:8] for cue in cues], dtype=bytes)
+        values = fields.astype(np.int64)
+        # "1,5" means 500 ms: scale the fraction to exactly three digits
+        for col in (3, 7):
+            digits = np.char.str_len(fields[:, col])
+            values[:, col] = np.where(
+                digits <= 3,
+                values[:, col] * 10 ** np.clip(3 - digits, 0, None),
+                values[:, col] // 10 ** np.clip(digits - 3, 0, None)
+            )
+        scale = np.array([3_600_000, 60_000, 1000, 1], dtype=np.int64)
+        start = values[:, :4] @ scale
+        end = values[:, 4:] @ scale
+
+        proprietary = [cue[8].strip() for cue in cues]
+        texts = [cue[9] for cue in cues]
+        if any(b"\r" in text for text in texts):
+            texts = [text.replace(b"\r\n", b"\n") for text in texts]
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in texts], out=offsets[1:])
+        return cls(start, end, b"".join(texts), offsets, proprietary)
+
+    @classmethod
+    def read(cls, path) -> "SubtitleTrack":
+        """Read an .srt file through a memory map (one regex pass)"""
+        with open(path, "rb") as f:
+            if f.seek(0, 2) == 0:
+                return cls.parse(b"")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return cls.parse(data)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def text(self, i: int) -> str:
+        """Text of cue i"""
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def texts(self) -> List[str]:
+        """All texts, in file order"""
+        bounds = self.offsets.tolist()
+        return [
+            self.buffer[a:b].decode("utf-8")
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def with_texts(self, texts: List[str]) -> "SubtitleTrack":
+        """Same timing and position settings, new texts (e.g. a translation)"""
+        return SubtitleTrack.from_texts(self.start.copy(), self.end.copy(), texts, self.proprietary)
+
+    def close_gaps(self, gap_ms: int = 10) -> int:
+        """
+        Extend each cue's end to gap_ms before the next cue starts (never
+        shortens, never overlaps). The last cue is left alone.
+
+        Returns:
+            Number of cues changed
+        """
+        if len(self) <= 1:
+            return 0
+        new_end = self.start[1:] - gap_ms
+        changed = (new_end > self.end[:-1]) & (new_end < self.start[1:])
+        self.end[:-1][changed] = new_end[changed]
+        return int(changed.sum())
+
+    def shift(self, offset_ms: int = 0, scale: float = 1.0) -> int:
+        """
+        Global retime: t -> t * scale + offset_ms (e.g. 25/23.976 for a
+        frame-rate fix), clamped at zero.
+
+        Returns:
+            Number of cues changed
+        """
+        old_start, old_end = self.start, self.end
+        self.start = np.maximum(np.round(old_start * scale) + offset_ms, 0).astype(np.int64)
+        self.end = np.maximum(np.round(old_end * scale) + offset_ms, 0).astype(np.int64)
+        return int(((self.start != old_start) | (self.end != old_end)).sum())
+
+    def _extend_ends(self, target_end: np.ndarray, gap_ms: int) -> int:
+        """Extend ends up to target_end, but never into the next cue"""
+        limit = np.full(len(self), np.iinfo(np.int64).max, dtype=np.int64)
+        limit[:-1] = self.start[1:] - gap_ms
+        new_end = np.minimum(target_end, limit)
+        changed = new_end > self.end
+        self.end[changed] = new_end[changed]
+        return int(changed.sum())
+
+    def min_duration(self, min_ms: int, gap_ms: int = 10) -> int:
+        """Lengthen cues shorter than min_ms (as far as the next cue allows)"""
+        return self._extend_ends(self.start + min_ms, gap_ms)
+
+    def max_duration(self, max_ms: int) -> int:
+        """Cut cues longer than max_ms"""
+        changed = self.end - self.start > max_ms
+        self.end[changed] = self.start[changed] + max_ms
+        return int(changed.sum())
+
+    def char_counts(self) -> np.ndarray:
+        """Visible characters per cue (line breaks not counted)"""
+        return np.array([len(text) - text.count("\n") for text in self.texts()], dtype=np.int64)
+
+    def max_cps(self, cps: float, gap_ms: int = 10) -> int:
+        """Lengthen cues that need more than cps characters per second to read"""
+        needed = np.ceil(self.char_counts() * 1000 / cps).astype(np.int64)
+        return self._extend_ends(self.start + needed, gap_ms)
+
+    def compose(self) -> List[bytes]:
+        """
+        Encode to SRT pieces like srt.compose(): cues sorted by start time,
+        renumbered from 1, and empty/negative/zero-length cues dropped.
+        """
+        lengths = np.diff(self.offsets)
+        useful = (lengths > 0) & (self.start >= 0) & (self.start < self.end)
+        order = np.flatnonzero(useful)
+        # Same order as sorted(subtitles): start, then end, then position
+        order = order[np.lexsort((order, self.end[order], self.start[order]))]
+
+        starts = _format_times(self.start[order])
+        ends = _format_times(self.end[order])
+        bounds = self.offsets.tolist()
+        proprietary = self.proprietary
+
+        pieces = []
+        number = 0
+        for i, start, end in zip(order.tolist(), starts.tolist(), ends.tolist()):
+            text = _legal_text(self.buffer[bounds[i]:bounds[i + 1]])
+            if not text.strip():
+                continue  # Whitespace-only cue
+            number += 1
+            if proprietary and proprietary[i]:
+                pieces.append(f"{number}\n{start} --> {end} ".encode("ascii"))
+                pieces.append(proprietary[i])
+                pieces.append(b"\n")
+            else:
+                pieces.append(f"{number}\n{start} --> {end}\n".encode("ascii"))
+            pieces.append(text)
+            pieces.append(b"\n\n")
+        return pieces
+
+    def write(self, path) -> None:
+        """
+        Write the track as .srt with a single writelines() call. The file is
+        replaced atomically, so readers never see a half-written subtitle.
+        """
+        path = Path(path)
+        temp_path = path.with_name(path.name + ".part")
+        with open(temp_path, "wb") as f:
+            f.writelines(self.compose())
+        os.replace(temp_path, path)
+
@@ -4,13 +4,21 @@
 Subtitle Processing Utilities
 - Timing adjustment for continuous display
 - NLLB translation from English to Vietnamese
+- transformers/torch are imported when a model is loaded, so importing the
+  timing helpers stays cheap (e.g. in decode worker processes)
 """
 
-import srt
 from pathlib import Path
-from datetime import timedelta
 from typing import List, Optional
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from translation_memory import TranslationMemory
+from subtitle_track import SubtitleTrack
+
+# Generation settings for NLLB (also part of the translation memory key)
+NLLB_GENERATION_PARAMS = {
+    "max_length": 512,
+    "num_beams": 5,
+    "early_stopping": True,
+}
 
 
 def adjust_continuous_timing(srt_path: str, gap_ms: int = 10) -> None:
@@ -27,31 +35,172 @@ def adjust_continuous_timing(srt_path: str, gap_ms: int = 10) -> None:
         - Subtitle cuối cùng giữ nguyên
     """
     # Read SRT file
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        subtitles = list(srt.parse(f.read()))
+    track = SubtitleTrack.read(srt_path)
     
-    if len(subtitles) <= 1:
+    if len(track) <= 1:
         return  # Nothing to adjust
     
-    # Adjust timing
-    gap_delta = timedelta(milliseconds=gap_ms)
+    # Adjust timing (vectorized over the start/end columns)
+    track.close_gaps(gap_ms)
+    
+    # Write back to file
+    track.write(srt_path)
+
+
+def build_token_budget_batches(
+    lengths: List[int],
+    max_batch_tokens: int = 4096,
+    max_batch_size: int = 64
+) -> List[List[int]]:
+    """
+    Gom subtitle thành các batch theo độ dài token.
+    
+    Args:
+        lengths: Số token của từng subtitle (theo thứ tự trong file)
+        max_batch_tokens: Ngân sách token cho mỗi batch (số câu x câu dài nhất)
+        max_batch_size: Số subtitle tối đa trong một batch
     
-    for i in range(len(subtitles) - 1):
-        current = subtitles[i]
-        next_sub = subtitles[i + 1]
+    Returns:
+        Danh sách batch, mỗi batch là list index gốc
+    
+    Logic:
+        - Sắp xếp index theo độ dài giảm dần (câu dài chạy trước, OOM lộ sớm)
+        - Các câu dài gần bằng nhau nằm cùng batch → padding tối thiểu
+        - Đóng batch khi chi phí padded vượt ngân sách hoặc đủ max_batch_size
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    
+    batches = []
+    current = []
+    longest = 0
+    
+    for idx in order:
+        length = max(lengths[idx], 1)
+        padded_cost = (len(current) + 1) * max(longest, length)
         
-        # Calculate new end time: next subtitle start - gap
-        new_end = next_sub.start - gap_delta
+        if current and (padded_cost > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+            longest = 0
         
-        # Only adjust if:
-        # 1. New end time is after current end (extending, not shortening)
-        # 2. New end time is before next start (no overlap)
-        if new_end > current.end and new_end < next_sub.start:
-            current.end = new_end
+        current.append(idx)
+        longest = max(longest, length)
     
-    # Write back to file
-    with open(srt_path, 'w', encoding='utf-8') as f:
-        f.write(srt.compose(subtitles))
+    if current:
+        batches.append(current)
+    
+    return batches
+
+
+def translate_texts_nllb(
+    texts: List[str],
+    translator_cache: tuple,
+    max_batch_tokens: int = 4096,
+    max_batch_size: int = 64,
+    progress_callback: Optional[callable] = None,
+    memory: Optional[TranslationMemory] = None,
+    num_beams: int = NLLB_GENERATION_PARAMS["num_beams"]
+) -> List[str]:
+    """
+    Dịch list text EN → VI với batch theo ngân sách token.
+    
+    Args:
+        texts: Danh sách câu tiếng Anh
+        translator_cache: Tuple (model, tokenizer, device) từ get_nllb_translator()
+        max_batch_tokens: Ngân sách token (đã padding) cho mỗi batch
+        max_batch_size: Số câu tối đa trong một batch
+        progress_callback: Function(current, total) để track progress
+        memory: TranslationMemory để tra cache trước khi dịch (optional)
+        num_beams: Beam size cho beam search
+    
+    Returns:
+        Danh sách bản dịch, đúng thứ tự của texts
+    """
+    model, tokenizer, device = translator_cache
+    total = len(texts)
+    translations = [""] * total
+    
+    if not texts:
+        return translations
+    
+    # Translation memory lookups first
+    cached = memory.get_many(texts) if memory else {}
+    for idx, translation in cached.items():
+        translations[idx] = translation
+    
+    # Only unique, uncached lines go to the model
+    pending = {}
+    for idx, text in enumerate(texts):
+        if idx not in cached:
+            pending.setdefault(text, []).append(idx)
+    sources = list(pending)
+    
+    done = len(cached)
+    if progress_callback and done:
+        progress_callback(done, total)
+    
+    if not sources:
+        return translations
+    
+    # Count tokens once (no padding) to plan the batches
+    lengths = [
+        len(ids) for ids in tokenizer(
+            sources,
+            truncation=True,
+            max_length=NLLB_GENERATION_PARAMS["max_length"]
+        )["input_ids"]
+    ]
+    batches = build_token_budget_batches(lengths, max_batch_tokens, max_batch_size)
+    
+    generation_params = {**NLLB_GENERATION_PARAMS, "num_beams": num_beams}
+    
+    for batch in batches:
+        batch_texts = [sources[i] for i in batch]
+        
+        if isinstance(model, CTranslate2NLLB):
+            decoded = model.translate(
+                batch_texts,
+                tokenizer,
+                num_beams=num_beams,
+                max_length=generation_params["max_length"]
+            )
+        else:
+            # Tokenize
+            inputs = tokenizer(
+                batch_texts,
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+                max_length=generation_params["max_length"]
+            ).to(device)
+            
+            # Translate
+            translated_tokens = model.generate(
+                **inputs,
+                forced_bos_token_id=tokenizer.convert_tokens_to_ids("vie_Latn"),
+                **generation_params
+            )
+            
+            # Decode
+            decoded = tokenizer.batch_decode(
+                translated_tokens,
+                skip_special_tokens=True
+            )
+        
+        # Put results back in original order
+        for i, translation in zip(batch, decoded):
+            for idx in pending[sources[i]]:
+                translations[idx] = translation
+                done += 1
+        
+        # Store per batch so a crash mid-file keeps finished work
+        if memory:
+            memory.put_many([(sources[i], t) for i, t in zip(batch, decoded)])
+        
+        if progress_callback:
+            progress_callback(done, total)
+    
+    return translations
 
 
 def translate_subtitle_nllb(
@@ -59,7 +208,8 @@ def translate_subtitle_nllb(
     output_path: str,
     model_name: str = "facebook/nllb-200-distilled-600M",
     device: str = "cuda",
-    batch_size: int = 8,
+    batch_size: int = 64,
+    max_batch_tokens: int = 4096,
     progress_callback: Optional[callable] = None
 ) -> None:
     """
@@ -70,15 +220,18 @@ def translate_subtitle_nllb(
         output_path: Đường dẫn output file .srt tiếng Việt
         model_name: NLLB model name
         device: 'cuda' hoặc 'cpu'
-        batch_size: Số subtitle dịch cùng lúc
+        batch_size: Số subtitle tối đa trong một batch
+        max_batch_tokens: Ngân sách token (đã padding) cho mỗi batch
         progress_callback: Function(current, total) để track progress
     
     Logic:
         - Load NLLB model và tokenizer
         - Parse file .srt
-        - Dịch từng batch subtitle text (giữ nguyên timestamps)
+        - Dịch theo batch đã sắp xếp theo độ dài (giữ nguyên timestamps)
         - Ghi file .srt mới
     """
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+    
     print(f"[INFO] Loading NLLB model: {model_name}")
     
     # Load model and tokenizer
@@ -103,58 +256,32 @@ def translate_subtitle_nllb(
             raise
     
     # Read SRT file
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        subtitles = list(srt.parse(f.read()))
+    track = SubtitleTrack.read(srt_path)
     
-    if not subtitles:
+    if not len(track):
         print("[WARNING] No subtitles found in file")
         return
     
-    total = len(subtitles)
+    total = len(track)
     print(f"[INFO] Translating {total} subtitle(s)...")
     
-    # Translate in batches
-    for i in range(0, total, batch_size):
-        batch = subtitles[i:i + batch_size]
-        texts = [sub.content for sub in batch]
-        
-        # Tokenize
-        inputs = tokenizer(
-            texts,
-            return_tensors="pt",
-            padding=True,
-            truncation=True,
-            max_length=512
-        ).to(device)
-        
-        # Translate
-        translated_tokens = model.generate(
-            **inputs,
-            forced_bos_token_id=tokenizer.convert_tokens_to_ids("vie_Latn"),
-            max_length=512,
-            num_beams=5,
-            early_stopping=True
-        )
-        
-        # Decode
-        translations = tokenizer.batch_decode(
-            translated_tokens,
-            skip_special_tokens=True
-        )
-        
-        # Update subtitle content (keep timing)
-        for j, translation in enumerate(translations):
-            batch[j].content = translation
-        
-        # Progress callback
+    def report_progress(current, total):
         if progress_callback:
-            progress_callback(min(i + batch_size, total), total)
+            progress_callback(current, total)
         else:
-            print(f"  Progress: {min(i + batch_size, total)}/{total}")
+            print(f"  Progress: {current}/{total}")
+    
+    # Translate in length-sorted batches (keep timing)
+    translations = translate_texts_nllb(
+        track.texts(),
+        (model, tokenizer, device),
+        max_batch_tokens=max_batch_tokens,
+        max_batch_size=batch_size,
+        progress_callback=report_progress
+    )
     
     # Write translated subtitles
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(srt.compose(subtitles))
+    track.with_texts(translations).write(output_path)
     
     print(f"[SUCCESS] Vietnamese subtitle saved to: {output_path}")
 
@@ -162,41 +289,190 @@ def translate_subtitle_nllb(
 # Cache for loaded models to avoid reloading
 _nllb_model_cache = {}
 
+# Translation engines accepted by get_nllb_translator()
+NLLB_ENGINES = ("transformers", "torch-int8", "ctranslate2")
+
 
-def get_nllb_translator(model_name: str, device: str):
+class CTranslate2NLLB:
+    """
+    NLLB converted to CTranslate2, used in place of the transformers model.
+    Exposes translate() instead of generate(); translate_texts_nllb() picks
+    the right call.
+    """
+    
+    def __init__(self, translator):
+        self.translator = translator
+    
+    def translate(self, texts: List[str], tokenizer, num_beams: int, max_length: int) -> List[str]:
+        sources = [
+            tokenizer.convert_ids_to_tokens(
+                tokenizer.encode(text, truncation=True, max_length=max_length)
+            )
+            for text in texts
+        ]
+        results = self.translator.translate_batch(
+            sources,
+            target_prefix=[["vie_Latn"]] * len(texts),
+            beam_size=num_beams,
+            max_decoding_length=max_length
+        )
+        
+        translations = []
+        for result in results:
+            tokens = result.hypotheses[0][1:]  # Drop the target language token
+            translations.append(
+                tokenizer.decode(
+                    tokenizer.convert_tokens_to_ids(tokens),
+                    skip_special_tokens=True
+                )
+            )
+        return translations
+
+
+def set_cpu_threads(intra_threads: int = 0, inter_threads: int = 0) -> None:
+    """Configure torch CPU thread pools (0 = keep library default)"""
+    import torch
+    
+    if intra_threads > 0:
+        torch.set_num_threads(intra_threads)
+    if inter_threads > 0:
+        try:
+            torch.set_num_interop_threads(inter_threads)
+        except RuntimeError:
+            # Can only be set once, before any parallel work has started
+            pass
+
+
+def load_ctranslate2_nllb(
+    model_name: str,
+    device: str,
+    compute_type: str = "int8",
+    ct2_model_dir: Optional[str] = None,
+    intra_threads: int = 0,
+    inter_threads: int = 1
+) -> CTranslate2NLLB:
+    """
+    Load NLLB through CTranslate2, converting the Hugging Face checkpoint on
+    first use.
+    
+    Args:
+        model_name: Hugging Face model name
+        device: 'cuda' hoặc 'cpu'
+        compute_type: CTranslate2 quantization (int8, int8_float16, float16, ...)
+        ct2_model_dir: Folder of the converted model (default: models/<name>-ct2-<compute_type>)
+        intra_threads: Threads per translation (0 = auto)
+        inter_threads: Translations running in parallel
+    """
+    import ctranslate2
+    
+    if ct2_model_dir is None:
+        ct2_model_dir = Path(__file__).parent / "models" / f"{model_name.split('/')[-1]}-ct2-{compute_type}"
+    ct2_model_dir = Path(ct2_model_dir)
+    
+    if not (ct2_model_dir / "model.bin").exists():
+        print(f"[INFO] Converting {model_name} to CTranslate2 ({compute_type})...")
+        converter = ctranslate2.converters.TransformersConverter(model_name)
+        converter.convert(str(ct2_model_dir), quantization=compute_type, force=True)
+        print(f"[SUCCESS] Converted model saved to: {ct2_model_dir}")
+    
+    translator = ctranslate2.Translator(
+        str(ct2_model_dir),
+        device=device,
+        compute_type=compute_type,
+        intra_threads=intra_threads,
+        inter_threads=inter_threads
+    )
+    return CTranslate2NLLB(translator)
+
+
+def get_nllb_translator(
+    model_name: str,
+    device: str,
+    engine: str = "transformers",
+    compute_type: str = "int8",
+    ct2_model_dir: Optional[str] = None,
+    intra_threads: int = 0,
+    inter_threads: int = 1
+):
     """
     Get cached NLLB translator or create new one.
     Returns (model, tokenizer, device)
+    
+    Engines:
+        - transformers: full-precision PyTorch model (GPU or CPU)
+        - torch-int8: PyTorch dynamic int8 quantization (CPU only)
+        - ctranslate2: converted model run by CTranslate2 (CPU or GPU)
     """
-    cache_key = f"{model_name}_{device}"
+    if engine not in NLLB_ENGINES:
+        raise ValueError(f"Unknown NLLB engine '{engine}', expected one of {NLLB_ENGINES}")
+    
+    cache_key = f"{model_name}_{device}_{engine}_{compute_type}"
     
     if cache_key not in _nllb_model_cache:
-        print(f"[INFO] Loading NLLB model: {model_name}")
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
         
-        try:
-            tokenizer = AutoTokenizer.from_pretrained(
-                model_name,
-                src_lang="eng_Latn"
-            )
-            model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-            model = model.to(device)
-            model.eval()
-            actual_device = device
-            print(f"[SUCCESS] Model loaded on {device}")
-        except Exception as e:
-            if device == "cuda":
+        print(f"[INFO] Loading NLLB model: {model_name} ({engine})")
+        
+        tokenizer = AutoTokenizer.from_pretrained(
+            model_name,
+            src_lang="eng_Latn"
+        )
+        
+        if engine == "ctranslate2":
+            try:
+                model = load_ctranslate2_nllb(
+                    model_name, device, compute_type, ct2_model_dir,
+                    intra_threads, inter_threads
+                )
+                actual_device = device
+            except (RuntimeError, ValueError) as e:
+                if device != "cuda":
+                    raise
                 print(f"[WARNING] Failed to load on CUDA: {e}")
                 print("[INFO] Falling back to CPU...")
-                tokenizer = AutoTokenizer.from_pretrained(
-                    model_name,
-                    src_lang="eng_Latn"
+                model = load_ctranslate2_nllb(
+                    model_name, "cpu", compute_type, ct2_model_dir,
+                    intra_threads, inter_threads
                 )
+                actual_device = "cpu"
+            print(f"[SUCCESS] Model loaded on {actual_device} (CTranslate2 {compute_type})")
+        
+        elif engine == "torch-int8":
+            import torch
+            
+            set_cpu_threads(intra_threads, inter_threads)
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+            model.eval()
+            model = torch.quantization.quantize_dynamic(
+                model,
+                {torch.nn.Linear},
+                dtype=torch.qint8
+            )
+            actual_device = "cpu"
+            if device != "cpu":
+                print("[INFO] Dynamic int8 quantization runs on CPU only")
+            print("[SUCCESS] Model loaded on CPU (dynamic int8)")
+        
+        else:
+            try:
                 model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+                model = model.to(device)
                 model.eval()
-                actual_device = "cpu"
-                print("[SUCCESS] Model loaded on CPU")
-            else:
-                raise
+                actual_device = device
+                print(f"[SUCCESS] Model loaded on {device}")
+            except Exception as e:
+                if device == "cuda":
+                    print(f"[WARNING] Failed to load on CUDA: {e}")
+                    print("[INFO] Falling back to CPU...")
+                    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+                    model.eval()
+                    actual_device = "cpu"
+                    print("[SUCCESS] Model loaded on CPU")
+                else:
+                    raise
+            
+            if actual_device == "cpu":
+                set_cpu_threads(intra_threads, inter_threads)
         
         _nllb_model_cache[cache_key] = (model, tokenizer, actual_device)
     
@@ -207,7 +483,10 @@ def translate_subtitle_nllb_cached(
     srt_path: str,
     output_path: str,
     translator_cache: tuple,
-    batch_size: int = 8
+    batch_size: int = 64,
+    max_batch_tokens: int = 4096,
+    memory: Optional[TranslationMemory] = None,
+    num_beams: int = NLLB_GENERATION_PARAMS["num_beams"]
 ) -> None:
     """
     Dịch subtitle sử dụng cached translator.
@@ -216,53 +495,26 @@ def translate_subtitle_nllb_cached(
         srt_path: Đường dẫn file .srt tiếng Anh
         output_path: Đường dẫn output file .srt tiếng Việt
         translator_cache: Tuple (model, tokenizer, device) từ get_nllb_translator()
-        batch_size: Số subtitle dịch cùng lúc
+        batch_size: Số subtitle tối đa trong một batch
+        max_batch_tokens: Ngân sách token (đã padding) cho mỗi batch
+        memory: TranslationMemory để tra cache trước khi dịch (optional)
+        num_beams: Beam size cho beam search
     """
-    model, tokenizer, device = translator_cache
-    
     # Read SRT file
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        subtitles = list(srt.parse(f.read()))
+    track = SubtitleTrack.read(srt_path)
     
-    if not subtitles:
+    if not len(track):
         print("[WARNING] No subtitles found in file")
         return
     
-    total = len(subtitles)
-    
-    # Translate in batches
-    for i in range(0, total, batch_size):
-        batch = subtitles[i:i + batch_size]
-        texts = [sub.content for sub in batch]
-        
-        # Tokenize
-        inputs = tokenizer(
-            texts,
-            return_tensors="pt",
-            padding=True,
-            truncation=True,
-            max_length=512
-        ).to(device)
-        
-        # Translate
-        translated_tokens = model.generate(
-            **inputs,
-            forced_bos_token_id=tokenizer.convert_tokens_to_ids("vie_Latn"),
-            max_length=512,
-            num_beams=5,
-            early_stopping=True
-        )
-        
-        # Decode
-        translations = tokenizer.batch_decode(
-            translated_tokens,
-            skip_special_tokens=True
-        )
-        
-        # Update subtitle content (keep timing)
-        for j, translation in enumerate(translations):
-            batch[j].content = translation
+    translations = translate_texts_nllb(
+        track.texts(),
+        translator_cache,
+        max_batch_tokens=max_batch_tokens,
+        max_batch_size=batch_size,
+        memory=memory,
+        num_beams=num_beams
+    )
     
-    # Write translated subtitles
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(srt.compose(subtitles))
+    # Write translated subtitles (keep timing)
+    track.with_texts(translations).write(output_path)
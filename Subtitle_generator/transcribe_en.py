@@ -8,10 +8,34 @@ Pipeline: Transcribe (EN) → Refine → Adjust Timing
 import os
 import sys
 import time
+import queue
+import shutil
+import threading
+import argparse
+import tempfile
 from pathlib import Path
 from typing import List, Tuple
-import stable_whisper
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+    as_completed,
+    FIRST_COMPLETED
+)
+import numpy as np
+# stable_whisper (and with it torch) is imported where a model is loaded: decode
+# worker processes re-import this module under spawn and must start fast
+from audio_utils import SAMPLE_RATE, decode_audio, prepare_audio, open_audio
+from chunked_transcribe import (
+    find_split_points,
+    plan_chunks,
+    stitch_segments,
+    checkpoint_dir_for,
+    load_checkpoint,
+    save_checkpoint
+)
 from subtitle_utils import adjust_continuous_timing
+from build_manifest import open_manifest, KEEP_STATUSES
 
 # Configuration
 INPUT_DIR = Path(__file__).parent / "input"
@@ -27,10 +51,65 @@ SUPPORTED_FORMATS = {
 MODEL_NAME = "large-v3"
 LANGUAGE = "en"
 DEVICE = "cuda"  # Will auto-fallback to CPU if CUDA not available
+BACKEND = "whisper"  # "whisper" (PyTorch) or "faster-whisper" (CTranslate2)
+COMPUTE_TYPE = "int8_float16"  # faster-whisper only: int8 on CPU, int8_float16/float16 on GPU
+BACKENDS = ("whisper", "faster-whisper")
+
+# Decoding settings (also recorded in the build manifest: changing any of
+# them marks existing subtitles as stale)
+WHISPER_OPTIONS = {
+    # Quality settings
+    "word_timestamps": True,
+    "beam_size": 5,
+    "best_of": 5,
+    "temperature": 0.0,
+    
+    # Context awareness
+    "condition_on_previous_text": True,
+    "patience": 1.5,
+    
+    # VAD (Voice Activity Detection)
+    "vad": True,
+    "suppress_silence": True,
+    
+    # Thresholds
+    "no_speech_threshold": 0.5,
+    "compression_ratio_threshold": 2.2,
+    "logprob_threshold": -0.8,
+    
+    # Regroup for better segments
+    "regroup": True,
+}
+# Refine word timestamps after transcription (stable-ts refine). It needs the
+# PyTorch model: with faster-whisper a PyTorch copy of MODEL_NAME is loaded
+# for it (~3GB more VRAM for large-v3, shared by all GPU slots)
+REFINE = True
+REFINE_OPTIONS = {
+    "rel_prob_decrease": 0.3,
+    "abs_prob_decrease": 0.05,
+    "word_level": True,
+    "precision": 0.1,
+}
 
 # Timing settings
 TIMING_GAP_MS = 10  # Gap between subtitles in milliseconds
 
+# Pipeline settings
+DECODE_WORKERS = 2  # Processes decoding upcoming files while the GPU is busy
+GPU_SLOTS = 1  # Model replicas transcribing at once (each needs its own VRAM)
+VRAM_PER_REPLICA_GB = 6  # Rough VRAM needed per large-v3 replica
+
+# Audio decode settings (each input is decoded once, shared by transcribe + refine)
+MMAP_MIN_SECONDS = 600  # Longer inputs are memory-mapped from disk instead of RAM
+USE_AUDIO_CACHE = False  # Keep decoded audio so re-runs skip decoding entirely
+AUDIO_CACHE_DIR = OUTPUT_DIR / ".audio_cache"  # Keyed by input file hash
+
+# Long-form settings (memory stays flat regardless of input length)
+CHUNKED_MODE = True  # Split inputs longer than ~1.5 chunks at quiet points
+CHUNK_SECONDS = 600  # Target chunk length
+CHUNK_OVERLAP_SECONDS = 5  # Extra audio on each side; duplicate words are dropped
+CHECKPOINT_DIR = OUTPUT_DIR / ".checkpoints"  # Finished chunks, for resuming
+
 
 def print_banner():
     """Print script banner"""
@@ -63,16 +142,51 @@ def get_input_files() -> List[Path]:
     return sorted(files)
 
 
-def load_model():
-    """Load Whisper model"""
+def load_model(backend: str = BACKEND):
+    """Load Whisper model with the selected backend"""
     print("\n" + "=" * 70)
     print("[STEP 1/3] Loading Whisper model...")
     print("=" * 70)
     print(f"[INFO] Model: {MODEL_NAME}")
+    print(f"[INFO] Backend: {backend}")
     print(f"[INFO] Device: {DEVICE}")
-    print("[INFO] Precision: FP16 (auto when using CUDA)")
+    if backend == "faster-whisper":
+        print(f"[INFO] Precision: {COMPUTE_TYPE}")
+    else:
+        print("[INFO] Precision: FP16 (auto when using CUDA)")
     print("[INFO] This may take a few minutes on first run (downloading model)...")
     
+    import stable_whisper
+    
+    if backend == "faster-whisper":
+        try:
+            model = stable_whisper.load_faster_whisper(
+                MODEL_NAME,
+                device=DEVICE,
+                compute_type=COMPUTE_TYPE
+            )
+            print("[SUCCESS] Model loaded successfully!")
+        except (RuntimeError, ValueError) as e:
+            if DEVICE != "cuda":
+                raise
+            print(f"[WARNING] CUDA not available ({e}), falling back to CPU (int8)...")
+            model = stable_whisper.load_faster_whisper(
+                MODEL_NAME,
+                device="cpu",
+                compute_type="int8"
+            )
+            print("[SUCCESS] Model loaded on CPU!")
+        if REFINE:
+            load_refiner()
+        return model
+    
+    return load_pytorch_model()
+
+
+def load_pytorch_model():
+    """Load the PyTorch Whisper model (falls back to CPU without CUDA)"""
+    import stable_whisper
+    
     try:
         model = stable_whisper.load_model(
             name=MODEL_NAME,
@@ -93,10 +207,151 @@ def load_model():
             raise
 
 
-def transcribe_file(model, input_file: Path) -> Tuple[bool, float, Path]:
+def parse_args():
+    """Parse command line options (defaults come from the settings above)"""
+    parser = argparse.ArgumentParser(description="English Subtitle Generator")
+    parser.add_argument(
+        "--workers", type=int, default=DECODE_WORKERS,
+        help=f"audio decode worker processes (default: {DECODE_WORKERS})"
+    )
+    parser.add_argument(
+        "--gpu-slots", type=int, default=GPU_SLOTS,
+        help=f"Whisper model replicas running at once (default: {GPU_SLOTS})"
+    )
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default=BACKEND,
+        help=f"inference engine (default: {BACKEND})"
+    )
+    parser.add_argument(
+        "--benchmark", metavar="FILE",
+        help="transcribe FILE with every backend and report real-time factor and peak memory"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="also re-transcribe *_en.srt files that were edited by hand"
+    )
+    return parser.parse_args()
+
+
+def fit_gpu_slots(requested: int) -> int:
+    """Limit model replicas to what the free VRAM can hold"""
+    if requested <= 1 or DEVICE != "cuda":
+        return max(1, requested)
+    
+    try:
+        import torch
+        if not torch.cuda.is_available():
+            return 1
+        free_bytes, _ = torch.cuda.mem_get_info()
+        fit = max(1, int(free_bytes / (VRAM_PER_REPLICA_GB * 1024 ** 3)))
+    except Exception:
+        return requested
+    
+    if fit < requested:
+        print(f"[WARNING] Free VRAM fits {fit} replica(s), using {fit} instead of {requested}")
+    return min(requested, fit)
+
+
+# PyTorch model that refines faster-whisper results (one, shared by all slots)
+_refiner = None
+_refiner_lock = threading.Lock()
+_refine_warned = False
+
+
+def load_refiner():
+    """Load the PyTorch model used to refine faster-whisper results (once)"""
+    global _refiner
+    if _refiner is None:
+        print(f"[INFO] Loading PyTorch {MODEL_NAME} for timestamp refinement...")
+        _refiner = load_pytorch_model()
+    return _refiner
+
+
+def is_faster_whisper(model) -> bool:
+    """True for models loaded with stable_whisper.load_faster_whisper()"""
+    return type(model).__module__.startswith("faster_whisper")
+
+
+def run_whisper(model, audio):
+    """
+    Transcribe and refine one waveform (whole file or one chunk)
+    
+    Returns:
+        stable-ts WhisperResult
+    """
+    faster = is_faster_whisper(model)
+    transcribe = getattr(model, "transcribe_stable", model.transcribe) if faster else model.transcribe
+    
+    options = dict(WHISPER_OPTIONS)
+    if faster:
+        # faster-whisper spells the log-prob threshold differently
+        options["log_prob_threshold"] = options.pop("logprob_threshold")
+    
+    result = transcribe(audio=audio, language=LANGUAGE, **options)
+    
+    if not REFINE:
+        return result
+    
+    # refine() needs the PyTorch model's token probabilities: CTranslate2
+    # results are refined by the shared PyTorch copy loaded by load_model()
+    if hasattr(model, "refine"):
+        model.refine(audio=audio, result=result, inplace=True, **REFINE_OPTIONS)
+    elif _refiner is not None:
+        with _refiner_lock:
+            _refiner.refine(audio=audio, result=result, inplace=True, **REFINE_OPTIONS)
+    else:
+        global _refine_warned
+        if not _refine_warned:
+            _refine_warned = True
+            print("[WARNING] REFINE is on but no PyTorch model is loaded - timestamps not refined")
+    
+    return result
+
+
+def transcribe_params(backend: str = BACKEND) -> dict:
+    """Settings that affect *_en.srt (the build manifest key)"""
+    params = {
+        "model": MODEL_NAME,
+        "backend": backend,
+        "language": LANGUAGE,
+        "sample_rate": SAMPLE_RATE,
+        "whisper": WHISPER_OPTIONS,
+        "timing_gap_ms": TIMING_GAP_MS,
+    }
+    if backend == "faster-whisper":
+        params["compute_type"] = COMPUTE_TYPE
+    if REFINE:
+        params["refine"] = REFINE_OPTIONS
+    return params
+
+
+def save_english_srt(result, en_output: Path) -> None:
+    """
+    Write the English subtitle and close gaps between cues. The finished
+    file replaces en_output atomically, so a crash never leaves a partial
+    *_en.srt behind.
+    """
+    temp_output = en_output.with_name(f"{en_output.stem}.part.srt")
+    result.to_srt_vtt(
+        str(temp_output),
+        word_level=False
+    )
+    
+    print(f"[STEP 3/3] Adjusting timing (gap={TIMING_GAP_MS}ms)...")
+    adjust_continuous_timing(str(temp_output), gap_ms=TIMING_GAP_MS)
+    os.replace(temp_output, en_output)
+
+
+def transcribe_file(model, input_file: Path, audio=None) -> Tuple[bool, float, Path]:
     """
     Transcribe a single file to English subtitle
     
+    Args:
+        model: Loaded Whisper model
+        input_file: Source video/audio file
+        audio: Pre-decoded 16 kHz waveform (decoded once here if None);
+               the same buffer feeds both transcribe and refine
+    
     Returns:
         (success: bool, duration: float, output_file: Path)
     """
@@ -106,56 +361,17 @@ def transcribe_file(model, input_file: Path) -> Tuple[bool, float, Path]:
     en_output = OUTPUT_DIR / f"{input_file.stem}_en.srt"
     
     try:
-        # STEP 1: Transcribe
-        print("[STEP 1/3] Transcribing (English)...")
-        result = model.transcribe(
-            audio=str(input_file),
-            language=LANGUAGE,
-            
-            # Quality settings
-            word_timestamps=True,
-            beam_size=5,
-            best_of=5,
-            temperature=0.0,
-            
-            # Context awareness
-            condition_on_previous_text=True,
-            patience=1.5,
-            
-            # VAD (Voice Activity Detection)
-            vad=True,
-            suppress_silence=True,
-            
-            # Thresholds
-            no_speech_threshold=0.5,
-            compression_ratio_threshold=2.2,
-            logprob_threshold=-0.8,
-            
-            # Regroup for better segments
-            regroup=True,
-        )
+        if audio is None:
+            print("[INFO] Decoding audio...")
+            audio = decode_audio(str(input_file))
         
-        # STEP 2: Refine timestamps
+        # STEP 1 + 2: Transcribe and refine timestamps
+        print("[STEP 1/3] Transcribing (English)...")
         print("[STEP 2/3] Refining timestamps...")
-        model.refine(
-            audio=str(input_file),
-            result=result,
-            rel_prob_decrease=0.3,
-            abs_prob_decrease=0.05,
-            word_level=True,
-            precision=0.1,
-            inplace=True
-        )
+        result = run_whisper(model, audio)
         
-        # Save English subtitle
-        result.to_srt_vtt(
-            str(en_output),
-            word_level=False
-        )
-        
-        # STEP 3: Adjust timing for continuous display
-        print(f"[STEP 3/3] Adjusting timing (gap={TIMING_GAP_MS}ms)...")
-        adjust_continuous_timing(str(en_output), gap_ms=TIMING_GAP_MS)
+        # STEP 3: Save and adjust timing for continuous display
+        save_english_srt(result, en_output)
         
         duration = time.time() - start_time
         print(f"[OUTPUT] {en_output.name}")
@@ -171,10 +387,303 @@ def transcribe_file(model, input_file: Path) -> Tuple[bool, float, Path]:
         return False, duration, en_output
 
 
+def transcribe_file_chunked(
+    free_models: queue.Queue,
+    input_file: Path,
+    audio,
+    slots: int = 1,
+    backend: str = BACKEND
+) -> Tuple[bool, float, Path]:
+    """
+    Transcribe a long file in chunks split at quiet points.
+    
+    Chunks run in parallel on every free model replica, finished chunks are
+    checkpointed to disk (an interrupted run resumes from them), and only one
+    chunk of audio is copied into RAM at a time per replica.
+    
+    Args:
+        free_models: Queue of idle model replicas (shared with other files)
+        input_file: Source video/audio file
+        audio: Decoded 16 kHz waveform (usually memory-mapped)
+        slots: Number of model replicas (chunks in flight)
+        backend: Backend of the replicas (part of the checkpoint key)
+    
+    Returns:
+        (success: bool, duration: float, output_file: Path)
+    """
+    print(f"\n[PROCESSING] {input_file.name} (chunked)")
+    
+    start_time = time.time()
+    en_output = OUTPUT_DIR / f"{input_file.stem}_en.srt"
+    
+    try:
+        points = find_split_points(audio, SAMPLE_RATE, CHUNK_SECONDS)
+        chunks = plan_chunks(points, SAMPLE_RATE, CHUNK_OVERLAP_SECONDS)
+        # Decoding options are part of the key: changed settings never reuse old chunks
+        checkpoint_dir = checkpoint_dir_for(CHECKPOINT_DIR, input_file, {
+            **transcribe_params(backend),
+            "chunk_seconds": CHUNK_SECONDS,
+            "overlap_seconds": CHUNK_OVERLAP_SECONDS,
+        })
+        
+        stitched = {}
+        for chunk in chunks:
+            segments = load_checkpoint(checkpoint_dir, chunk)
+            if segments is not None:
+                stitched[chunk["index"]] = segments
+        
+        todo = [chunk for chunk in chunks if chunk["index"] not in stitched]
+        print(f"[INFO] {len(chunks)} chunk(s) of ~{CHUNK_SECONDS // 60} min, "
+              f"{len(chunks) - len(todo)} restored from checkpoint")
+        
+        def chunk_job(chunk):
+            chunk_audio = np.array(audio[chunk["start"]:chunk["end"]])
+            model = free_models.get()
+            try:
+                result = run_whisper(model, chunk_audio)
+            finally:
+                free_models.put(model)
+            segments = stitch_segments(result.to_dict()["segments"], chunk)
+            save_checkpoint(checkpoint_dir, chunk, segments)
+            return segments
+        
+        print("[STEP 1/3] Transcribing (English)...")
+        print("[STEP 2/3] Refining timestamps...")
+        with ThreadPoolExecutor(max_workers=slots) as chunk_pool:
+            futures = {chunk_pool.submit(chunk_job, chunk): chunk for chunk in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                chunk = futures[future]
+                stitched[chunk["index"]] = future.result()
+                print(f"  [{done}/{len(todo)}] Chunk {chunk['index'] + 1} "
+                      f"({chunk['keep_start'] / 60:.1f} min) ✓")
+        
+        # STEP 3: Stitch, save and adjust timing for continuous display
+        segments = [seg for index in sorted(stitched) for seg in stitched[index]]
+        from stable_whisper import WhisperResult
+        result = WhisperResult({"language": LANGUAGE, "segments": segments})
+        save_english_srt(result, en_output)
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        
+        duration = time.time() - start_time
+        print(f"[OUTPUT] {en_output.name}")
+        print(f"[SUCCESS] Completed in {duration:.2f} seconds")
+        return True, duration, en_output
+        
+    except Exception as e:
+        duration = time.time() - start_time
+        print(f"[ERROR] Failed after {duration:.2f} seconds (finished chunks are checkpointed)")
+        print(f"[ERROR] {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False, duration, en_output
+
+
+def transcribe_all(
+    models,
+    files: List[Path],
+    decode_workers: int,
+    backend: str = BACKEND,
+    manifest=None
+) -> List[Tuple[str, bool, float]]:
+    """
+    Pipeline scheduler: decode upcoming files in worker processes while the
+    current ones are on the GPU. Workers hand over .npy buffers on disk, so
+    decoded audio never travels through process pipes.
+    
+    Args:
+        models: One loaded model per GPU slot
+        files: Files to transcribe
+        decode_workers: Number of decode processes
+        backend: Backend the models were loaded with
+        manifest: BuildManifest to record finished subtitles in (optional)
+    
+    Returns:
+        List of (filename, success, duration) in input order
+    """
+    free_models = queue.Queue()
+    for model in models:
+        free_models.put(model)
+    
+    def gpu_job(input_file, npy_path, is_temporary):
+        audio = open_audio(npy_path, MMAP_MIN_SECONDS)
+        try:
+            if CHUNKED_MODE and len(audio) > CHUNK_SECONDS * SAMPLE_RATE * 1.5:
+                # Chunk jobs take replicas from the pool themselves
+                outcome = transcribe_file_chunked(free_models, input_file, audio, len(models), backend)
+            else:
+                model = free_models.get()
+                try:
+                    outcome = transcribe_file(model, input_file, audio)
+                finally:
+                    free_models.put(model)
+            
+            success, _, en_output = outcome
+            if success and manifest is not None:
+                manifest.record(en_output, [input_file], transcribe_params(backend))
+            return outcome
+        finally:
+            del audio  # Release the memory map before deleting its file
+            if is_temporary:
+                try:
+                    os.remove(npy_path)
+                except OSError:
+                    pass
+    
+    outcomes = {}
+    pending_files = iter(files)
+    decoding = []
+    running = {}
+    work_dir = tempfile.mkdtemp(prefix="transcribe_audio_")
+    cache_dir = str(AUDIO_CACHE_DIR) if USE_AUDIO_CACHE else None
+    
+    def submit_next_decode(decode_pool):
+        input_file = next(pending_files, None)
+        if input_file is not None:
+            future = decode_pool.submit(prepare_audio, str(input_file), work_dir, cache_dir)
+            decoding.append((input_file, future))
+    
+    with ProcessPoolExecutor(max_workers=decode_workers) as decode_pool, \
+            ThreadPoolExecutor(max_workers=len(models)) as gpu_pool:
+        # Keep the decoders and every GPU slot fed
+        for _ in range(decode_workers + len(models)):
+            submit_next_decode(decode_pool)
+        
+        for position, _ in enumerate(files, 1):
+            input_file, decode_future = decoding.pop(0)
+            
+            try:
+                npy_path, is_temporary = decode_future.result()
+            except Exception as e:
+                print(f"\n[ERROR] Failed to decode {input_file.name}: {e}")
+                outcomes[input_file] = (False, 0.0)
+                submit_next_decode(decode_pool)
+                continue
+            
+            # Bound decoded audio held in memory: wait for a free GPU slot
+            while len(running) >= len(models):
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    success, duration, _ = future.result()
+                    outcomes[running.pop(future)] = (success, duration)
+            
+            print(f"\n{'=' * 70}")
+            print(f"[FILE {position}/{len(files)}] {input_file.name}")
+            print(f"{'=' * 70}")
+            running[gpu_pool.submit(gpu_job, input_file, npy_path, is_temporary)] = input_file
+            submit_next_decode(decode_pool)
+        
+        for future in running:
+            success, duration, _ = future.result()
+            outcomes[running[future]] = (success, duration)
+    
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return [(f.name, *outcomes[f]) for f in files]
+
+
+class PeakMemorySampler:
+    """Sample process RSS and device-wide GPU memory in a background thread"""
+    
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_gpu = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._gpu_baseline = self._gpu_used()
+    
+    @staticmethod
+    def _rss() -> int:
+        try:
+            import psutil
+            return psutil.Process().memory_info().rss
+        except ImportError:
+            return 0
+    
+    @staticmethod
+    def _gpu_used() -> int:
+        # Device-level counter, so it also sees CTranslate2 allocations
+        try:
+            import torch
+            if torch.cuda.is_available():
+                free_bytes, total_bytes = torch.cuda.mem_get_info()
+                return total_bytes - free_bytes
+        except Exception:
+            pass
+        return 0
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self._rss())
+            self.peak_gpu = max(self.peak_gpu, self._gpu_used() - self._gpu_baseline)
+            self._stop.wait(self.interval)
+    
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_benchmark(input_file: Path, backends=BACKENDS):
+    """
+    Transcribe the same input with each backend and report real-time factor
+    (processing time / audio duration) and peak memory.
+    """
+    import gc
+    
+    print(f"[BENCHMARK] {input_file.name}")
+    audio = decode_audio(str(input_file))
+    audio_seconds = len(audio) / SAMPLE_RATE
+    print(f"[INFO] Audio duration: {audio_seconds:.1f} seconds")
+    
+    rows = []
+    for backend in backends:
+        with PeakMemorySampler() as sampler:
+            load_start = time.time()
+            model = load_model(backend)
+            load_time = time.time() - load_start
+            
+            print(f"\n[BENCHMARK] Transcribing with {backend}...")
+            run_start = time.time()
+            run_whisper(model, audio)
+            run_time = time.time() - run_start
+        
+        rows.append((backend, load_time, run_time, run_time / audio_seconds, sampler.peak_rss, sampler.peak_gpu))
+        
+        # Free the model before loading the next backend
+        del model
+        gc.collect()
+        try:
+            import torch
+            torch.cuda.empty_cache()
+        except Exception:
+            pass
+    
+    mb = 1024 * 1024
+    print("\n" + "=" * 70)
+    print("  BENCHMARK RESULTS")
+    print("=" * 70)
+    print(f"  {'Backend':<16}{'Load':>8}{'Transcribe':>12}{'RTF':>8}{'Peak RAM':>12}{'Peak VRAM':>12}")
+    for backend, load_time, run_time, rtf, peak_rss, peak_gpu in rows:
+        ram = f"{peak_rss / mb:.0f} MB" if peak_rss else "n/a"
+        vram = f"{peak_gpu / mb:.0f} MB" if peak_gpu else "n/a"
+        print(f"  {backend:<16}{load_time:>7.1f}s{run_time:>11.1f}s{rtf:>8.3f}{ram:>12}{vram:>12}")
+    print("\n  RTF < 1.0 means faster than real time (lower is better)")
+    print("=" * 70)
+
+
 def main():
     """Main execution function"""
+    args = parse_args()
     print_banner()
     
+    if args.benchmark:
+        run_benchmark(Path(args.benchmark))
+        return
+    
     # Ensure output directory exists
     ensure_output_dir()
     
@@ -192,14 +701,22 @@ def main():
     
     print(f"[INFO] Found {len(input_files)} file(s):")
     
-    # Check which files already have EN subtitles
+    # Check which files have up-to-date EN subtitles (same input content
+    # and settings as recorded in the build manifest)
+    manifest = open_manifest(OUTPUT_DIR)
+    params = transcribe_params(args.backend)
     files_to_process = []
     for i, f in enumerate(input_files, 1):
         en_output = OUTPUT_DIR / f"{f.stem}_en.srt"
-        if en_output.exists():
-            print(f"  {i}. {f.name} - SKIP (EN subtitle exists)")
+        status = manifest.status(en_output, [f], params, force=args.force)
+        if status in KEEP_STATUSES:
+            manifest.keep(en_output, [f], params, status)
+            status = "fresh"
+        if status == "fresh":
+            print(f"  {i}. {f.name} - SKIP (EN subtitle up to date)")
         else:
-            print(f"  {i}. {f.name} - PENDING")
+            reason = "" if status == "missing" else f" ({status})"
+            print(f"  {i}. {f.name} - PENDING{reason}")
             files_to_process.append(f)
     
     if not files_to_process:
@@ -210,25 +727,22 @@ def main():
     
     print(f"\n[INFO] {len(files_to_process)} file(s) to process")
     
-    # Load Whisper model
-    model = load_model()
+    # Load one Whisper model per GPU slot (long files split into chunks can
+    # use every slot on their own)
+    requested_slots = args.gpu_slots if CHUNKED_MODE else min(args.gpu_slots, len(files_to_process))
+    gpu_slots = fit_gpu_slots(requested_slots)
+    decode_workers = max(1, args.workers)
+    models = [load_model(args.backend) for _ in range(gpu_slots)]
     
-    # Process each file
+    # Process files through the decode → GPU pipeline
     print("\n" + "=" * 70)
     print(f"[STEP 2/3] Processing {len(files_to_process)} file(s)...")
+    print(f"[INFO] Decode workers: {decode_workers} | GPU slots: {gpu_slots}")
     print("=" * 70)
     print()
     
-    results = []
     total_start = time.time()
-    
-    for i, input_file in enumerate(files_to_process, 1):
-        print(f"\n{'=' * 70}")
-        print(f"[FILE {i}/{len(files_to_process)}]")
-        print(f"{'=' * 70}")
-        
-        success, duration, output_file = transcribe_file(model, input_file)
-        results.append((input_file.name, success, duration))
+    results = transcribe_all(models, files_to_process, decode_workers, args.backend, manifest)
     
     # Print summary
     total_duration = time.time() - total_start
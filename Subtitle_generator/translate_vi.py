@@ -6,8 +6,15 @@ Translate English subtitles to Vietnamese using NLLB
 """
 
 import sys
+import argparse
 from pathlib import Path
-from subtitle_utils import get_nllb_translator, translate_subtitle_nllb_cached
+from subtitle_utils import (
+    get_nllb_translator,
+    translate_subtitle_nllb_cached,
+    NLLB_GENERATION_PARAMS
+)
+from translation_memory import TranslationMemory
+from build_manifest import open_manifest, KEEP_STATUSES
 
 # Configuration
 OUTPUT_DIR = Path(__file__).parent / "output"
@@ -15,7 +22,19 @@ OUTPUT_DIR = Path(__file__).parent / "output"
 # NLLB settings
 NLLB_MODEL = "facebook/nllb-200-distilled-600M"  # Or "facebook/nllb-200-3.3B" for better quality
 DEVICE = "cuda"  # Will auto-fallback to CPU if CUDA not available
-BATCH_SIZE = 8  # Number of subtitles to translate at once
+ENGINE = "transformers"  # "transformers", "ctranslate2" (fast int8, CPU/GPU) or "torch-int8" (CPU)
+COMPUTE_TYPE = "int8"  # CTranslate2 only: int8 (CPU), int8_float16 / float16 (GPU)
+CT2_MODEL_DIR = None  # Converted CTranslate2 model; None = models/<name>-ct2-<compute_type>
+NUM_BEAMS = 5  # Beam size (lower = faster, e.g. 2 on CPU)
+INTRA_THREADS = 0  # CPU threads per translation (0 = auto)
+INTER_THREADS = 1  # CTranslate2 parallel translations / torch inter-op threads
+MAX_BATCH_TOKENS = 4096  # Padded token budget per batch (cues are grouped by length)
+MAX_BATCH_SIZE = 64  # Upper bound on subtitles per batch
+
+# Translation memory (persistent cache of already translated lines)
+USE_TRANSLATION_MEMORY = True  # Set False to bypass the cache
+TRANSLATION_MEMORY_PATH = OUTPUT_DIR / "translation_memory.sqlite"
+TRANSLATION_MEMORY_MAX_ENTRIES = 200_000  # Least recently used entries are evicted
 
 
 def print_banner():
@@ -28,6 +47,20 @@ def print_banner():
     print()
 
 
+def generation_params() -> dict:
+    """NLLB settings that change the output (translation memory key)"""
+    # Quantized engines can word things slightly differently: keep them apart
+    params = {**NLLB_GENERATION_PARAMS, "num_beams": NUM_BEAMS, "engine": ENGINE}
+    if ENGINE == "ctranslate2":
+        params["compute_type"] = COMPUTE_TYPE
+    return params
+
+
+def translation_params() -> dict:
+    """Settings that affect *_vi.srt (the build manifest key)"""
+    return {"translator": "nllb", "model": NLLB_MODEL, **generation_params()}
+
+
 def get_en_files():
     """Get all English subtitle files"""
     if not OUTPUT_DIR.exists():
@@ -38,8 +71,19 @@ def get_en_files():
     return sorted(en_files)
 
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Vietnamese Translation (NLLB)")
+    parser.add_argument(
+        "--force", action="store_true",
+        help="also retranslate *_vi.srt files that were edited by hand"
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main execution function"""
+    args = parse_args()
     print_banner()
     
     # Get English subtitle files
@@ -54,14 +98,22 @@ def main():
     
     print(f"[INFO] Found {len(en_files)} English subtitle(s):")
     
-    # Check which files need translation
+    # Check which files need translation (new/changed EN subtitle or
+    # different translation settings, per the build manifest)
+    manifest = open_manifest(OUTPUT_DIR)
+    params = translation_params()
     files_to_translate = []
     for i, en_file in enumerate(en_files, 1):
         vi_file = en_file.parent / en_file.name.replace("_en.srt", "_vi.srt")
-        if vi_file.exists():
-            print(f"  {i}. {en_file.name} - SKIP (VI subtitle exists)")
+        status = manifest.status(vi_file, [en_file], params, force=args.force)
+        if status in KEEP_STATUSES:
+            manifest.keep(vi_file, [en_file], params, status)
+            status = "fresh"
+        if status == "fresh":
+            print(f"  {i}. {en_file.name} - SKIP (VI subtitle up to date)")
         else:
-            print(f"  {i}. {en_file.name} - PENDING")
+            reason = "" if status == "missing" else f" ({status})"
+            print(f"  {i}. {en_file.name} - PENDING{reason}")
             files_to_translate.append(en_file)
     
     if not files_to_translate:
@@ -77,12 +129,21 @@ def main():
     print("[LOADING] NLLB Translation Model...")
     print("=" * 70)
     print(f"[INFO] Model: {NLLB_MODEL}")
+    print(f"[INFO] Engine: {ENGINE}")
     print(f"[INFO] Device: {DEVICE}")
     print("[INFO] This may take a few minutes on first run (downloading model)...")
     print()
     
     try:
-        nllb_translator = get_nllb_translator(NLLB_MODEL, DEVICE)
+        nllb_translator = get_nllb_translator(
+            NLLB_MODEL,
+            DEVICE,
+            engine=ENGINE,
+            compute_type=COMPUTE_TYPE,
+            ct2_model_dir=CT2_MODEL_DIR,
+            intra_threads=INTRA_THREADS,
+            inter_threads=INTER_THREADS
+        )
         print("[SUCCESS] NLLB model loaded!")
     except Exception as e:
         print(f"[ERROR] Failed to load NLLB model: {e}")
@@ -91,6 +152,14 @@ def main():
         input("\nPress Enter to exit...")
         sys.exit(1)
     
+    memory = TranslationMemory(
+        TRANSLATION_MEMORY_PATH,
+        NLLB_MODEL,
+        generation_params(),
+        max_entries=TRANSLATION_MEMORY_MAX_ENTRIES,
+        enabled=USE_TRANSLATION_MEMORY
+    )
+    
     # Translate files
     print("\n" + "=" * 70)
     print(f"[TRANSLATING] Processing {len(files_to_translate)} file(s)...")
@@ -114,8 +183,12 @@ def main():
                 str(en_file),
                 str(vi_file),
                 nllb_translator,
-                batch_size=BATCH_SIZE
+                batch_size=MAX_BATCH_SIZE,
+                max_batch_tokens=MAX_BATCH_TOKENS,
+                memory=memory,
+                num_beams=NUM_BEAMS
             )
+            manifest.record(vi_file, [en_file], params)
             print(f"[SUCCESS] Translation complete!")
             results.append((en_file.name, True))
         except Exception as e:
@@ -136,6 +209,8 @@ def main():
     print(f"  Total files: {len(results)}")
     print(f"  Successful: {successful}")
     print(f"  Failed: {failed}")
+    print(f"  Translation memory: {memory.stats()}")
+    memory.close()
     
     print(f"\n[OUTPUT] Vietnamese subtitles saved to: {OUTPUT_DIR}")
     
@@ -5,11 +5,31 @@ Vietnamese Translation Script - Qwen2.5
 Offline LLM-based translation with context awareness
 """
 
+import os
+import re
 import sys
-import srt
+import argparse
 from pathlib import Path
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from translation_memory import TranslationMemory
+from subtitle_track import SubtitleTrack
+from build_manifest import open_manifest, KEEP_STATUSES
+
+
+def env_int(name: str, default: int) -> int:
+    """Positive integer from an environment variable; empty or invalid values give default"""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"[WARNING] Ignoring {name}={value!r} (not a number), using {default}")
+        return default
+
 
 # Configuration
 OUTPUT_DIR = Path(__file__).parent / "output"
@@ -18,6 +38,49 @@ OUTPUT_DIR = Path(__file__).parent / "output"
 OLLAMA_API_URL = "http://localhost:11434/api/generate"
 QWEN_MODEL = "qwen2.5:7b"  # Or qwen2.5:14b for better quality
 BATCH_SIZE = 5  # Number of subtitles per translation call
+CONTEXT_LINES = 2  # Previous English lines sent as context with each batch
+# Parallel requests in flight; match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_CONCURRENCY = env_int("OLLAMA_NUM_PARALLEL", 4)
+STREAM_RESPONSES = True  # Parse lines as they arrive and stop runaway generations
+JSON_MODE = True  # Ask Ollama for {"1": "...", ...} instead of numbered lines
+MAX_RETRIES = 2  # Re-requests for missing/invalid cues only (never the whole batch)
+QWEN_OPTIONS = {
+    "temperature": 0.3,  # Lower for consistency
+    "top_p": 0.9,
+    "top_k": 40,
+}
+
+# Translation memory (persistent cache of already translated lines)
+USE_TRANSLATION_MEMORY = True  # Set False to bypass the cache
+TRANSLATION_MEMORY_PATH = OUTPUT_DIR / "translation_memory.sqlite"
+TRANSLATION_MEMORY_MAX_ENTRIES = 200_000  # Least recently used entries are evicted
+
+
+def translation_params() -> dict:
+    """Settings that affect *_vi.srt (the build manifest key)"""
+    return {
+        "translator": "qwen",
+        "model": QWEN_MODEL,
+        "options": QWEN_OPTIONS,
+        "batch_size": BATCH_SIZE,
+        "context_lines": CONTEXT_LINES,
+        "json_mode": JSON_MODE,
+    }
+
+
+# Shared HTTP session (keep-alive connection pool for Ollama)
+_session = None
+
+
+def get_session():
+    """Get the pooled requests session, sized for OLLAMA_CONCURRENCY"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_CONCURRENCY)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
 
 
 def print_banner():
@@ -53,73 +116,98 @@ def get_en_files():
     return sorted(en_files)
 
 
-def load_subtitles(srt_path: str):
+class Cue:
+    """Text of one subtitle while it is being translated (timing stays in the track)"""
+    __slots__ = ("content",)
+    
+    def __init__(self, content: str):
+        self.content = content
+
+
+def load_subtitles(srt_path: str) -> SubtitleTrack:
     """Load subtitles from file"""
-    with open(srt_path, 'r', encoding='utf-8') as f:
-        return list(srt.parse(f.read()))
+    return SubtitleTrack.read(srt_path)
 
 
-def save_subtitles(subtitles, srt_path: str):
+def save_subtitles(track: SubtitleTrack, srt_path: str):
     """Save subtitles to file"""
-    with open(srt_path, 'w', encoding='utf-8') as f:
-        f.write(srt.compose(subtitles))
+    track.write(srt_path)
 
 
-def create_translation_prompt(subtitle_batch, context=""):
-    """Create context-aware translation prompt for Qwen"""
+def create_translation_prompt(subtitle_batch, context="", numbers=None):
+    """
+    Create context-aware translation prompt for Qwen
+    
+    Args:
+        subtitle_batch: Subtitles in the batch
+        context: Previous English lines for continuity
+        numbers: 1-based numbers of the cues to translate (default: all);
+                 cues keep their batch number so retries map back directly
+    """
+    if numbers is None:
+        numbers = range(1, len(subtitle_batch) + 1)
     
     # Build subtitle list
     subtitle_texts = []
-    for i, sub in enumerate(subtitle_batch, 1):
-        subtitle_texts.append(f"{i}. {sub.content}")
+    for number in numbers:
+        subtitle_texts.append(f"{number}. {subtitle_batch[number - 1].content}")
     
     batch_text = "\n".join(subtitle_texts)
     
     context_part = ""
     if context:
         context_part = f"""
-PREVIOUS CONTEXT (for continuity):
+PREVIOUS LINES (English, for continuity - do not translate):
 {context}
 
 """
     
+    if JSON_MODE:
+        format_rule = 'Answer with a JSON object mapping each subtitle number to its Vietnamese text, e.g. {"1": "...", "2": "..."}'
+        answer_header = "VIETNAMESE TRANSLATION (JSON object only):"
+    else:
+        format_rule = "Maintain the same numbering (1., 2., etc.)"
+        answer_header = "VIETNAMESE TRANSLATION (numbers + Vietnamese text only):"
+    
     prompt = f"""You are a professional Vietnamese translator. Translate the following English subtitles to natural Vietnamese.
 
 CRITICAL RULES:
 1. Pay attention to speaker gender and relationship for pronouns (anh/chị/em/cô/bác)
 2. Use natural, conversational Vietnamese
-3. Maintain the same numbering (1., 2., etc.)
+3. {format_rule}
 4. Keep names and technical terms appropriate
 5. Make it sound like native Vietnamese speakers
 
 {context_part}ENGLISH SUBTITLES:
 {batch_text}
 
-VIETNAMESE TRANSLATION (numbers + Vietnamese text only):"""
+{answer_header}"""
     
     return prompt
 
 
-def translate_with_qwen(subtitle_batch, context=""):
+def build_payload(prompt, stream=False):
+    """Build the Ollama /api/generate request body"""
+    payload = {
+        "model": QWEN_MODEL,
+        "prompt": prompt,
+        "stream": stream,
+        "options": QWEN_OPTIONS
+    }
+    if JSON_MODE:
+        payload["format"] = "json"
+    return payload
+
+
+def translate_with_qwen(subtitle_batch, context="", numbers=None):
     """Translate batch using Qwen via Ollama"""
     
-    prompt = create_translation_prompt(subtitle_batch, context)
+    prompt = create_translation_prompt(subtitle_batch, context, numbers)
     
     try:
-        payload = {
-            "model": QWEN_MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.3,  # Lower for consistency
-                "top_p": 0.9,
-                "top_k": 40,
-            }
-        }
-        
-        response = requests.post(
+        response = get_session().post(
             OLLAMA_API_URL,
-            json=payload,
+            json=build_payload(prompt),
             timeout=60
         )
         
@@ -135,39 +223,255 @@ def translate_with_qwen(subtitle_batch, context=""):
         return None
 
 
-def parse_qwen_response(response_text, subtitle_batch):
-    """Parse Qwen response and update subtitles"""
+# Completed "number": "text" pair inside a (possibly unfinished) JSON object
+JSON_PAIR_PATTERN = re.compile(r'"(\d+)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def stream_qwen_translation(subtitle_batch, context="", numbers=None):
+    """
+    Translate batch using a streamed Ollama response.
+    
+    Each cue is committed as soon as its line (or JSON "n": "text" pair)
+    ends. Generation is cut off (by closing the stream) when the model
+    drifts: a number outside the requested cues, or a numbered line that is
+    back in English.
+    
+    Returns:
+        Set of committed cue numbers, or None if the request failed
+    """
+    if numbers is None:
+        numbers = list(range(1, len(subtitle_batch) + 1))
+    requested = set(numbers)
+    prompt = create_translation_prompt(subtitle_batch, context, numbers)
+    committed = set()
+    position = 0
+    
+    def commit_line(line):
+        """Commit one finished line; False means the model is drifting"""
+        nonlocal position
+        number, text = parse_numbered_line(line)
+        if not text:
+            return True
+        
+        if number is None:
+            # Unnumbered English line is chatter (e.g. a preamble): skip it
+            if looks_like_english(text):
+                return True
+            remaining = [n for n in numbers if n > position]
+            if not remaining:
+                return False
+            number = remaining[0]
+        
+        if number not in requested:
+            return False
+        if not is_valid_translation(text, subtitle_batch[number - 1].content):
+            return False  # The English line echoed back
+        
+        subtitle_batch[number - 1].content = text
+        committed.add(number)
+        position = number
+        return True
+    
+    def commit_pair(key, raw_value):
+        """Commit one JSON pair; False means the model is drifting"""
+        number = int(key)
+        if number not in requested:
+            return False
+        try:
+            # strict=False: models sometimes emit raw newlines/tabs inside strings
+            text = json.loads(f'"{raw_value}"', strict=False).strip()
+        except json.JSONDecodeError:
+            return True  # Skip only this pair; the cue is re-requested later
+        if is_valid_translation(text, subtitle_batch[number - 1].content):
+            subtitle_batch[number - 1].content = text
+            committed.add(number)
+        return True
     
-    lines = response_text.strip().split('\n')
-    translations = []
+    try:
+        with get_session().post(
+            OLLAMA_API_URL,
+            json=build_payload(prompt, stream=True),
+            stream=True,
+            timeout=60
+        ) as response:
+            if response.status_code != 200:
+                print(f"[ERROR] Ollama API error: {response.status_code}")
+                return None
+            
+            pending = ""
+            for raw in response.iter_lines():
+                if not raw:
+                    continue
+                chunk = json.loads(raw)
+                pending += chunk.get("response", "")
+                
+                if JSON_MODE:
+                    # Only pairs whose closing quote has arrived match
+                    consumed = 0
+                    for match in JSON_PAIR_PATTERN.finditer(pending):
+                        if not commit_pair(match.group(1), match.group(2)):
+                            return committed  # Closing the stream stops generation
+                        consumed = match.end()
+                    pending = pending[consumed:]
+                else:
+                    *finished, pending = pending.split("\n")
+                    for line in finished:
+                        if not commit_line(line):
+                            return committed  # Closing the stream stops generation
+                
+                if chunk.get("done") or committed == requested:
+                    break
+            
+            if not JSON_MODE:
+                commit_line(pending)
+            return committed
+            
+    except Exception as e:
+        print(f"[ERROR] Request failed: {e}")
+        return committed if committed else None
+
+
+def parse_numbered_line(line):
+    """Split '3. text' into (3, 'text'); unnumbered lines give (None, text)"""
+    line = line.strip()
+    match = re.match(r'^(\d+)\.\s+(.*)$', line)
+    if match:
+        return int(match.group(1)), match.group(2).strip()
+    return None, line
+
+
+def looks_like_english(text):
+    """Basic check: Vietnamese sentences almost always have non-ASCII characters"""
+    return all(ord(c) < 128 for c in text)
+
+
+def is_valid_translation(text, source=None):
+    """
+    A usable translation is a non-empty string that is not the English line
+    
+    Pure-ASCII output ("OK", names, numbers) is accepted when it differs from
+    the source cue, or when the source is a single word or has no letters
+    (nothing to translate); without a source it is rejected.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return False
+    if not looks_like_english(text):
+        return True
+    if source is None:
+        return False
+    if text.strip().casefold() != source.strip().casefold():
+        return True
+    return len(source.split()) <= 1 or not any(c.isalpha() for c in source)
+
+
+def parse_json_translations(response_text):
+    """
+    Parse a JSON-mode response into {number: text}
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+    Accepts {"1": "..."} as well as one level of wrapping such as
+    {"translations": {"1": "..."}}. Invalid JSON gives an empty dict.
+    """
+    try:
+        data = json.loads(response_text)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    
+    if isinstance(data, dict) and len(data) == 1:
+        inner = next(iter(data.values()))
+        if isinstance(inner, dict):
+            data = inner
+    if not isinstance(data, dict):
+        return {}
+    
+    translations = {}
+    for key, value in data.items():
+        key = str(key).strip().rstrip('.')
+        if key.isdigit() and isinstance(value, str):
+            translations[int(key)] = value.strip()
+    return translations
+
+
+def parse_qwen_response(response_text, subtitle_batch, numbers=None):
+    """
+    Parse Qwen response and update subtitles
+    
+    Translations are matched to cues by their number, never by position, so
+    a missing or merged line cannot shift the rest of the batch.
+    
+    Returns:
+        Set of cue numbers that were updated
+    """
+    if numbers is None:
+        numbers = list(range(1, len(subtitle_batch) + 1))
+    requested = set(numbers)
+    
+    if JSON_MODE:
+        translations = parse_json_translations(response_text)
+    else:
+        translations = {}
+        unnumbered = []
+        for line in response_text.strip().split('\n'):
+            number, translation = parse_numbered_line(line)
+            if number is None:
+                unnumbered.append(translation)
+            elif number not in translations:
+                translations[number] = translation
         
-        # Remove numbering if present
-        if '. ' in line and line[0].isdigit():
-            parts = line.split('. ', 1)
-            if len(parts) == 2:
-                translation = parts[1]
-            else:
-                translation = line
+        # Fall back to position only when the model dropped the numbering
+        if not translations:
+            candidates = [t for t in unnumbered if is_valid_translation(t)]
+            translations = dict(zip(numbers, candidates))
+    
+    # Update subtitle content
+    updated = set()
+    for number, translation in translations.items():
+        if number in requested and is_valid_translation(translation, subtitle_batch[number - 1].content):
+            subtitle_batch[number - 1].content = translation
+            updated.add(number)
+    
+    return updated
+
+
+def translate_batch(subtitle_batch, context=""):
+    """
+    Translate one batch in place (streamed or blocking, see STREAM_RESPONSES)
+    
+    Cues that come back missing or invalid are re-requested on their own,
+    up to MAX_RETRIES times; the whole batch is never sent again.
+    
+    Returns:
+        Number of subtitles translated, or None if every request failed
+    """
+    remaining = list(range(1, len(subtitle_batch) + 1))
+    any_response = False
+    
+    for _ in range(1 + MAX_RETRIES):
+        if STREAM_RESPONSES:
+            updated = stream_qwen_translation(subtitle_batch, context, remaining)
         else:
-            translation = line
+            response = translate_with_qwen(subtitle_batch, context, remaining)
+            updated = parse_qwen_response(response, subtitle_batch, remaining) if response else None
         
-        # Skip if it looks like English (basic check)
-        if translation and not all(ord(c) < 128 for c in translation):
-            translations.append(translation)
+        if updated is None:
+            continue
+        
+        any_response = True
+        remaining = [n for n in remaining if n not in updated]
+        if not remaining:
+            break
     
-    # Update subtitle content
-    for i, sub in enumerate(subtitle_batch):
-        if i < len(translations):
-            sub.content = translations[i]
+    if not any_response:
+        return None
+    return len(subtitle_batch) - len(remaining)
 
 
-def translate_file_qwen(en_file: Path, vi_file: Path):
-    """Translate subtitle file using Qwen"""
+def translate_file_qwen(en_file: Path, vi_file: Path, memory: TranslationMemory = None) -> bool:
+    """
+    Translate subtitle file using Qwen
+    
+    Returns:
+        True if every batch was translated (False = some lines kept in English)
+    """
     
     print(f"[INPUT] {en_file.name}")
     print(f"[OUTPUT] {vi_file.name}")
@@ -175,49 +479,86 @@ def translate_file_qwen(en_file: Path, vi_file: Path):
     
     # Load subtitles
     print("[LOADING] Reading subtitle file...")
-    subtitles = load_subtitles(str(en_file))
-    total = len(subtitles)
+    track = load_subtitles(str(en_file))
+    total = len(track)
     print(f"[INFO] Found {total} subtitle(s)")
-    print()
     
-    # Translate in batches with context
-    print("[TRANSLATING] Using Qwen2.5 with context awareness...")
-    print(f"[INFO] This may take a while (~{total//BATCH_SIZE * 3} seconds)")
+    # Keep the English source for context and memory keys
+    sources = track.texts()
+    subtitles = [Cue(text) for text in sources]
+    
+    # Fill cached lines from translation memory
+    cached = memory.get_many(sources) if memory else {}
+    for idx, translation in cached.items():
+        subtitles[idx].content = translation
+    pending = [idx for idx in range(total) if idx not in cached]
+    if cached:
+        print(f"[CACHE] {len(cached)} subtitle(s) found in translation memory")
     print()
     
-    context = ""
+    # Independent batches: context comes from the English lines right before
+    # each batch, so no batch waits for another batch's output
+    batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+    total_batches = len(batches)
     
-    for i in range(0, total, BATCH_SIZE):
-        batch = subtitles[i:i + BATCH_SIZE]
-        batch_num = (i // BATCH_SIZE) + 1
-        total_batches = (total + BATCH_SIZE - 1) // BATCH_SIZE
-        
-        print(f"  [{batch_num}/{total_batches}] Translating {len(batch)} subtitle(s)...", end=" ", flush=True)
-        
-        # Translate
-        response = translate_with_qwen(batch, context)
+    print(f"[TRANSLATING] Using Qwen2.5 with context awareness ({OLLAMA_CONCURRENCY} parallel request(s))...")
+    print(f"[INFO] This may take a while (~{total_batches * 3 // OLLAMA_CONCURRENCY} seconds)")
+    print()
+    
+    failed_batches = 0
+    with ThreadPoolExecutor(max_workers=OLLAMA_CONCURRENCY) as executor:
+        futures = {}
+        for indices in batches:
+            first = indices[0]
+            context = "\n".join(sources[max(0, first - CONTEXT_LINES):first])
+            batch = [subtitles[idx] for idx in indices]
+            futures[executor.submit(translate_batch, batch, context)] = indices
         
-        if response:
-            parse_qwen_response(response, batch)
-            print("✓")
+        # Report results as they finish
+        for done, future in enumerate(as_completed(futures), 1):
+            indices = futures[future]
+            translated = future.result()
             
-            # Update context (last 2 subtitles)
-            if len(batch) >= 2:
-                context = f"{batch[-2].content}\n{batch[-1].content}"
-            elif len(batch) == 1:
-                context = batch[-1].content
-        else:
-            print("✗ (keeping original)")
+            print(f"  [{done}/{total_batches}] Subtitles {indices[0] + 1}-{indices[-1] + 1}...", end=" ")
+            
+            if translated:
+                if translated < len(indices):
+                    print(f"✓ ({translated}/{len(indices)}, rest kept original)")
+                else:
+                    print("✓")
+                
+                # Remember lines that actually got translated
+                if memory:
+                    memory.put_many([
+                        (sources[idx], subtitles[idx].content)
+                        for idx in indices
+                        if subtitles[idx].content != sources[idx]
+                    ])
+            else:
+                failed_batches += 1
+                print("✗ (keeping original)")
     
     # Save translated subtitles
     print()
     print("[SAVING] Writing Vietnamese subtitle file...")
-    save_subtitles(subtitles, str(vi_file))
+    save_subtitles(track.with_texts([sub.content for sub in subtitles]), str(vi_file))
     print(f"[SUCCESS] Translation complete!")
+    return failed_batches == 0
+
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Vietnamese Translation (Qwen)")
+    parser.add_argument(
+        "--force", action="store_true",
+        help="also retranslate *_vi.srt files that were edited by hand"
+    )
+    return parser.parse_args()
 
 
 def main():
     """Main execution function"""
+    args = parse_args()
     print_banner()
     
     # Check Ollama
@@ -262,14 +603,22 @@ def main():
     
     print(f"[INFO] Found {len(en_files)} English subtitle(s):")
     
-    # Check which files need translation
+    # Check which files need translation (new/changed EN subtitle or
+    # different translation settings, per the build manifest)
+    manifest = open_manifest(OUTPUT_DIR)
+    params = translation_params()
     files_to_translate = []
     for i, en_file in enumerate(en_files, 1):
         vi_file = en_file.parent / en_file.name.replace("_en.srt", "_vi.srt")
-        if vi_file.exists():
-            print(f"  {i}. {en_file.name} - SKIP (VI subtitle exists)")
+        status = manifest.status(vi_file, [en_file], params, force=args.force)
+        if status in KEEP_STATUSES:
+            manifest.keep(vi_file, [en_file], params, status)
+            status = "fresh"
+        if status == "fresh":
+            print(f"  {i}. {en_file.name} - SKIP (VI subtitle up to date)")
         else:
-            print(f"  {i}. {en_file.name} - PENDING")
+            reason = "" if status == "missing" else f" ({status})"
+            print(f"  {i}. {en_file.name} - PENDING{reason}")
             files_to_translate.append(en_file)
     
     if not files_to_translate:
@@ -281,6 +630,14 @@ def main():
     print(f"\n[INFO] {len(files_to_translate)} file(s) to translate")
     print()
     
+    memory = TranslationMemory(
+        TRANSLATION_MEMORY_PATH,
+        QWEN_MODEL,
+        translation_params(),
+        max_entries=TRANSLATION_MEMORY_MAX_ENTRIES,
+        enabled=USE_TRANSLATION_MEMORY
+    )
+    
     # Translate files
     print("=" * 70)
     print(f"[TRANSLATING] Processing {len(files_to_translate)} file(s)...")
@@ -297,7 +654,10 @@ def main():
         print(f"{'=' * 70}")
         
         try:
-            translate_file_qwen(en_file, vi_file)
+            complete = translate_file_qwen(en_file, vi_file, memory)
+            manifest.record(vi_file, [en_file], params, complete=complete)
+            if not complete:
+                print("[WARNING] Some lines stayed in English; the file will be retried next run")
             results.append((en_file.name, True))
         except Exception as e:
             print(f"[ERROR] Translation failed: {e}")
@@ -317,6 +677,8 @@ def main():
     print(f"  Total files: {len(results)}")
     print(f"  Successful: {successful}")
     print(f"  Failed: {failed}")
+    print(f"  Translation memory: {memory.stats()}")
+    memory.close()
     
     print(f"\n[OUTPUT] Vietnamese subtitles saved to: {OUTPUT_DIR}")
     
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Translation Memory
+- Persistent on-disk cache (SQLite) of EN → VI translations
+- Keyed by normalized source text + model name + generation params
+- LRU eviction with a size cap, hit/miss counters
+"""
+
+import json
+import sqlite3
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different lines share one entry"""
+    return " ".join(text.split())
+
+
+class TranslationMemory:
+    """
+    SQLite-backed translation cache shared by the NLLB and Qwen translators.
+
+    One instance is bound to a model name and its generation params, so a
+    change of model or settings never returns stale translations.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        model_name: str,
+        params: Optional[dict] = None,
+        max_entries: int = 200_000,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            db_path: Path to the SQLite file (created if missing)
+            model_name: Model identifier, part of the cache key
+            params: Generation params, part of the cache key
+            max_entries: Size cap; least recently used entries are evicted
+            enabled: False to bypass the cache entirely (no reads, no writes)
+        """
+        self.model_name = model_name
+        self.params_key = json.dumps(params or {}, sort_keys=True)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if not enabled:
+            return
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS memory (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_last_used ON memory (last_used)"
+        )
+        self._conn.commit()
+
+    def _key(self, source: str) -> str:
+        raw = "\0".join((normalize_text(source), self.model_name, self.params_key))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, str]:
+        """
+        Look up a list of source texts.
+
+        Returns:
+            {index: translation} for every text found in the memory
+        """
+        if not self.enabled or not texts:
+            return {}
+
+        keys = [self._key(text) for text in texts]
+        found = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, target FROM memory WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE memory SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+        hits = {i: found[key] for i, key in enumerate(keys) if key in found}
+        self.hits += len(hits)
+        self.misses += len(texts) - len(hits)
+        return hits
+
+    def put_many(self, pairs: List[Tuple[str, str]]) -> None:
+        """Store (source, translation) pairs and evict beyond max_entries"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        rows = [
+            (self._key(source), self.model_name, source, target, now)
+            for source, target in pairs
+            if source.strip() and target.strip()
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO memory (key, model, source, target, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM memory WHERE key IN "
+                    "(SELECT key FROM memory ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,)
+                )
+            self._conn.commit()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+
+    def stats(self) -> str:
+        """One-line summary for the end-of-run report"""
+        if not self.enabled:
+            return "disabled"
+
+        with self._lock:
+            size = self._count()
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        return (
+            f"{self.hits} hit(s), {self.misses} miss(es) "
+            f"({hit_rate:.1f}% hit rate), {size} entries"
+        )
+
+    def close(self) -> None:
+        """Close the database connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None